@@ -4,9 +4,10 @@
 
 import type { Message } from "@/types/chat";
 import type { SavedChatSession } from "@/services/chatSessionService";
-import { saveChatSession } from "@/services/chatSessionService";
+import { getChatSession, saveChatSession } from "@/services/chatSessionService";
 
 const API_BASE_URL = "https://nomadsync.ramharikrishnan.dev"; // or use env variable
+const SYNC_STATE_KEY = "travel_chat_sync_state";
 
 interface MongoMessage {
   _id: string;
@@ -16,6 +17,22 @@ interface MongoMessage {
   timestamp: string;
 }
 
+interface MongoChanges {
+  sync_token: string;
+  reset: boolean;
+  messages: MongoMessage[];
+  deleted: string[];
+}
+
+/**
+ * Sync token per session, with the local copy it applies to
+ */
+interface SyncState {
+  token: string;
+  count: number;
+  lastId?: string;
+}
+
 interface MongoSession {
   _id: string;
   user_id: string;
@@ -90,15 +107,95 @@ async function fetchMessages(sessionId: string): Promise<Message[]> {
   }
 }
 
+function getSyncStates(): Record<string, SyncState> {
+  try {
+    return JSON.parse(localStorage.getItem(SYNC_STATE_KEY) || "{}");
+  } catch {
+    return {};
+  }
+}
+
+function saveSyncState(sessionId: string, token: string, messages: Message[]): void {
+  const states = getSyncStates();
+  states[sessionId] = { token, count: messages.length, lastId: messages[messages.length - 1]?.id };
+  try {
+    localStorage.setItem(SYNC_STATE_KEY, JSON.stringify(states));
+  } catch (error) {
+    console.error("Failed to save sync state", error);
+  }
+}
+
+/**
+ * The sync token for a session, if the local copy is still the one it was issued for
+ */
+function getSyncToken(sessionId: string, localMessages?: Message[]): string | undefined {
+  const state = getSyncStates()[sessionId];
+  if (!state || !localMessages) return undefined;
+  const lastId = localMessages[localMessages.length - 1]?.id;
+  return state.count === localMessages.length && state.lastId === lastId ? state.token : undefined;
+}
+
+/**
+ * Fetch messages added and deleted since a sync token (everything without one)
+ */
+async function fetchChanges(sessionId: string, since?: string): Promise<MongoChanges | null> {
+  try {
+    const query = since ? `?since=${encodeURIComponent(since)}` : "";
+    const response = await fetch(`${API_BASE_URL}/api/sessions/${sessionId}/changes${query}`);
+    if (!response.ok) {
+      return null;
+    }
+    const result = await response.json();
+    return result.success ? result : null;
+  } catch (error) {
+    console.error("Error fetching changes:", error);
+    return null;
+  }
+}
+
+/**
+ * Apply a change set to the local copy of a session's messages
+ */
+function applyChanges(localMessages: Message[], changes: MongoChanges): Message[] {
+  const incoming = changes.messages.map(convertMongoMessageToFrontend);
+  if (changes.reset) return incoming;
+
+  const deleted = new Set(changes.deleted);
+  const byId = new Map(
+    localMessages.filter((m) => !deleted.has(m.id)).map((m): [string, Message] => [m.id, m])
+  );
+  for (const message of incoming) {
+    if (!deleted.has(message.id)) byId.set(message.id, message);
+  }
+  return [...byId.values()].sort(
+    (a, b) => new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime()
+  );
+}
+
+/**
+ * Load messages, transferring only the changes since the last sync when possible
+ */
+async function syncMessages(sessionId: string): Promise<Message[]> {
+  const localMessages = getChatSession(sessionId)?.messages;
+  const changes = await fetchChanges(sessionId, getSyncToken(sessionId, localMessages));
+  if (!changes) {
+    // Servers without the changes endpoint
+    return fetchMessages(sessionId);
+  }
+  const messages = applyChanges(localMessages || [], changes);
+  saveSyncState(sessionId, changes.sync_token, messages);
+  return messages;
+}
+
 /**
  * Load session from MongoDB API and save to localStorage
  */
 export async function loadSessionFromMongoDB(sessionId: string): Promise<SavedChatSession | null> {
   try {
-    // Fetch session and messages in parallel
+    // Fetch session and message changes in parallel
     const [session, messages] = await Promise.all([
       fetchSession(sessionId),
-      fetchMessages(sessionId),
+      syncMessages(sessionId),
     ]);
 
     if (!session) {
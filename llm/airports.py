@@ -0,0 +1,253 @@
+"""
+Offline airport and city index.
+
+Airports from `data/airports.csv` and cities from `data/cities.csv` are loaded
+into compact NumPy arrays so that city -> airport resolution, great-circle
+distance and nearest-airport lookups need no network calls. With
+AIRPORT_INDEX_DIR set, the first process to load the index saves it there and
+later ones open the arrays memory-mapped; the Docker image builds it at build
+time. Cities missing from the CSV files resolve to None; the flight tool falls
+back to a Places lookup for them.
+"""
+
+import csv
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy is optional; fall back to a vectorized brute-force search
+    cKDTree = None
+
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+AIRPORTS_CSV = DATA_DIR / "airports.csv"
+CITIES_CSV = DATA_DIR / "cities.csv"
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def normalize_city(name: str) -> str:
+    """Normalize a free-text city name ("Paris, France " -> "paris")."""
+    return " ".join((name or "").split(",")[0].lower().split())
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between points given in degrees. Broadcasts over arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _unit_vectors(lat, lon):
+    """Convert degrees to 3D unit vectors; chord distance is monotonic in great-circle distance."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+class AirportIndex:
+    """Array-backed airport index with name resolution and nearest-neighbour search."""
+
+    def __init__(self, codes: List[str], names: List[str], cities: List[str], countries: List[str],
+                 lat: np.ndarray, lon: np.ndarray, city_coords: Optional[dict] = None,
+                 aliases: Optional[dict] = None):
+        self.codes = codes
+        self.names = names
+        self.cities = cities
+        self.countries = countries
+        self.lat = lat
+        self.lon = lon
+        self.xyz = _unit_vectors(lat, lon)
+        # normalized city name -> (lat, lon) for cities without their own airport row
+        self.city_coords = city_coords or {}
+        # normalized alias -> normalized canonical city name
+        self.aliases = aliases or {}
+
+        self._by_code = {code: i for i, code in enumerate(codes)}
+        self._by_city = {}
+        for i, city in enumerate(cities):
+            # First row for a city is its primary airport
+            self._by_city.setdefault(normalize_city(city), i)
+
+        self._tree = cKDTree(self.xyz) if cKDTree is not None else None
+
+    def __len__(self):
+        return len(self.codes)
+
+    # ---------- construction ----------
+
+    @classmethod
+    def from_csv(cls, airports_csv=AIRPORTS_CSV, cities_csv=CITIES_CSV) -> "AirportIndex":
+        """Build the index from the bundled CSV files."""
+        codes, names, cities, countries, lats, lons = [], [], [], [], [], []
+        with open(airports_csv, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                codes.append(row["iata"].upper())
+                names.append(row["name"])
+                cities.append(row["city"])
+                countries.append(row["country"])
+                lats.append(float(row["lat"]))
+                lons.append(float(row["lon"]))
+
+        city_coords, aliases = {}, {}
+        if cities_csv and Path(cities_csv).exists():
+            with open(cities_csv, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    key = normalize_city(row["name"])
+                    city_coords[key] = (float(row["lat"]), float(row["lon"]))
+                    for alias in (row.get("aliases") or "").split("|"):
+                        if alias.strip():
+                            aliases[normalize_city(alias)] = key
+
+        return cls(codes, names, cities, countries,
+                   np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64),
+                   city_coords, aliases)
+
+    def save(self, directory) -> None:
+        """Write the index as .npy arrays plus a JSON sidecar, suitable for `load(mmap=True)`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "lat.npy", np.ascontiguousarray(self.lat))
+        np.save(directory / "lon.npy", np.ascontiguousarray(self.lon))
+        meta = {
+            "codes": self.codes,
+            "names": self.names,
+            "cities": self.cities,
+            "countries": self.countries,
+            "city_coords": self.city_coords,
+            "aliases": self.aliases,
+        }
+        with open(directory / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> "AirportIndex":
+        """Load an index written by `save`, memory-mapping the coordinate arrays."""
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        with open(directory / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(meta["codes"], meta["names"], meta["cities"], meta["countries"],
+                   np.load(directory / "lat.npy", mmap_mode=mode),
+                   np.load(directory / "lon.npy", mmap_mode=mode),
+                   {k: tuple(v) for k, v in meta["city_coords"].items()},
+                   meta["aliases"])
+
+    # ---------- queries ----------
+
+    def airport(self, i: int) -> dict:
+        """Airport record for row `i`."""
+        return {
+            "iata": self.codes[i],
+            "name": self.names[i],
+            "city": self.cities[i],
+            "country": self.countries[i],
+            "lat": float(self.lat[i]),
+            "lon": float(self.lon[i]),
+        }
+
+    def nearest(self, lat, lon, k: int = 1) -> np.ndarray:
+        """Row indices of the `k` airports nearest to each query point.
+
+        `lat`/`lon` may be scalars or arrays; the result has shape (..., k).
+        """
+        k = min(k, len(self))
+        points = _unit_vectors(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        if self._tree is not None:
+            _, idx = self._tree.query(points, k=k)
+            return np.asarray(idx).reshape(points.shape[:-1] + (k,))
+        # Highest dot product == smallest chord distance
+        dots = points @ self.xyz.T
+        idx = np.argpartition(-dots, k - 1, axis=-1)[..., :k]
+        order = np.take_along_axis(-dots, idx, axis=-1).argsort(axis=-1)
+        return np.take_along_axis(idx, order, axis=-1)
+
+    def resolve_index(self, query: str) -> Optional[int]:
+        """Resolve an IATA code or city name to an airport row, or None if unknown."""
+        if not query:
+            return None
+        code = query.strip().upper()
+        if len(code) == 3 and code in self._by_code:
+            return self._by_code[code]
+
+        key = normalize_city(query)
+        key = self.aliases.get(key, key)
+        if key in self._by_city:
+            return self._by_city[key]
+        if key in self.city_coords:
+            lat, lon = self.city_coords[key]
+            return int(self.nearest(lat, lon, k=1)[0])
+        return None
+
+    def resolve(self, query: str) -> Optional[dict]:
+        """Resolve an IATA code or city name to an airport record, or None if unknown."""
+        i = self.resolve_index(query)
+        return self.airport(i) if i is not None else None
+
+    def distance_km(self, a: int, b) -> np.ndarray:
+        """Great-circle distance from airport row `a` to airport row(s) `b`."""
+        b = np.asarray(b)
+        return haversine_km(self.lat[a], self.lon[a], self.lat[b], self.lon[b])
+
+    def pairwise_km(self, rows) -> np.ndarray:
+        """Symmetric great-circle distance matrix between the given airport rows."""
+        rows = np.asarray(rows)
+        lat, lon = self.lat[rows], self.lon[rows]
+        return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _index_is_current(directory: Path) -> bool:
+    """True if `directory` holds a saved index at least as new as the CSV files."""
+    try:
+        saved = (directory / "meta.json").stat().st_mtime
+    except OSError:
+        return False
+    return all(saved >= Path(csv_path).stat().st_mtime for csv_path in (AIRPORTS_CSV, CITIES_CSV)
+               if Path(csv_path).exists())
+
+
+def _save_index(index: AirportIndex, directory: Path) -> None:
+    """Save into a temporary sibling and rename it into place, so readers never see a partial index."""
+    tmp = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+    try:
+        index.save(tmp)
+        if directory.exists():
+            shutil.rmtree(directory, ignore_errors=True)
+        os.rename(tmp, directory)
+    except OSError as e:
+        # Another worker won the race, or the directory is read-only: use the in-memory index
+        print(f"Warning: could not save the airport index to {directory}: {e}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def get_airport_index() -> AirportIndex:
+    """Return the process-wide airport index, loading it on first use.
+
+    Uses the memory-mapped arrays in AIRPORT_INDEX_DIR when they are present
+    and current; otherwise parses the bundled CSV files and, if
+    AIRPORT_INDEX_DIR is set, saves the index there for the next process.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index_dir = os.getenv("AIRPORT_INDEX_DIR")
+                if index_dir and _index_is_current(Path(index_dir)):
+                    _index = AirportIndex.load(index_dir, mmap=True)
+                else:
+                    _index = AirportIndex.from_csv()
+                    if index_dir:
+                        _save_index(_index, Path(index_dir))
+    return _index
@@ -0,0 +1,157 @@
+"""
+Load benchmark for `/plan-trip` and `run-llm` at controlled concurrency.
+
+By default the app runs in-process with the offline fakes (fakes.py) and an
+in-memory Mongo, so no network or API keys are needed and the numbers show our
+own overhead and concurrency behaviour:
+
+    python benchmark.py --target both --concurrency 1,8,32 --requests 200 \\
+        --llm-latency-ms 200 --maps-latency-ms 30
+
+Pass `--url http://host:8001` to drive a running server instead (it must have
+been started with whatever fakes or real backends you want to measure).
+In-process mode requires `httpx` and `mongomock`.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List, Optional
+
+
+PLAN_TRIP_QUERIES = [
+    "Plan a 3-day trip to Paris for 2 people with a budget of $2000",
+    "I want a 5 day trip to Tokyo for 1 person from Delhi, relaxing resort",
+    "Plan a 4-day sightseeing tour in Rome for 3 travelers, 8 hours a day",
+    "Family trip to Bangkok for 4 people for 6 days, budget 3000",
+]
+
+SESSION_MESSAGES = [
+    ("alice", "Hey all, thinking about a trip to Paris in June?"),
+    ("bob", "I'm in! 3 days works for me, budget around $1500."),
+    ("carol", "Can we see the Louvre and do a food tour?"),
+    ("alice", "Plan a 3-day trip to Paris for 3 people with a budget of $4500"),
+]
+
+
+def _configure_offline(args) -> None:
+    """Point the app at the offline fakes before it is imported."""
+    os.environ.setdefault("LLM_WARMUP", "0")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+    os.environ["LLM_FAKE"] = "1"
+    os.environ["GOOGLE_MAPS_FAKE"] = "1"
+    os.environ["MONGO_URI"] = "mongomock://"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_TOKENS"] = str(args.tokens)
+    os.environ["FAKE_MAPS_LATENCY_MS"] = str(args.maps_latency_ms)
+    for api in ("TEXT_SEARCH", "DETAILS", "DISTANCE_MATRIX"):
+        os.environ.setdefault(f"GOOGLE_MAPS_QPS_{api}", str(args.maps_qps))
+
+
+def _seed_sessions(main, count: int) -> List[str]:
+    """Insert `count` small group chats into the app's (in-memory) database."""
+    coll = main.get_mongo_db().get_collection("messages")
+    session_ids = [f"bench-session-{i}" for i in range(count)]
+    coll.insert_many([
+        {"session_id": sid, "role": author, "content": content}
+        for sid in session_ids for author, content in SESSION_MESSAGES
+    ])
+    return session_ids
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+async def _drive(client, target: str, total: int, concurrency: int, session_ids: List[str]) -> dict:
+    """Send `total` requests with at most `concurrency` in flight."""
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if target == "plan-trip":
+                    r = await client.post("/plan-trip", json={"query": PLAN_TRIP_QUERIES[i % len(PLAN_TRIP_QUERIES)]})
+                else:
+                    r = await client.get(f"/api/sessions/{session_ids[i % len(session_ids)]}/run-llm")
+                if r.status_code != 200:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput": total / wall,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+async def run(args) -> None:
+    import httpx
+
+    main = fakes = None
+    session_ids = [f"bench-session-{i}" for i in range(args.sessions)]
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=None)
+    else:
+        _configure_offline(args)
+        import fakes
+        import main
+        session_ids = _seed_sessions(main, args.sessions)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=None)
+
+    targets = ["plan-trip", "run-llm"] if args.target == "both" else [args.target]
+    print(f"{'target':<10} {'conc':>5} {'req':>6} {'err':>4} {'req/s':>9} {'mean':>9} {'p50':>9} "
+          f"{'p95':>9} {'p99':>9} {'max':>9}  fake calls/req")
+    async with client:
+        for target in targets:
+            for concurrency in args.concurrency:
+                if fakes:
+                    fakes.reset_call_counts()
+                result = await _drive(client, target, args.requests, concurrency, session_ids)
+                calls = ""
+                if fakes:
+                    calls = ", ".join(f"{k}={v / args.requests:.1f}" for k, v in sorted(fakes.call_counts().items()))
+                print(f"{target:<10} {concurrency:>5} {result['requests']:>6} {result['errors']:>4} "
+                      f"{result['throughput']:>9.1f} {result['mean_ms']:>7.1f}ms {result['p50_ms']:>7.1f}ms "
+                      f"{result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms {result['max_ms']:>7.1f}ms  {calls}")
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark /plan-trip and run-llm at controlled concurrency.")
+    parser.add_argument("--target", choices=["plan-trip", "run-llm", "both"], default="both")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32], help="Comma-separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--sessions", type=int, default=50, help="Distinct sessions for run-llm")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Fake model latency per call")
+    parser.add_argument("--tokens", type=int, default=64, help="Fake model output tokens per reply")
+    parser.add_argument("--maps-latency-ms", type=float, default=0, help="Fake Maps latency per call")
+    parser.add_argument("--maps-qps", type=float, default=1000, help="Gateway rate limit per Google API")
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Vectorized trip budget estimation.
+
+Daily hotel/food/transport costs live in a loadable city cost table
+(`data/city_costs.csv`, or CITY_COSTS_CSV). `estimate_budgets` costs every
+destination x duration x travelers x origin scenario at once with NumPy
+broadcasting, using the offline airport index for flights, and returns the
+scenarios ranked by total cost and filtered by budget.
+"""
+
+import csv
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from airports import get_airport_index, haversine_km, normalize_city
+
+
+CITY_COSTS_CSV = Path(__file__).resolve().parent / "data" / "city_costs.csv"
+
+# Flight fare model (USD per km, one way, per person)
+SHORT_HAUL_KM = 2000
+SHORT_HAUL_COST_PER_KM = 0.20
+LONG_HAUL_COST_PER_KM = 0.25
+TAXES_AND_FEES = 1.25
+
+
+def flight_fare(distance_km):
+    """Estimated one-way fare per person for a flight of `distance_km`. Broadcasts over arrays."""
+    distance_km = np.asarray(distance_km, dtype=np.float64)
+    cost_per_km = np.where(distance_km < SHORT_HAUL_KM, SHORT_HAUL_COST_PER_KM, LONG_HAUL_COST_PER_KM)
+    return distance_km * cost_per_km * TAXES_AND_FEES
+
+
+def _number(value: str):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+class CityCostTable:
+    """Per-day hotel, food and local transport costs by city, stored column-wise."""
+
+    def __init__(self, cities: List[str], hotel, food, transport):
+        self.cities = cities
+        self.hotel = np.asarray(hotel, dtype=np.float64)
+        self.food = np.asarray(food, dtype=np.float64)
+        self.transport = np.asarray(transport, dtype=np.float64)
+        self._by_city = {normalize_city(c): i for i, c in enumerate(cities)}
+
+    @classmethod
+    def from_csv(cls, path=CITY_COSTS_CSV) -> "CityCostTable":
+        cities, hotel, food, transport = [], [], [], []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                cities.append(row["city"])
+                hotel.append(_number(row["hotel"]))
+                food.append(_number(row["food"]))
+                transport.append(_number(row["transport"]))
+        return cls(cities, hotel, food, transport)
+
+    def index_of(self, city: str) -> Optional[int]:
+        return self._by_city.get(normalize_city(city))
+
+    def daily(self, city: str) -> Optional[dict]:
+        """Daily costs for `city`, or None if the city is not in the table."""
+        i = self.index_of(city)
+        if i is None:
+            return None
+        return {
+            "hotel": _number(self.hotel[i]),
+            "food": _number(self.food[i]),
+            "transport": _number(self.transport[i]),
+        }
+
+
+_costs = None
+_costs_lock = threading.Lock()
+
+
+def get_city_costs() -> CityCostTable:
+    """Return the process-wide city cost table, loading it on first use."""
+    global _costs
+    if _costs is None:
+        with _costs_lock:
+            if _costs is None:
+                _costs = CityCostTable.from_csv(os.getenv("CITY_COSTS_CSV") or CITY_COSTS_CSV)
+    return _costs
+
+
+def estimate_budgets(destinations: Sequence[str], durations: Sequence[int] = (3,), travelers: Sequence[int] = (1,),
+                     origins: Optional[Sequence[str]] = None, budget: Optional[float] = None,
+                     limit: Optional[int] = None, costs: Optional[CityCostTable] = None) -> dict:
+    """Cost every destination x duration x travelers x origin scenario in one pass.
+
+    Args:
+        destinations: Candidate destination cities.
+        durations: Candidate trip lengths in days.
+        travelers: Candidate group sizes.
+        origins: Candidate origin cities (optional; round-trip flights are included when given).
+        budget: Maximum total cost (optional).
+        limit: Maximum number of scenarios to return (optional).
+        costs: Cost table to use (defaults to the bundled table).
+
+    Returns:
+        dict with the ranked `scenarios` (cheapest first), evaluation counts and any
+        destinations or origins that could not be resolved. With origins given, a
+        destination that has costs but no known airport cannot be priced and is
+        listed in `unknown_destination_airports` instead.
+    """
+    costs = costs or get_city_costs()
+
+    dest_names, dest_rows, unknown_destinations = [], [], []
+    for city in destinations:
+        i = costs.index_of(city)
+        if i is None:
+            unknown_destinations.append(city)
+        else:
+            dest_names.append(city)
+            dest_rows.append(i)
+
+    dest_rows = np.asarray(dest_rows, dtype=np.intp)
+    days = np.asarray(durations, dtype=np.float64)
+    people = np.asarray(travelers, dtype=np.float64)
+
+    # Axes: (destination, duration, travelers, origin)
+    hotel = costs.hotel[dest_rows][:, None, None, None] * days[None, :, None, None]
+    food = costs.food[dest_rows][:, None, None, None] * days[None, :, None, None] * people[None, None, :, None]
+    transport = costs.transport[dest_rows][:, None, None, None] * days[None, :, None, None] * people[None, None, :, None]
+
+    unknown_origins, unknown_destination_airports = [], []
+    if origins:
+        airports = get_airport_index()
+        origin_names, origin_airports = [], []
+        for city in origins:
+            i = airports.resolve_index(city)
+            if i is None:
+                unknown_origins.append(city)
+            else:
+                origin_names.append(city)
+                origin_airports.append(i)
+
+        dest_airports = [airports.resolve_index(city) for city in dest_names]
+        known = np.array([i is not None for i in dest_airports], dtype=bool)
+        unknown_destination_airports = [city for city, i in zip(dest_names, dest_airports) if i is None]
+        dest_airport_rows = np.array([i if i is not None else 0 for i in dest_airports], dtype=np.intp)
+        origin_airport_rows = np.asarray(origin_airports, dtype=np.intp)
+
+        distance = haversine_km(airports.lat[dest_airport_rows][:, None], airports.lon[dest_airport_rows][:, None],
+                                airports.lat[origin_airport_rows][None, :], airports.lon[origin_airport_rows][None, :])
+        fare = np.where(known[:, None], flight_fare(distance), np.nan)
+        # Round trip for every traveler
+        flights = fare[:, None, None, :] * people[None, None, :, None] * 2
+    else:
+        origin_names = [None]
+        flights = np.zeros((len(dest_names), 1, 1, 1))
+
+    shape = (len(dest_names), len(days), len(people), len(origin_names))
+    total = np.broadcast_to(hotel + food + transport + flights, shape)
+
+    flat_total = total.ravel()
+    mask = np.isfinite(flat_total)
+    if budget is not None:
+        mask &= flat_total <= budget
+    candidates = np.flatnonzero(mask)
+    ranked = candidates[np.argsort(flat_total[candidates], kind="stable")]
+    if limit is not None:
+        ranked = ranked[:limit]
+
+    hotel_b, food_b, transport_b, flights_b = (np.broadcast_to(a, shape).ravel() for a in (hotel, food, transport, flights))
+    d_idx, t_idx, p_idx, o_idx = np.unravel_index(ranked, shape)
+
+    scenarios = []
+    for k, flat in enumerate(ranked):
+        n_people = int(people[p_idx[k]])
+        scenario = {
+            "destination": dest_names[d_idx[k]],
+            "trip_duration_days": int(days[t_idx[k]]),
+            "travelers": n_people,
+            "origin": origin_names[o_idx[k]],
+            "accommodation": round(float(hotel_b[flat]), 2),
+            "food": round(float(food_b[flat]), 2),
+            "local_transport": round(float(transport_b[flat]), 2),
+            "flights": round(float(flights_b[flat]), 2),
+            "total": round(float(flat_total[flat]), 2),
+            "per_person": round(float(flat_total[flat]) / n_people, 2) if n_people else None,
+        }
+        scenarios.append(scenario)
+
+    return {
+        "scenarios": scenarios,
+        "evaluated": int(flat_total.size),
+        "within_budget": int(candidates.size),
+        "unknown_destinations": unknown_destinations,
+        "unknown_origins": unknown_origins,
+        "unknown_destination_airports": unknown_destination_airports,
+    }
@@ -0,0 +1,242 @@
+"""
+Geo-clustered day planner.
+
+Candidate attractions (with coordinates) are split into one cluster per trip
+day with a vectorized k-means pass whose assignment step caps each day at an
+even share of the places, then each day's visits are ordered with
+nearest-neighbour + 2-opt over a great-circle distance matrix. Matrices are
+cached per set of coordinates, so re-planning the same city is cheaper still.
+
+    days = plan_days(places, 3)              # places: [{"name", "lat", "lon", ...}]
+    plan = plan_city_days("Paris", 3)        # fetches candidates through the Maps gateway
+
+Set DAY_PLANNER_ROUTING to a Google travel mode (e.g. "walking") to order each
+day by Distance Matrix durations (distance_service.py, one batched request per
+day) instead of straight-line distance. It is opt-in because those requests are
+billed; the default ("haversine") makes no Google calls.
+
+Laying out 100+ places takes a few milliseconds and no LLM call.
+"""
+
+import functools
+import math
+import os
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from airports import EARTH_RADIUS_KM, haversine_km
+from tracing import traced
+
+
+# Hours budgeted per visit when sightseeing hours per day are given
+VISIT_HOURS = 2
+KMEANS_ITERATIONS = 20
+ROUTING_MODE = os.getenv("DAY_PLANNER_ROUTING", "haversine")
+TWO_OPT_MAX_MOVES = 2000
+
+
+@functools.lru_cache(maxsize=64)
+def _distance_matrix(coords: tuple) -> np.ndarray:
+    """Symmetric great-circle distance matrix (km) for a tuple of (lat, lon) pairs."""
+    points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    lat, lon = points[:, 0], points[:, 1]
+    matrix = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    matrix.setflags(write=False)
+    return matrix
+
+
+def _project(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Equirectangular projection to km around the points' mean latitude (accurate at city scale)."""
+    lat0 = np.radians(lat.mean())
+    return np.stack([np.radians(lon) * math.cos(lat0), np.radians(lat)], axis=1) * EARTH_RADIUS_KM
+
+
+def _assign(sq_dist: np.ndarray, capacity: int) -> np.ndarray:
+    """Assign points to centroids, closest pairs first, with at most `capacity` points per centroid."""
+    n, k = sq_dist.shape
+    labels = np.full(n, -1)
+    counts = np.zeros(k, dtype=int)
+    remaining = n
+    for flat in np.argsort(sq_dist, axis=None).tolist():
+        point, cluster = divmod(flat, k)
+        if labels[point] < 0 and counts[cluster] < capacity:
+            labels[point] = cluster
+            counts[cluster] += 1
+            remaining -= 1
+            if not remaining:
+                break
+    return labels
+
+
+def cluster_days(xy: np.ndarray, days: int, seed: int = 0) -> np.ndarray:
+    """Balanced k-means labels (0..days-1) for projected points `xy` of shape (n, 2)."""
+    n = len(xy)
+    k = min(days, n)
+    capacity = -(-n // k)
+    rng = np.random.default_rng(seed)
+
+    # k-means++ seeding
+    centroids = [xy[rng.integers(n)]]
+    for _ in range(1, k):
+        d2 = ((xy[:, None, :] - np.asarray(centroids)[None, :, :]) ** 2).sum(-1).min(axis=1)
+        total = d2.sum()
+        centroids.append(xy[rng.choice(n, p=d2 / total)] if total > 0 else xy[rng.integers(n)])
+    centroids = np.asarray(centroids)
+
+    labels = None
+    for _ in range(KMEANS_ITERATIONS):
+        sq_dist = ((xy[:, None, :] - centroids[None, :, :]) ** 2).sum(-1)
+        new_labels = _assign(sq_dist, capacity)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = xy[labels == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return labels
+
+
+def _path_length(dist: np.ndarray, path: Sequence[int]) -> float:
+    return float(dist[path[:-1], path[1:]].sum()) if len(path) > 1 else 0.0
+
+
+def order_route(dist: np.ndarray, start: int = 0) -> List[int]:
+    """Open visiting order over `dist` (square matrix) from `start`: nearest neighbour, then 2-opt."""
+    m = len(dist)
+    if m <= 2:
+        return [start] + [i for i in range(m) if i != start]
+
+    path = [start]
+    unvisited = np.ones(m, dtype=bool)
+    unvisited[start] = False
+    for _ in range(m - 1):
+        row = np.where(unvisited, dist[path[-1]], np.inf)
+        nxt = int(row.argmin())
+        path.append(nxt)
+        unvisited[nxt] = False
+
+    # 2-opt on an open path: reversing path[i+1..j] swaps edges (i, i+1), (j, j+1).
+    # All moves are scored at once; the padded row/column m is the "no next stop" sentinel.
+    padded = np.pad(dist, ((0, 1), (0, 1)))
+    path = np.asarray(path)
+    upper = np.triu(np.ones((m, m), dtype=bool), k=2)
+    upper[m - 2:] = False
+    for _ in range(TWO_OPT_MAX_MOVES):
+        nxt = np.append(path[1:], m)
+        a, b = path[:, None], nxt[:, None]
+        c, d = path[None, :], nxt[None, :]
+        delta = padded[a, c] + padded[b, d] - padded[a, b] - padded[c, d]
+        delta[~upper] = 0.0
+        i, j = np.unravel_index(int(delta.argmin()), delta.shape)
+        if delta[i, j] >= -1e-9:
+            break
+        path[i + 1:j + 1] = path[i + 1:j + 1][::-1]
+    return path.tolist()
+
+
+def _select(places: List[dict], limit: Optional[int]) -> List[dict]:
+    """Keep the `limit` best-rated places, preserving their original order."""
+    if not limit or len(places) <= limit:
+        return places
+    ranked = sorted(range(len(places)), key=lambda i: -(places[i].get("rating") or 0))[:limit]
+    return [places[i] for i in sorted(ranked)]
+
+
+def plan_days(places: List[dict], days: int, max_per_day: Optional[int] = None,
+              start: Optional[Sequence[float]] = None, seed: int = 0,
+              day_costs: Optional[Callable[[List[dict]], np.ndarray]] = None) -> List[dict]:
+    """Split places into geographically compact days and order each day's visits.
+
+    Args:
+        places: Candidates with "lat" and "lon" (and optionally "rating"); other keys are kept.
+        days: Number of trip days.
+        max_per_day: Cap on visits per day; the best-rated places are kept when there are too many.
+        start: Optional (lat, lon) each day starts nearest to, e.g. the hotel.
+        seed: Seed for k-means++ initialisation (plans are deterministic per seed).
+        day_costs: Optional function returning the travel cost matrix (e.g. seconds) between one
+            day's places, used to order that day; defaults to great-circle km.
+
+    Returns:
+        One dict per day: {"day", "places" (in visiting order), "distance_km"}.
+    """
+    days = max(1, int(days or 1))
+    places = _select([p for p in places if p.get("lat") is not None and p.get("lon") is not None],
+                     max_per_day * days if max_per_day else None)
+    if not places:
+        return [{"day": d + 1, "places": [], "distance_km": 0.0} for d in range(days)]
+
+    coords = tuple((round(float(p["lat"]), 6), round(float(p["lon"]), 6)) for p in places)
+    dist = _distance_matrix(coords)
+    points = np.asarray(coords)
+    lat, lon = points[:, 0], points[:, 1]
+    labels = cluster_days(_project(lat, lon), days, seed=seed)
+
+    plans = []
+    for c in range(min(days, len(places))):
+        members = np.flatnonzero(labels == c)
+        if not len(members):
+            continue
+        sub = dist[np.ix_(members, members)]
+        if day_costs is not None and len(members) > 2:
+            sub = day_costs([places[i] for i in members])
+        if start is not None:
+            first = int(haversine_km(start[0], start[1], lat[members], lon[members]).argmin())
+        else:
+            # Start at one end of the cluster's widest pair so the route sweeps across it
+            first = int(sub.max(axis=1).argmax())
+        route = members[order_route(sub, first)]
+        plans.append({"places": [places[i] for i in route], "distance_km": round(_path_length(dist, route), 2),
+                      "centroid": (float(lat[members].mean()), float(lon[members].mean()))})
+
+    # Number days west to east so consecutive days are neighbours
+    plans.sort(key=lambda p: (p["centroid"][1], p["centroid"][0]))
+    result = [{"day": d + 1, "places": p["places"], "distance_km": p["distance_km"]} for d, p in enumerate(plans)]
+    result += [{"day": d + 1, "places": [], "distance_km": 0.0} for d in range(len(result), days)]
+    return result
+
+
+def candidates_from_places_result(result: dict) -> List[dict]:
+    """Convert a Places text search response into planner candidates."""
+    candidates = []
+    for place in (result or {}).get("results", []):
+        location = (place.get("geometry") or {}).get("location") or {}
+        if "lat" in location and "lng" in location:
+            candidates.append({
+                "name": place.get("name"),
+                "place_id": place.get("place_id"),
+                "rating": place.get("rating"),
+                "lat": location["lat"],
+                "lon": location["lng"],
+            })
+    return candidates
+
+
+@traced("planner")
+def plan_city_days(city: str, days: int, sightseeing_hours: Optional[int] = None, gateway=None) -> List[dict]:
+    """Fetch tourist attractions in `city` through the Maps gateway and lay them out over `days`.
+
+    Uses the same text search as the `get_tourist_places` tool, so the two share
+    coalesced requests.
+    """
+    if gateway is None:
+        from maps_gateway import get_maps_gateway
+        gateway = get_maps_gateway()
+    result = gateway.places(query=f"tourist attractions in {city}", type="tourist_attraction")
+    max_per_day = max(1, sightseeing_hours // VISIT_HOURS) if sightseeing_hours else None
+    day_costs = None
+    if ROUTING_MODE != "haversine":
+        def day_costs(day_places):
+            return travel_seconds(day_places, ROUTING_MODE)
+    return plan_days(candidates_from_places_result(result), days, max_per_day=max_per_day, day_costs=day_costs)
+
+
+def travel_seconds(places: List[dict], mode: str, service=None) -> np.ndarray:
+    """Travel-time matrix between places from the Distance Matrix API (cached and batched)."""
+    if service is None:
+        from distance_service import get_distance_service
+        service = get_distance_service()
+    _, seconds = service.matrix([(p["lat"], p["lon"]) for p in places], mode=mode)
+    # Unroutable pairs go last
+    return np.nan_to_num(seconds, nan=np.nanmax(seconds, initial=0) * 10 + 1)
@@ -0,0 +1,197 @@
+"""
+Batched, cached travel distances between places through the Maps gateway.
+
+Callers ask for whole N x N matrices (`matrix`) or arbitrary pairs (`pairs`).
+Pairs are treated as symmetric, so A -> B and B -> A are a single cache entry
+and only the upper triangle is fetched. That is an approximation for one-way
+streets, which is fine for ordering visits. Pairs that are not cached are
+packed into as few Distance Matrix requests as Google's limits allow: blocks of
+origins x destinations, at most MAX_ELEMENTS elements and MAX_DIMENSION
+locations per side. Results are cached per pair for DISTANCE_CACHE_TTL_SECONDS.
+
+Locations may be "lat,lng" strings, (lat, lng) tuples, "place_id:..." strings
+or addresses.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+# Google Distance Matrix limits per request
+MAX_ELEMENTS = 100
+MAX_DIMENSION = 25
+
+CACHE_TTL_SECONDS = float(os.getenv("DISTANCE_CACHE_TTL_SECONDS", "86400"))
+CACHE_MAX_ENTRIES = int(os.getenv("DISTANCE_CACHE_MAX_ENTRIES", "50000"))
+
+Location = Union[str, Tuple[float, float]]
+
+
+def location_key(location: Location) -> str:
+    """Canonical string for a location (tuples become "lat,lng" rounded to 6 places)."""
+    if isinstance(location, (tuple, list)):
+        return f"{round(float(location[0]), 6)},{round(float(location[1]), 6)}"
+    return " ".join(str(location).split())
+
+
+def _pair_key(mode: str, a: str, b: str) -> tuple:
+    return (mode, a, b) if a <= b else (mode, b, a)
+
+
+def plan_batches(pairs: Iterable[Tuple[str, str]]) -> List[Tuple[List[str], List[str]]]:
+    """Group unordered pairs into (origins, destinations) requests within Google's limits.
+
+    Locations are split into blocks of sqrt(MAX_ELEMENTS); each block pair that
+    holds a wanted pair becomes one request, trimmed to the locations involved.
+    Only block pairs with i <= j are requested, since the distances are symmetric.
+    """
+    pairs = {(a, b) if a <= b else (b, a) for a, b in pairs if a != b}
+    locations = sorted({x for pair in pairs for x in pair})
+    size = min(MAX_DIMENSION, int(math.isqrt(MAX_ELEMENTS)))
+    block_of = {loc: i // size for i, loc in enumerate(locations)}
+
+    grouped: Dict[Tuple[int, int], set] = {}
+    for a, b in pairs:
+        grouped.setdefault((block_of[a], block_of[b]), set()).add((a, b))
+
+    batches = []
+    for _, block_pairs in sorted(grouped.items()):
+        origins = sorted({a for a, _ in block_pairs})
+        destinations = sorted({b for _, b in block_pairs})
+        batches.append((origins, destinations))
+    return batches
+
+
+class DistanceService:
+    """Symmetric per-pair cache in front of batched Distance Matrix requests."""
+
+    def __init__(self, gateway=None, ttl_seconds: float = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self._gateway = gateway
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # pair key -> (expires_at, meters, seconds); meters is None when Google found no route
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.elements = 0
+
+    @property
+    def gateway(self):
+        if self._gateway is None:
+            from maps_gateway import get_maps_gateway
+            self._gateway = get_maps_gateway()
+        return self._gateway
+
+    def _lookup(self, key: tuple, now: float) -> Optional[tuple]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry
+
+    def _store(self, key: tuple, meters, seconds, now: float) -> None:
+        self._cache[key] = (now + self.ttl_seconds, meters, seconds)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _fetch(self, batches: List[Tuple[List[str], List[str]]], mode: str) -> None:
+        for origins, destinations in batches:
+            response = self.gateway.distance_matrix(origins, destinations, mode=mode)
+            now = time.monotonic()
+            with self._lock:
+                self.requests += 1
+                self.elements += len(origins) * len(destinations)
+                for origin, row in zip(origins, response.get("rows", [])):
+                    for destination, element in zip(destinations, row.get("elements", [])):
+                        if origin == destination:
+                            continue
+                        if element.get("status") == "OK":
+                            meters, seconds = element["distance"]["value"], element["duration"]["value"]
+                        else:
+                            meters = seconds = None
+                        self._store(_pair_key(mode, origin, destination), meters, seconds, now)
+
+    def pairs(self, pairs: Sequence[Tuple[Location, Location]], mode: str = "driving") -> Dict[tuple, tuple]:
+        """(meters, seconds) for each (a, b) pair; None values where no route exists.
+
+        Returns a dict keyed by the canonical (a, b) location strings as given.
+        """
+        wanted = [(location_key(a), location_key(b)) for a, b in pairs]
+        now = time.monotonic()
+        missing = set()
+        with self._lock:
+            for a, b in wanted:
+                if a != b and self._lookup(_pair_key(mode, a, b), now) is None:
+                    missing.add((a, b) if a <= b else (b, a))
+            self.hits += len(wanted) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            self._fetch(plan_batches(missing), mode)
+
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for a, b in wanted:
+                if a == b:
+                    result[(a, b)] = (0, 0)
+                    continue
+                # Fetched entries are fresh; a missing entry means the response omitted it
+                entry = self._lookup(_pair_key(mode, a, b), now)
+                result[(a, b)] = (entry[1], entry[2]) if entry else (None, None)
+        return result
+
+    def matrix(self, locations: Sequence[Location], mode: str = "driving") -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric N x N (meters, seconds) matrices; NaN where no route exists.
+
+        All uncached pairs are fetched together, in ceil(N / 10)^2 / 2 requests at most.
+        """
+        keys = [location_key(loc) for loc in locations]
+        n = len(keys)
+        upper = [(keys[i], keys[j]) for i in range(n) for j in range(i + 1, n)]
+        found = self.pairs(upper, mode=mode)
+
+        meters = np.zeros((n, n))
+        seconds = np.zeros((n, n))
+        for i in range(n):
+            for j in range(i + 1, n):
+                m, s = found[(keys[i], keys[j])]
+                meters[i, j] = meters[j, i] = np.nan if m is None else m
+                seconds[i, j] = seconds[j, i] = np.nan if s is None else s
+        return meters, seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "requests": self.requests,
+                "elements": self.elements,
+                "cached_pairs": len(self._cache),
+            }
+
+
+_distance_service = None
+_distance_service_lock = threading.Lock()
+
+
+def get_distance_service() -> DistanceService:
+    """Return the process-wide distance service, creating it on first use."""
+    global _distance_service
+    if _distance_service is None:
+        with _distance_service_lock:
+            if _distance_service is None:
+                _distance_service = DistanceService()
+    return _distance_service
@@ -0,0 +1,248 @@
+"""
+Offline stand-ins for OpenAI and Google Maps.
+
+- `FakeChatModel`: deterministic LangChain chat model with configurable latency
+  and output length. When tools are bound (the ReAct agent) it first calls
+  `get_tourist_places` for the destination in the user's message, then answers.
+- `FakeMapsClient`: drop-in for `googlemaps.Client` serving the recorded
+  responses in `data/maps_fixtures.json`, and deterministic synthetic responses
+  (including solid-colour PNG photos) for anything not recorded.
+
+Enable them with environment variables (see `main.get_llm` and
+`maps_gateway.get_maps_gateway`):
+
+    LLM_FAKE=1               FAKE_LLM_LATENCY_MS, FAKE_LLM_TOKEN_LATENCY_MS, FAKE_LLM_TOKENS
+    GOOGLE_MAPS_FAKE=1       FAKE_MAPS_LATENCY_MS
+"""
+
+import hashlib
+import json
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from prompt_compaction import estimate_tokens
+from trip_intent import parse_trip_query
+
+
+FIXTURES_PATH = Path(__file__).resolve().parent / "data" / "maps_fixtures.json"
+
+_VOCABULARY = (
+    "trip day morning visit museum walk lunch local market dinner evening river old town "
+    "train hotel budget view garden temple beach tour guide coffee street food night rest"
+).split()
+
+_calls = Counter()
+_calls_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _calls_lock:
+        _calls[name] += 1
+
+
+def call_counts() -> dict:
+    """Calls made to the fakes in this process, by kind."""
+    with _calls_lock:
+        return dict(_calls)
+
+
+def reset_call_counts() -> None:
+    with _calls_lock:
+        _calls.clear()
+
+
+def _seed(*parts: Any) -> int:
+    digest = hashlib.blake2b(json.dumps(parts, sort_keys=True, default=str).encode("utf-8"), digest_size=8)
+    return int.from_bytes(digest.digest(), "big")
+
+
+def _env_ms(name: str, default: str = "0") -> float:
+    return float(os.getenv(name, default)) / 1000
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model: the same messages always produce the same reply."""
+
+    latency_seconds: float = 0.0
+    token_latency_seconds: float = 0.0
+    tokens: int = 64
+    call_tools: bool = True
+    bound_tools: List[str] = []
+
+    @classmethod
+    def from_env(cls) -> "FakeChatModel":
+        return cls(
+            latency_seconds=_env_ms("FAKE_LLM_LATENCY_MS"),
+            token_latency_seconds=_env_ms("FAKE_LLM_TOKEN_LATENCY_MS"),
+            tokens=int(os.getenv("FAKE_LLM_TOKENS", "64")),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, *, tool_choice: Optional[str] = None, **kwargs):
+        names = [getattr(t, "name", None) or getattr(t, "__name__", None) or t.get("name") for t in tools]
+        return self.model_copy(update={"bound_tools": names})
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = "\n".join(str(m.content) for m in messages)
+        usage = {"input_tokens": estimate_tokens(prompt), "output_tokens": self.tokens,
+                 "total_tokens": estimate_tokens(prompt) + self.tokens}
+
+        last = messages[-1] if messages else None
+        if self.call_tools and "get_tourist_places" in self.bound_tools and isinstance(last, HumanMessage):
+            destination = parse_trip_query(str(last.content))["destination"]
+            if destination:
+                call_id = f"call_{_seed(prompt, destination):x}"
+                usage.update(output_tokens=8, total_tokens=usage["input_tokens"] + 8)
+                return AIMessage(content="", usage_metadata=usage, tool_calls=[
+                    {"name": "get_tourist_places", "args": {"city": destination}, "id": call_id},
+                ])
+
+        rng = random.Random(_seed(prompt, self.tokens))
+        words = [rng.choice(_VOCABULARY) for _ in range(self.tokens)]
+        if isinstance(last, ToolMessage):
+            words.insert(0, "Based on the places found:")
+        return AIMessage(content=" ".join(words), usage_metadata=usage)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        _count("llm")
+        message = self._reply(messages)
+        time.sleep(self.latency_seconds + self.token_latency_seconds * self.tokens)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        _count("llm")
+        message = self._reply(messages)
+        time.sleep(self.latency_seconds)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": 0}
+                for c in message.tool_calls
+            ], usage_metadata=message.usage_metadata))
+            return
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.token_latency_seconds)
+            chunk = AIMessageChunk(content=word if i == len(words) - 1 else word + " ")
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=chunk)
+            yield ChatGenerationChunk(message=chunk)
+
+
+def _png(width: int, height: int, rgb: tuple) -> bytes:
+    """Encode a solid-colour RGB PNG."""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    row = b"\x00" + bytes(rgb) * width
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * height))
+            + chunk(b"IEND", b""))
+
+
+class FakeMapsClient:
+    """Offline `googlemaps.Client` for `places`, `place` and `distance_matrix`."""
+
+    def __init__(self, fixtures_path=FIXTURES_PATH, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.fixtures = {"places": {}, "place": {}}
+        if fixtures_path and Path(fixtures_path).exists():
+            with open(fixtures_path, encoding="utf-8") as f:
+                self.fixtures.update(json.load(f))
+        self.fixture_hits = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeMapsClient":
+        return cls(latency_seconds=_env_ms("FAKE_MAPS_LATENCY_MS"))
+
+    def _respond(self, kind: str, key: Optional[str], synthesize):
+        _count(f"maps.{kind}")
+        time.sleep(self.latency_seconds)
+        recorded = self.fixtures.get(kind, {}).get(key)
+        if recorded is not None:
+            self.fixture_hits += 1
+            return recorded
+        return synthesize()
+
+    def places(self, query: Optional[str] = None, type: Optional[str] = None, **kwargs) -> dict:
+        key = " ".join((query or "").lower().split())
+
+        def synthesize():
+            rng = random.Random(_seed("places", key, type))
+            subject = key.split(" in ")[-1].title() if " in " in key else "City"
+            kind = "Restaurant" if type == "restaurant" or "restaurant" in key else "Landmark"
+            # Places scattered within ~10 km of a per-city centre
+            city_rng = random.Random(_seed("city", subject))
+            lat, lng = city_rng.uniform(-50, 60), city_rng.uniform(-180, 180)
+            return {"status": "OK", "results": [
+                {
+                    "name": f"{subject} {kind} {i + 1}",
+                    "place_id": f"fake-{_seed(key, i):x}",
+                    "rating": round(rng.uniform(3.5, 5.0), 1),
+                    "price_level": rng.randint(1, 4),
+                    "vicinity": f"{rng.randint(1, 200)} Main Street, {subject}",
+                    "geometry": {"location": {"lat": round(lat + rng.uniform(-0.09, 0.09), 6),
+                                              "lng": round(lng + rng.uniform(-0.12, 0.12), 6)}},
+                }
+                for i in range(10)
+            ]}
+
+        return self._respond("places", key, synthesize)
+
+    def place(self, place_id: str, fields: Optional[List[str]] = None, **kwargs) -> dict:
+        def synthesize():
+            rng = random.Random(_seed("place", place_id))
+            return {"status": "OK", "result": {
+                "photos": [{"photo_reference": f"{place_id}-photo-{i}", "width": 400, "height": 300} for i in range(3)],
+                "formatted_phone_number": f"+1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+                "opening_hours": {"weekday_text": [f"{d}: 9:00 AM – 10:00 PM" for d in ("Monday", "Tuesday", "Wednesday")]},
+            }}
+
+        return self._respond("place", place_id, synthesize)
+
+    def places_photo(self, photo_reference: str, max_width: Optional[int] = None,
+                     max_height: Optional[int] = None) -> Iterator[bytes]:
+        def synthesize():
+            width = min(max_width or 800, 1600)
+            rgb = tuple(_seed("photo", photo_reference).to_bytes(8, "big")[:3])
+            data = _png(width, width * 2 // 3, rgb)
+            # Streamed in chunks like the real client
+            return (data[i:i + 8192] for i in range(0, len(data), 8192))
+
+        return self._respond("photo", None, synthesize)
+
+    def distance_matrix(self, origins, destinations, mode: Optional[str] = None, **kwargs) -> dict:
+        origins = [origins] if isinstance(origins, str) else list(origins)
+        destinations = [destinations] if isinstance(destinations, str) else list(destinations)
+
+        def element(o, d):
+            if o == d:
+                meters = 0
+            else:
+                meters = 500 + _seed(*sorted((str(o), str(d)))) % 20000
+            seconds = int(meters / (12 if mode in (None, "driving", "transit") else 1.4))
+            return {"status": "OK", "distance": {"value": meters, "text": f"{meters / 1000:.1f} km"},
+                    "duration": {"value": seconds, "text": f"{seconds // 60} mins"}}
+
+        return self._respond("distance_matrix", None, lambda: {
+            "status": "OK",
+            "origin_addresses": [str(o) for o in origins],
+            "destination_addresses": [str(d) for d in destinations],
+            "rows": [{"elements": [element(o, d) for d in destinations]} for o in origins],
+        })
@@ -0,0 +1,85 @@
+"""
+Import-time profile for the LLM service.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and reports
+the total import time and the slowest modules, then (optionally) how long it
+takes to build the workflow, agent and tools on first use:
+
+    python import_profile.py [--top N] [--warmup]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+HERE = Path(__file__).resolve().parent
+
+_WARMUP_SNIPPET = """
+import time
+t = time.perf_counter(); import main; print(f"import main\\t{time.perf_counter() - t:.3f}")
+for name in ("get_workflow", "get_llm", "get_agent"):
+    t = time.perf_counter()
+    try:
+        getattr(main, name)()
+        print(f"{name}()\\t{time.perf_counter() - t:.3f}")
+    except Exception as e:
+        print(f"{name}()\\tfailed: {e}")
+"""
+
+
+def profile_imports(module: str = "main") -> list:
+    """Return (module, self_us, cumulative_us, depth) rows from `-X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented two spaces per level below the module that triggered them
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import-time cost of the LLM service.")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--warmup", action="store_true", help="Also time building the workflow, LLM and agent")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = profile_imports(args.module)
+    wall = time.perf_counter() - start
+
+    total_us = sum(r[2] for r in rows if r[3] == 0)
+    print(f"Interpreter + import {args.module}: {wall:.3f}s wall, {total_us / 1e6:.3f}s in imports, {len(rows)} modules")
+
+    direct = [r for r in rows if r[3] == 1]
+    print(f"\nSlowest imports made by {args.module} (cumulative):")
+    for name, _, cumulative_us, _ in sorted(direct, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+
+    print("\nSlowest modules (self):")
+    for name, self_us, _, _ in sorted(rows, key=lambda r: -r[1])[:args.top]:
+        print(f"  {self_us / 1000:9.1f} ms  {name}")
+
+    if args.warmup:
+        print("\nFirst-use construction:")
+        result = subprocess.run([sys.executable, "-c", _WARMUP_SNIPPET], cwd=HERE, capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            name, seconds = line.split("\t")
+            print(f"  {seconds:>9}  {name}")
+
+
+if __name__ == "__main__":
+    main()
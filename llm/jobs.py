@@ -0,0 +1,238 @@
+"""
+Bounded in-process job queue for long-running LLM work.
+
+`JobQueue.submit` records a job in a pluggable store and runs it on a fixed-size
+worker pool; callers poll the store for status and results. At most
+`max_workers` jobs run at once and at most `max_pending` wait, so slow LLM runs
+cannot starve the HTTP workers serving fast endpoints.
+
+Stores:
+- `MemoryJobStore`: process-local, for development and tests.
+- `MongoJobStore`: persists jobs and results so they survive restarts and can be
+  read from any replica; finished jobs are also cached in memory.
+
+Unfinished jobs hold a lease: the queue that owns them refreshes their
+`heartbeat_at` every `lease_seconds / 3`. A job whose lease ran out belonged to
+a process that died; every queue marks such jobs `failed` when it starts and on
+each heartbeat, so they never stay `queued` or `running` forever.
+"""
+
+import datetime
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+INTERRUPTED_ERROR = "Job was interrupted: its worker stopped before it finished"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds `max_pending` waiting jobs."""
+
+
+class MemoryJobStore:
+    """Keeps jobs in a bounded in-process dict (oldest evicted first)."""
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job: dict) -> None:
+        with self._lock:
+            self._jobs[job["_id"]] = dict(job)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def update(self, job_id: str, fields: dict) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def heartbeat(self, job_ids: list, at: datetime.datetime) -> None:
+        with self._lock:
+            for job_id in job_ids:
+                if job_id in self._jobs:
+                    self._jobs[job_id]["heartbeat_at"] = at
+
+    def fail_expired(self, cutoff: datetime.datetime, fields: dict) -> int:
+        """Apply `fields` to unfinished jobs whose lease ended before `cutoff`."""
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.get("status") not in FINISHED_STATUSES and _lease_start(job) < cutoff]
+            for job in expired:
+                job.update(fields)
+            return len(expired)
+
+
+class MongoJobStore:
+    """Persists jobs in a Mongo collection; finished jobs are served from memory.
+
+    A TTL index on `created_at` expires jobs after `ttl_seconds`, the persistent
+    counterpart of the memory store's eviction.
+    """
+
+    def __init__(self, collection, cache_size: int = 1000, ttl_seconds: int = 7 * 24 * 3600):
+        self.collection = collection
+        self._finished = MemoryJobStore(max_jobs=cache_size)
+        self.collection.create_index("created_at", expireAfterSeconds=ttl_seconds)
+
+    def create(self, job: dict) -> None:
+        self.collection.insert_one(dict(job))
+
+    def update(self, job_id: str, fields: dict) -> None:
+        self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._finished.get(job_id)
+        if job:
+            return job
+        job = self.collection.find_one({"_id": job_id})
+        if job and job.get("status") in FINISHED_STATUSES:
+            # Finished jobs never change again
+            self._finished.create(job)
+        return job
+
+    def heartbeat(self, job_ids: list, at: datetime.datetime) -> None:
+        if job_ids:
+            self.collection.update_many({"_id": {"$in": list(job_ids)}}, {"$set": {"heartbeat_at": at}})
+
+    def fail_expired(self, cutoff: datetime.datetime, fields: dict) -> int:
+        """Apply `fields` to unfinished jobs whose lease ended before `cutoff`."""
+        return self.collection.update_many({
+            "status": {"$nin": list(FINISHED_STATUSES)},
+            "$or": [
+                {"heartbeat_at": {"$lt": cutoff}},
+                # Jobs written before leases existed
+                {"heartbeat_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+            ],
+        }, {"$set": fields}).modified_count
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.utcnow()
+
+
+def _lease_start(job: dict) -> datetime.datetime:
+    return job.get("heartbeat_at") or job.get("created_at") or datetime.datetime.min
+
+
+class JobQueue:
+    """Runs submitted callables on a bounded worker pool and records their outcome."""
+
+    def __init__(self, store, max_workers: int = 4, max_pending: int = 100, lease_seconds: float = 60):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-job")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        # Unfinished jobs owned by this queue, whose leases it keeps alive
+        self._active = set()
+        self.interrupted = 0
+        self._stopped = threading.Event()
+        self.fail_interrupted()
+        threading.Thread(target=self._heartbeat_loop, name="llm-job-heartbeat", daemon=True).start()
+
+    def fail_interrupted(self) -> int:
+        """Mark jobs whose lease ran out (their process died) as failed."""
+        now = _now()
+        count = self.store.fail_expired(now - datetime.timedelta(seconds=self.lease_seconds), {
+            "status": FAILED, "error": INTERRUPTED_ERROR, "finished_at": now,
+        })
+        with self._lock:
+            self.interrupted += count
+        return count
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                with self._lock:
+                    active = list(self._active)
+                self.store.heartbeat(active, _now())
+                self.fail_interrupted()
+            except Exception as e:
+                print(f"Job heartbeat failed: {e}")
+
+    def submit(self, kind: str, func: Callable[[], dict], params: Optional[dict] = None) -> dict:
+        """Queue `func` and return the new job record.
+
+        Raises:
+            QueueFullError: if `max_pending` jobs are already waiting.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({self.max_pending} pending)")
+            self._pending += 1
+
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "params": params or {},
+            "status": QUEUED,
+            "result": None,
+            "error": None,
+            "created_at": _now(),
+            "heartbeat_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        try:
+            self.store.create(job)
+            with self._lock:
+                self._active.add(job["_id"])
+            self._executor.submit(self._run, job["_id"], func)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self._active.discard(job["_id"])
+            raise
+        return job
+
+    def _run(self, job_id: str, func: Callable[[], dict]) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._running += 1
+        try:
+            self.store.update(job_id, {"status": RUNNING, "started_at": _now()})
+            try:
+                result = func()
+                self.store.update(job_id, {"status": SUCCEEDED, "result": result, "finished_at": _now()})
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                self.store.update(job_id, {"status": FAILED, "error": str(detail), "finished_at": _now()})
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._active.discard(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.store.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "pending": self._pending,
+                "interrupted": self.interrupted,
+            }
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
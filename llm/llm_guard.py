@@ -0,0 +1,342 @@
+"""
+Outbound guard for OpenAI calls made by the LLM service.
+
+`LLMGuard.call` wraps a model or agent call with:
+- an AIMD adaptive concurrency limit (additive increase on success, halved on
+  429s, 5xx and timeouts), so provider slowdowns shrink our in-flight requests
+  instead of piling up workers
+- a per-call deadline covering slot waits, attempts and backoff; an attempt
+  still running at the deadline is abandoned (it runs in a worker thread), but
+  keeps its concurrency slot until the provider call actually returns
+- retries with full-jitter exponential backoff (honouring Retry-After) on 429/5xx,
+  timeouts and connection errors
+- a circuit breaker that fails fast, with an optional fallback, after repeated failures
+
+Only the standard library is used, so importing this module stays cheap.
+"""
+
+import contextvars
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+# Timeout of a single HTTP request to the provider (the chat model is built with it)
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+# Default deadline for one guarded call, including retries
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "120"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 10.0
+
+CONCURRENCY_INITIAL = int(os.getenv("LLM_CONCURRENCY_INITIAL", "8"))
+CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "32"))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Exception class names (openai / httpx) treated as transient
+_TRANSIENT_ERRORS = {"APITimeoutError", "APIConnectionError", "Timeout", "TimeoutException", "ConnectError"}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and no fallback was given."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call cannot complete before its deadline."""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(error: Exception) -> bool:
+    """True for rate limiting (429), server errors (5xx), timeouts and connection errors."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, TimeoutError) or type(error).__name__ in _TRANSIENT_ERRORS
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _attempt(func: Callable[[], Any], timeout: float, done: Callable[[], None]) -> Any:
+    """Run `func` in a worker thread and give up waiting for it after `timeout` seconds.
+
+    `done` runs in the worker once `func` returns, even if the caller gave up on it.
+    """
+    outcome = {}
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            outcome["result"] = context.run(func)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done()
+
+    worker = threading.Thread(target=run, name="llm-guard-attempt", daemon=True)
+    worker.start()
+    worker.join(max(timeout, 0.0))
+    if worker.is_alive():
+        raise DeadlineExceeded("LLM attempt did not finish before the deadline")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit: +1/limit per success, halved on overload."""
+
+    def __init__(self, initial: int = CONCURRENCY_INITIAL, minimum: int = CONCURRENCY_MIN,
+                 maximum: int = CONCURRENCY_MAX):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a slot. Returns False if none freed up."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, overloaded: Optional[bool] = None) -> None:
+        """Free a slot; `overloaded` True shrinks the limit, False grows it, None leaves it."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+        self.adjust(overloaded)
+
+    def adjust(self, overloaded: Optional[bool]) -> None:
+        """Grow (False) or shrink (True) the limit after an attempt; None leaves it."""
+        with self._cond:
+            if overloaded:
+                self.limit = max(self.minimum, self.limit / 2)
+                self.decreases += 1
+            elif overloaded is False and self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.increases += 1
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; lets one probe through after `reset_seconds`."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_seconds
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def abandon(self) -> None:
+        """The allowed call never reached the provider; let another probe through."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LLMGuard:
+    """Concurrency limit, deadline, retries and circuit breaker around outbound LLM calls."""
+
+    def __init__(self, limiter: Optional[AdaptiveLimiter] = None, breaker: Optional[CircuitBreaker] = None,
+                 max_retries: int = MAX_RETRIES, deadline_seconds: float = DEFAULT_DEADLINE_SECONDS):
+        self.limiter = limiter or AdaptiveLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.deadline_seconds = deadline_seconds
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _count(self, operation: str, name: str, value: float = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(operation, {
+                "calls": 0, "successes": 0, "failures": 0, "retries": 0, "timeouts": 0,
+                "rejected": 0, "fallbacks": 0, "total_latency": 0.0,
+            })
+            counters[name] += value
+
+    def is_open(self) -> bool:
+        """True while the breaker is failing fast."""
+        return self.breaker.is_open()
+
+    def call(self, operation: str, func: Callable[[], Any], deadline_seconds: Optional[float] = None,
+             fallback: Optional[Callable[[], Any]] = None) -> Any:
+        """Run `func` under the guard.
+
+        Args:
+            operation: Name used for metrics (e.g. "agent", "llm", "summarize").
+            func: Zero-argument callable making the outbound call.
+            deadline_seconds: Overall deadline for slot waits, attempts and backoff.
+            fallback: Called instead of raising when the breaker is open or retries are exhausted.
+
+        Raises:
+            CircuitOpenError: if the breaker is open and there is no fallback.
+            DeadlineExceeded: if no concurrency slot frees up, or the last attempt does
+                not finish, before the deadline (and there is no fallback).
+        """
+        self._count(operation, "calls")
+        if not self.breaker.allow():
+            self._count(operation, "rejected")
+            if fallback is not None:
+                self._count(operation, "fallbacks")
+                return fallback()
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+        deadline = time.monotonic() + (self.deadline_seconds if deadline_seconds is None else deadline_seconds)
+        if deadline <= time.monotonic():
+            # A caller's shared budget is already spent
+            self._count(operation, "timeouts")
+            self.breaker.abandon()
+            if fallback is not None:
+                self._count(operation, "fallbacks")
+                return fallback()
+            raise DeadlineExceeded(f"No time left before the deadline ({operation})")
+        attempt = 0
+        while True:
+            if not self.limiter.acquire(deadline - time.monotonic()):
+                self._count(operation, "timeouts")
+                self.breaker.abandon()
+                raise DeadlineExceeded(f"No LLM concurrency slot available before the deadline ({operation})")
+
+            start = time.perf_counter()
+            try:
+                # The worker frees the slot when the provider call returns, so abandoned
+                # attempts still count against the limit
+                result = _attempt(func, deadline - time.monotonic(), self.limiter.release)
+            except Exception as e:
+                self._count(operation, "total_latency", time.perf_counter() - start)
+                transient = is_transient(e)
+                self.limiter.adjust(overloaded=transient)
+                if isinstance(e, TimeoutError) or type(e).__name__ in _TRANSIENT_ERRORS:
+                    self._count(operation, "timeouts")
+                if not transient:
+                    # The provider answered (e.g. a 400); that says nothing about its health
+                    self.breaker.record_success()
+                    self._count(operation, "failures")
+                    raise
+
+                delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                delay = max(delay, _retry_after(e) or 0.0)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.breaker.record_failure()
+                    self._count(operation, "failures")
+                    if fallback is not None:
+                        self._count(operation, "fallbacks")
+                        return fallback()
+                    raise
+                attempt += 1
+                self._count(operation, "retries")
+                time.sleep(delay)
+                continue
+
+            self._count(operation, "total_latency", time.perf_counter() - start)
+            self.limiter.adjust(overloaded=False)
+            self.breaker.record_success()
+            self._count(operation, "successes")
+            return result
+
+    def stats(self) -> dict:
+        """Snapshot of limiter, breaker and per-operation counters."""
+        with self._lock:
+            operations = {}
+            for operation, c in self._counters.items():
+                attempts = c["successes"] + c["failures"] + c["retries"]
+                operations[operation] = {
+                    **{k: v for k, v in c.items() if k != "total_latency"},
+                    "avg_attempt_latency_ms": round(c["total_latency"] / attempts * 1000, 2) if attempts else 0.0,
+                }
+        limiter, breaker = self.limiter, self.breaker
+        return {
+            "concurrency": {
+                "limit": round(limiter.limit, 2),
+                "in_flight": limiter.in_flight,
+                "min": limiter.minimum,
+                "max": limiter.maximum,
+                "increases": limiter.increases,
+                "decreases": limiter.decreases,
+            },
+            "breaker": {
+                "state": breaker.state,
+                "consecutive_failures": breaker.consecutive_failures,
+                "times_opened": breaker.times_opened,
+            },
+            "operations": operations,
+        }
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+
+def get_llm_guard() -> LLMGuard:
+    """Return the process-wide guard, creating it on first use."""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = LLMGuard()
+    return _guard
@@ -1,347 +1,173 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import json
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
-import googlemaps
-import random
-from langchain.tools import tool
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage
-from langgraph.graph import StateGraph, START, END
 from typing import TypedDict
-from pymongo import MongoClient
-import datetime
-from bson import ObjectId
 
-# Load environment variables
-load_dotenv()
-
-app = FastAPI(title="Travel Planner API", description="API for planning trips using LangGraph and LangChain tools")
-
-
-class QueryRequest(BaseModel):
-    query: str
-
-# Define the tools
-@tool
-def get_tourist_places(city: str) -> str:
-    """Fetch a list of popular tourist attractions/places in a given city using Google Places API, including images.
-
-    Args:
-        city: Name of the city to search for tourism spots.
+from prompt_compaction import estimate_tokens
+from llm_guard import CircuitOpenError, REQUEST_TIMEOUT_SECONDS, get_llm_guard
+from session_summary import SUMMARIES_COLLECTION, build_session_context, render_context
+from single_flight import SingleFlight
+import tracing
+from tracing import traced
+from trip_intent import missing_fields, parse_trip_query
 
-    Returns:
-        Formatted string with place names and image URLs in markdown format.
-    """
-    try:
-        # Get API key from environment
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            return "Google API key not found. Please set GOOGLE_API_KEY environment variable."
-
-        # Initialize Google Maps client
-        gmaps = googlemaps.Client(key=api_key)
-
-        # Search for tourist attractions in the city
-        query = f"tourist attractions in {city}"
-        places_result = gmaps.places(query=query, type='tourist_attraction')
-
-        if 'results' in places_result and places_result['results']:
-            response_lines = [f"**Popular Tourist Attractions in {city}:**\n"]
-
-            for place in places_result['results'][:10]:  # Limit to 10 results
-                place_name = place['name']
-                response_lines.append(f"### {place_name}")
-
-                # Get place details to fetch photos
-                place_id = place['place_id']
-                place_details = gmaps.place(place_id=place_id, fields=['photo'])
-
-                if 'result' in place_details and 'photos' in place_details['result']:
-                    photos = place_details['result']['photos'][:3]  # Limit to 3 photos per place
-                    for photo in photos:
-                        photo_reference = photo['photo_reference']
-                        # Construct photo URL
-                        photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photoreference={photo_reference}&key={api_key}"
-                        # Add as markdown image
-                        response_lines.append(f"![{place_name}]({photo_url})")
-                else:
-                    response_lines.append("*No images available*")
-
-                response_lines.append("")  # Add blank line between places
-
-            return "\n".join(response_lines)
-        else:
-            return f"No tourist attractions found for {city}."
+# Heavy dependencies (langchain, langgraph, OpenAI, googlemaps, NumPy, pymongo) are
+# imported inside the getters below so the app starts serving /health right away.
+# Run `python import_profile.py` for an import-time report.
 
-    except Exception as e:
-        return f"Error fetching tourist places: {str(e)}"
-
-
-@tool
-def get_restaurants(city: str, cuisine_type: Optional[str] = None) -> str:
-    """Fetch a list of popular restaurants in a given city using Google Places API, including images and ratings.
+# Load environment variables
+load_dotenv()
 
-    Args:
-        city: Name of the city to search for restaurants.
-        cuisine_type: Optional cuisine type (e.g., 'italian', 'chinese', 'indian').
+MONGO_URI = os.getenv("MONGO_URI") or "mongodb+srv://cluster0.p0litw.mongodb.net/?authSource=%24external&authMechanism=MONGODB-X509&appName=Cluster0"
 
-    Returns:
-        Formatted string with restaurant names, ratings, and image URLs in markdown format.
+_llm = None
+_agent = None
+_compiled_workflow = None
+_mongo_client = None
+_job_queue = None
+_init_lock = threading.RLock()
+# Concurrent runs for the same session and latest message share one LLM call
+_llm_runs = SingleFlight()
+# Monotonic deadline shared by every guarded model call of one LLM run
+_run_deadline = ContextVar("llm_run_deadline", default=None)
+
+
+def _remaining_budget() -> Optional[float]:
+    """Seconds left of the current run's deadline; None outside a run (the guard's default applies)."""
+    deadline = _run_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def get_llm():
+    """Return the shared chat model, building it on first use."""
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None and os.getenv("LLM_FAKE") == "1":
+                # Offline deterministic model (fakes.py)
+                from fakes import FakeChatModel
+                _llm = FakeChatModel.from_env()
+            elif _llm is None:
+                from langchain_openai import ChatOpenAI
+                # Retries are handled by the outbound guard (llm_guard.py)
+                _llm = ChatOpenAI(model="gpt-4", timeout=REQUEST_TIMEOUT_SECONDS, max_retries=0)
+    return _llm
+
+
+def get_agent():
+    """Return the ReAct agent with the travel tools, building it on first use."""
+    global _agent
+    if _agent is None:
+        with _init_lock:
+            if _agent is None:
+                from langchain.agents import create_agent
+                from langchain.agents.middleware import wrap_model_call
+                from tools import TOOLS
+
+                # Guard each model step rather than the whole run, so a retry never repeats tool calls
+                @wrap_model_call
+                def guard_model_call(request, handler):
+                    return get_llm_guard().call("agent", lambda: handler(request), deadline_seconds=_remaining_budget())
+
+                _agent = create_agent(get_llm(), TOOLS, middleware=[guard_model_call])
+    return _agent
+
+
+def get_workflow():
+    """Return the compiled trip planning workflow, building it on first use."""
+    global _compiled_workflow
+    if _compiled_workflow is None:
+        with _init_lock:
+            if _compiled_workflow is None:
+                _compiled_workflow = build_workflow()
+    return _compiled_workflow
+
+
+def get_mongo_db():
+    """Return the chat database, connecting on first use.
+
+    MONGO_URI=mongomock:// uses an in-memory database (requires the optional
+    `mongomock` package), for offline benchmarks.
     """
-    try:
-        # Get API key from environment
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            return "Google API key not found. Please set GOOGLE_API_KEY environment variable."
-
-        # Initialize Google Maps client
-        gmaps = googlemaps.Client(key=api_key)
-
-        # Search for restaurants in the city
-        if cuisine_type:
-            query = f"{cuisine_type} restaurants in {city}"
-        else:
-            query = f"restaurants in {city}"
-
-        places_result = gmaps.places(query=query, type='restaurant')
-
-        if 'results' in places_result and places_result['results']:
-            response_lines = [f"**Popular Restaurants in {city}{f' ({cuisine_type.title()})' if cuisine_type else ''}:**\n"]
-
-            for place in places_result['results'][:10]:  # Limit to 10 results
-                place_name = place['name']
-                rating = place.get('rating', 'N/A')
-                price_level = place.get('price_level', '')
-                price_display = '💰' * price_level if price_level else ''
-
-                response_lines.append(f"### {place_name}")
-                response_lines.append(f"⭐ Rating: {rating}/5 {price_display}")
-
-                if 'vicinity' in place:
-                    response_lines.append(f"📍 Location: {place['vicinity']}")
-
-                # Get place details to fetch photos
-                place_id = place['place_id']
-                place_details = gmaps.place(place_id=place_id, fields=['photo', 'formatted_phone_number', 'opening_hours'])
-
-                if 'result' in place_details:
-                    result = place_details['result']
-
-                    # Add phone number if available
-                    if 'formatted_phone_number' in result:
-                        response_lines.append(f"📞 Phone: {result['formatted_phone_number']}")
-
-                    # Add opening hours if available
-                    if 'opening_hours' in result and 'weekday_text' in result['opening_hours']:
-                        response_lines.append("🕐 Hours:")
-                        for hour in result['opening_hours']['weekday_text'][:3]:  # Show first 3 days
-                            response_lines.append(f"  {hour}")
-
-                    # Add photos
-                    if 'photos' in result:
-                        photos = result['photos'][:3]  # Limit to 3 photos per restaurant
-                        for photo in photos:
-                            photo_reference = photo['photo_reference']
-                            # Construct photo URL
-                            photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photoreference={photo_reference}&key={api_key}"
-                            # Add as markdown image
-                            response_lines.append(f"![{place_name}]({photo_url})")
-                    else:
-                        response_lines.append("*No images available*")
-
-                response_lines.append("")  # Add blank line between restaurants
-
-            return "\n".join(response_lines)
-        else:
-            return f"No restaurants found for {city}{f' ({cuisine_type})' if cuisine_type else ''}."
-
-    except Exception as e:
-        return f"Error fetching restaurants: {str(e)}"
-
-
-# Helper function for flight calculations
-def _calculate_flights(destination_city: str, origin_city: str = "Delhi", date: Optional[str] = None) -> List[dict]:
-    """Calculate flight options using Google Places API."""
-    try:
-        # Get API key from environment
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            return [{"error": "Google API key not found. Please set GOOGLE_API_KEY environment variable."}]
-
-        # Initialize Google Maps client
-        gmaps = googlemaps.Client(key=api_key)
-
-        # Find airports near origin city
-        origin_airports = gmaps.places(query=f"international airport in {origin_city}", type='airport')
-        origin_airport = None
-        if 'results' in origin_airports and origin_airports['results']:
-            origin_airport = origin_airports['results'][0]
-
-        # Find airports near destination city
-        dest_airports = gmaps.places(query=f"international airport in {destination_city}", type='airport')
-        dest_airport = None
-        if 'results' in dest_airports and dest_airports['results']:
-            dest_airport = dest_airports['results'][0]
-
-        if not origin_airport or not dest_airport:
-            return [{"error": f"Could not find airports for {origin_city} to {destination_city}"}]
-
-        # Get distance and duration between airports
-        origins = [(origin_airport['geometry']['location']['lat'], origin_airport['geometry']['location']['lng'])]
-        destinations = [(dest_airport['geometry']['location']['lat'], dest_airport['geometry']['location']['lng'])]
-
-        distance_matrix = gmaps.distance_matrix(origins, destinations, mode='driving', units='metric')
-
-        if 'rows' in distance_matrix and distance_matrix['rows'][0]['elements'][0]['status'] == 'OK':
-            distance_km = distance_matrix['rows'][0]['elements'][0]['distance']['value'] / 1000
-            # Estimate flight duration (average commercial jet speed ~800 km/h)
-            flight_duration_hours = distance_km / 800
-            flight_duration_str = f"{int(flight_duration_hours)}h {int((flight_duration_hours % 1) * 60)}m"
-
-            # Estimate flight cost based on distance (rough approximation)
-            # Domestic flights: ~$0.10-0.20 per km, International: ~$0.15-0.30 per km
-            cost_per_km = 0.20 if distance_km < 2000 else 0.25  # Higher for long-haul
-            base_cost = distance_km * cost_per_km
-            # Add taxes and fees (roughly 20-30% of base cost)
-            total_cost = base_cost * 1.25
-
-            # Generate sample flight options with realistic times
-            airlines = ["Air India", "IndiGo", "SpiceJet", "Vistara", "GoAir"]
-            flight_options = []
-
-            for i in range(3):
-                airline = random.choice(airlines)
-                # Generate departure times throughout the day
-                dep_hour = random.randint(6, 22)
-                dep_minute = random.choice([0, 15, 30, 45])
-                dep_time = f"{dep_hour:02d}:{dep_minute:02d}"
-
-                # Calculate arrival time
-                arr_hour = int((dep_hour + flight_duration_hours) % 24)
-                arr_minute = int((dep_minute + (flight_duration_hours % 1) * 60) % 60)
-                arr_time = f"{arr_hour:02d}:{arr_minute:02d}"
-
-                # Vary price slightly
-                price_variation = random.uniform(0.8, 1.2)
-                price = round(total_cost * price_variation)
-
-                flight_options.append({
-                    "airline": airline,
-                    "departure_time": dep_time,
-                    "arrival_time": arr_time,
-                    "price": f"${price}",
-                    "duration": flight_duration_str,
-                    "origin_airport": origin_airport['name'],
-                    "destination_airport": dest_airport['name']
-                })
-
-            return flight_options
-        else:
-            return [{"error": "Could not calculate distance between airports"}]
-
-    except Exception as e:
-        return [{"error": f"Error fetching flight information: {str(e)}"}]
-
-
-@tool
-def find_flights_to_city(destination_city: str, origin_city: str = "Delhi", date: Optional[str] = None) -> List[dict]:
-    """Find flight options to a specified city from an origin city on a specific date using Google Places API.
-
-    Args:
-        destination_city: Destination city name.
-        origin_city: Originating city name (default: Delhi).
-        date: Travel date in YYYY-MM-DD format (optional, defaults to next day if not provided).
-
-    Returns:
-        List of flight options with airline, times, price, and duration.
+    global _mongo_client
+    if _mongo_client is None:
+        with _init_lock:
+            if _mongo_client is None and MONGO_URI.startswith("mongomock://"):
+                import mongomock
+                _mongo_client = mongomock.MongoClient()
+            elif _mongo_client is None:
+                from pymongo import MongoClient
+                _mongo_client = MongoClient(MONGO_URI,
+                                            tls=True,
+                                            tlsCertificateKeyFile='cred.pem')
+    return _mongo_client.get_database("chat_app")
+
+
+def get_job_queue():
+    """Return the LLM job queue, creating it on first use.
+
+    LLM_JOB_STORE selects where jobs are kept ("mongo", the default, or "memory");
+    LLM_JOB_WORKERS bounds concurrent runs and LLM_JOB_MAX_PENDING bounds the backlog.
+    Mongo jobs expire LLM_JOB_TTL_SECONDS (default 7 days) after they were created.
+    Unfinished jobs whose worker stopped heartbeating for LLM_JOB_LEASE_SECONDS
+    (default 60) are marked failed.
     """
-    return _calculate_flights(destination_city, origin_city, date)
-
-
-@tool
-def suggest_budget_plan(destination_city: str, trip_duration_days: int = 3, travelers: int = 1, origin_city: Optional[str] = None, travel_date: Optional[str] = None, budget: Optional[float] = None) -> dict:
-    """Provide a detailed tour plan including flights, accommodation, food, and activities within a given budget.
-
-    Args:
-        destination_city: Target travel destination city.
-        trip_duration_days: Duration of stay in days. Default is 3.
-        travelers: Number of people traveling together. Default is 1.
-        origin_city: Originating city name (optional, if provided, flight costs will be included).
-        travel_date: Travel date in YYYY-MM-DD format (optional, required if origin_city is provided).
-        budget: Total budget for the trip (optional).
-
-    Returns:
-        A detailed tour plan with cost breakdown and activities.
-    """
-    # Static cost estimates per day
-    costs_per_day = {
-        "Paris": {"hotel": 120, "food": 60, "transport": 20},
-        "New York": {"hotel": 180, "food": 70, "transport": 30},
-        "Tokyo": {"hotel": 100, "food": 40, "transport": 15},
-        "Bangkok": {"hotel": 40, "food": 25, "transport": 10}
-    }
-
-    daily_cost = costs_per_day.get(destination_city, {"hotel": 0, "food": 0, "transport": 0})
-
-    total_hotel = daily_cost["hotel"] * trip_duration_days
-    total_food = daily_cost["food"] * trip_duration_days * travelers
-    total_transport = daily_cost["transport"] * trip_duration_days * travelers
-
-    total_budget = total_hotel + total_food + total_transport
-    breakdown = {
-        "accommodation": f"${total_hotel}",
-        "food": f"${total_food}",
-        "local_transport": f"${total_transport}"
-    }
-
-    # Add flight costs if origin city is provided
-    if origin_city:
-        flight_options = _calculate_flights(destination_city, origin_city, travel_date)
-        if flight_options and not any("error" in option for option in flight_options):
-            # Take the cheapest flight option
-            flight_prices = []
-            for option in flight_options:
-                if "price" in option:
-                    try:
-                        price_str = option["price"].replace("$", "")
-                        flight_prices.append(float(price_str))
-                    except ValueError:
-                        continue
+    global _job_queue
+    if _job_queue is None:
+        with _init_lock:
+            if _job_queue is None:
+                from jobs import JobQueue, MemoryJobStore, MongoJobStore
+                if os.getenv("LLM_JOB_STORE", "mongo") == "memory":
+                    store = MemoryJobStore()
+                else:
+                    store = MongoJobStore(get_mongo_db().get_collection("llm_jobs"),
+                                          ttl_seconds=int(os.getenv("LLM_JOB_TTL_SECONDS", str(7 * 24 * 3600))))
+                _job_queue = JobQueue(
+                    store,
+                    max_workers=int(os.getenv("LLM_JOB_WORKERS", "4")),
+                    max_pending=int(os.getenv("LLM_JOB_MAX_PENDING", "100")),
+                    lease_seconds=float(os.getenv("LLM_JOB_LEASE_SECONDS", "60")),
+                )
+    return _job_queue
+
+
+def _warm_up():
+    """Build the workflow, agent and Mongo client ahead of the first request."""
+    for getter in (get_workflow, get_agent, get_mongo_db):
+        try:
+            getter()
+        except Exception as e:
+            print(f"Warm-up of {getter.__name__} failed: {e}")
 
-            if flight_prices:
-                cheapest_flight = min(flight_prices)
-                total_flights = cheapest_flight * travelers * 2  # Round trip
-                total_budget += total_flights
-                breakdown["flights"] = f"${total_flights}"
 
-    # Add activities and restaurants
-    activities = get_tourist_places(destination_city)
-    restaurants = get_restaurants(destination_city)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: warm up in the background so /health is ready immediately
+    if os.getenv("LLM_WARMUP", "1") == "1":
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    yield
+    # Shutdown
+    if _job_queue is not None:
+        _job_queue.shutdown()
+    if _mongo_client is not None:
+        _mongo_client.close()
 
-    # Check if the total budget exceeds the given budget
-    if budget and total_budget > budget:
-        return {
-            "error": f"The estimated cost (${total_budget}) exceeds your budget (${budget}). Please adjust your preferences."
-        }
 
-    return {
-        "estimated_total_cost": f"${total_budget}",
-        "breakdown": breakdown,
-        "activities": activities,
-        "restaurants": restaurants
-    }
+app = FastAPI(title="Travel Planner API", description="API for planning trips using LangGraph and LangChain tools", lifespan=lifespan)
 
-# Initialize the LLM
-llm = ChatOpenAI(model="gpt-4")
 
-# Create the tools list
-tools = [get_tourist_places, get_restaurants, find_flights_to_city, suggest_budget_plan]
+class QueryRequest(BaseModel):
+    query: str
 
-# Create the ReAct agent using LangGraph
-agent = create_react_agent(llm, tools)
 
 # Define the workflow state
 class State(TypedDict):
@@ -349,105 +175,21 @@ class State(TypedDict):
     trip_details: Optional[dict]  # Extracted trip details
     places_plan: Optional[dict]  # Planned places to visit
     transport_plan: Optional[dict]  # Transport details
+    route_plan: Optional[dict]  # Multi-city route, when the query names several cities
     final_response: Optional[str]  # Final formatted response
 
 # Trip Intent Extractor Node
-def extract_trip_intent(state: State):
+@traced("node")
+async def extract_trip_intent(state: State):
     """Extract trip details from the user query using lightweight heuristics.
 
     Returns trip_details dict when all required fields are found, otherwise
     returns trip_details=None and a `final_response` asking the user for missing fields.
     """
-    import re
-    from dateutil import parser as dateparser
-
-    user_query = state.get("user_query", "") or ""
-    q = user_query.lower()
-
-    trip = {
-        "destination": None,
-        "budget": None,
-        "starting_point": None,
-        "duration": None,
-        "travel_dates": None,
-        "travelers": None,
-        "preferences": {"sightseeing_hours": None, "relaxation_type": None},
-    }
-
-    # Destination: look for 'to <City>' or 'in <City>' patterns
-    m = re.search(r"(?:to|in)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)", user_query)
-    if m:
-        trip["destination"] = m.group(1)
-
-    # Budget: $ or rupee or 'budget of 2000' patterns
-    m = re.search(r"\$\s*(\d+(?:,\d{3})?(?:\.\d+)?)", user_query)
-    if not m:
-        m = re.search(r"budget\s*(?:of)?\s*(\d+(?:,\d{3})?)", user_query.lower())
-    if m:
-        try:
-            trip["budget"] = float(m.group(1).replace(",", ""))
-        except Exception:
-            trip["budget"] = None
-
-    # Starting point: 'from <City>'
-    m = re.search(r"from\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)", user_query)
-    if m:
-        trip["starting_point"] = m.group(1)
-
-    # Duration: '3-day' or 'for 3 days'
-    m = re.search(r"(\d+)[-\s]?day|for\s+(\d+)\s+days", user_query.lower())
-    if m:
-        num = m.group(1) or m.group(2)
-        try:
-            trip["duration"] = int(num)
-        except Exception:
-            trip["duration"] = None
-
-    # Travel dates: try to parse two dates or a single date range
-    # Look for explicit date ranges like '2026-01-15 to 2026-01-20'
-    m = re.search(r"(20\d{2}[-/.]\d{1,2}[-/.]\d{1,2})\s*(?:to|-)\s*(20\d{2}[-/.]\d{1,2}[-/.]\d{1,2})", user_query)
-    if m:
-        try:
-            d1 = dateparser.parse(m.group(1)).date().isoformat()
-            d2 = dateparser.parse(m.group(2)).date().isoformat()
-            trip["travel_dates"] = f"{d1} to {d2}"
-        except Exception:
-            trip["travel_dates"] = None
-    else:
-        # Try natural language dates like 'next week' or 'June 5-8'
-        m = re.search(r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{1,2}(?:-\d{1,2})?(?:,?\s*20\d{2})?", user_query.lower())
-        if m:
-            try:
-                trip["travel_dates"] = m.group(0)
-            except Exception:
-                trip["travel_dates"] = None
-
-    # Travelers: 'for 2 people' or '2 people'
-    m = re.search(r"(\d+)\s*(?:people|persons|guests|travellers|travelers)", user_query.lower())
-    if m:
-        trip["travelers"] = int(m.group(1))
-
-    # Preferences: sightseeing hours - look for '8 hours' or 'light/heavy'
-    m = re.search(r"(\d+)\s*hours", user_query.lower())
-    if m:
-        try:
-            trip["preferences"]["sightseeing_hours"] = int(m.group(1))
-        except Exception:
-            pass
-
-    if "relax" in user_query.lower() or "resort" in user_query.lower() or "chill" in user_query.lower():
-        trip["preferences"]["relaxation_type"] = "relaxing"
-    elif "pilgrim" in user_query.lower() or "pilgrimage" in user_query.lower():
-        trip["preferences"]["relaxation_type"] = "pilgrimage"
-    elif "sightseeing" in user_query.lower() or "tour" in user_query.lower():
-        trip["preferences"]["relaxation_type"] = "sightseeing"
+    trip = parse_trip_query(state.get("user_query", "") or "")
 
     # Determine missing required fields
-    required = ["destination", "duration", "travelers"]
-    missing = [f for f in required if not trip.get(f)]
-
-    # If budget or starting_point or travel_dates missing, they are optional but helpful
-    helpful = [k for k in ["budget", "starting_point", "travel_dates"] if not trip.get(k)]
+    missing = missing_fields(trip)
 
     if missing:
         prompt_parts = [
@@ -460,19 +202,29 @@ def extract_trip_intent(state: State):
     return {"trip_details": trip}
 
 # Places Planner Node
-def plan_places(state: State):
-    """Plan places to visit based on the extracted trip details."""
+@traced("node")
+async def plan_places(state: State):
+    """Plan places to visit: attractions clustered into days and ordered by route (day_planner.py)."""
+    from day_planner import plan_city_days
+
     trip_details = state["trip_details"]
-    # Simulate planning logic
-    places_plan = {
-        "day_1": ["Eiffel Tower", "Louvre Museum"],
-        "day_2": ["Notre Dame Cathedral", "Seine River Cruise"],
-        "day_3": ["Versailles Palace"]
-    }
+    days = trip_details.get("duration") or 1
+    try:
+        planned = await asyncio.to_thread(
+            plan_city_days,
+            trip_details["destination"],
+            days,
+            (trip_details.get("preferences") or {}).get("sightseeing_hours"),
+        )
+    except Exception as e:
+        print(f"Day planning failed for {trip_details['destination']}: {e}")
+        planned = [{"day": d + 1, "places": []} for d in range(days)]
+    places_plan = {f"day_{d['day']}": [p["name"] for p in d["places"]] for d in planned}
     return {"places_plan": places_plan}
 
 # Transport Planner Node
-def plan_transport(state: State):
+@traced("node")
+async def plan_transport(state: State):
     """Plan transport details including flights and costs."""
     trip_details = state["trip_details"]
     # Simulate transport planning logic
@@ -494,15 +246,58 @@ def plan_transport(state: State):
     }
     return {"transport_plan": transport_plan}
 
+# Multi-city Route Planner Node
+@traced("node")
+async def plan_route(state: State):
+    """Order the cities of a multi-city trip ("Paris → Amsterdam → Berlin") and split the days."""
+    from route_optimizer import optimize_route, parse_city_sequence
+
+    trip_details = state["trip_details"]
+    cities = parse_city_sequence(state.get("user_query", ""))
+    if len(cities) < 2:
+        return {"route_plan": None}
+    try:
+        route_plan = await asyncio.to_thread(
+            optimize_route,
+            cities,
+            trip_details["duration"],
+            travelers=trip_details.get("travelers") or 1,
+            origin=trip_details.get("starting_point"),
+            budget=trip_details.get("budget"),
+            top_k=1,
+        )
+    except ValueError as e:
+        print(f"Route planning failed for {cities}: {e}")
+        return {"route_plan": None}
+    return {"route_plan": route_plan}
+
 # Response Formatter Node
-def format_response(state: State):
-    """Format the final response based on the planned trip."""
+@traced("node")
+async def format_response(state: State):
+    """Format the final response based on the planned trip.
+
+    Each section is also sent to the stream writer as it is built, which
+    /plan-trip/stream relays as `token` events.
+    """
+    from langgraph.config import get_stream_writer
+
+    write = get_stream_writer()
+    sections = []
+
+    def emit(text: str) -> None:
+        sections.append(text)
+        write({"content": text})
+
     trip_details = state["trip_details"]
+    if trip_details is None:
+        # Keep the follow-up question from extract_trip_intent
+        emit(state["final_response"])
+        return {"final_response": state["final_response"]}
     places_plan = state["places_plan"]
     transport_plan = state["transport_plan"]
 
     # Simulate response formatting
-    final_response = (
+    emit(
         f"Your trip to {trip_details['destination']} is planned as follows:\n"
         f"Budget: ${trip_details['budget']}\n"
         f"Travel Dates: {trip_details['travel_dates']}\n"
@@ -510,9 +305,18 @@ def format_response(state: State):
         f"\nPlaces to Visit:\n"
     )
     for day, places in places_plan.items():
-        final_response += f"{day.capitalize()}: {', '.join(places)}\n"
-
-    final_response += (
+        emit(f"{day.capitalize()}: {', '.join(places) or 'Free day'}\n")
+
+    route_plan = state.get("route_plan")
+    if route_plan and route_plan["itineraries"]:
+        best = route_plan["itineraries"][0]
+        emit("\nSuggested Route:\n"
+             + " → ".join(f"{stop['city']} ({stop['days']}d)" for stop in best["days"]) + "\n")
+        for leg in best["legs"]:
+            emit(f"{leg['from']} to {leg['to']}: {leg['mode']}, {leg['hours']}h, ${leg['cost']}\n")
+        emit(f"Estimated Total: ${best['total_cost']}\n")
+
+    emit(
         f"\nTransport Details:\n"
         f"Departure Flight: {transport_plan['flights']['departure']['from']} to {transport_plan['flights']['departure']['to']}\n"
         f"Duration: {transport_plan['flights']['departure']['duration']}, Cost: ${transport_plan['flights']['departure']['cost']}\n"
@@ -520,110 +324,406 @@ def format_response(state: State):
         f"Duration: {transport_plan['flights']['return']['duration']}, Cost: ${transport_plan['flights']['return']['cost']}\n"
     )
 
-    return {"final_response": final_response}
+    return {"final_response": "".join(sections)}
+
+def build_workflow():
+    """Build and compile the trip planning graph."""
+    from langgraph.graph import StateGraph, START, END
+
+    # Build the workflow
+    workflow = StateGraph(State)
+
+    # Add nodes
+    workflow.add_node("extract_trip_intent", extract_trip_intent)
+    workflow.add_node("plan_places", plan_places)
+    workflow.add_node("plan_transport", plan_transport)
+    workflow.add_node("plan_route", plan_route)
+    workflow.add_node("format_response", format_response)
+
+    # Add edges: places, transport and route planning are independent, so fan out to
+    # all three in parallel and join at format_response
+    workflow.add_edge(START, "extract_trip_intent")
+    workflow.add_conditional_edges(
+        "extract_trip_intent",
+        lambda state: "format_response" if state["trip_details"] is None else ["plan_places", "plan_transport", "plan_route"],
+        ["format_response", "plan_places", "plan_transport", "plan_route"]
+    )
+    workflow.add_edge(["plan_places", "plan_transport", "plan_route"], "format_response")
+    workflow.add_edge("format_response", END)
+
+    # Compile the workflow
+    return workflow.compile()
+
+
+# --- New: run LLM on an entire session's conversation -----------------
+def _summarize_messages(previous_summary: str, lines: List[str]) -> str:
+    """Fold new chat lines into a session's running summary with the LLM."""
+    from langchain_core.messages import HumanMessage
+
+    prompt = (
+        "You maintain a running summary of a group travel-planning chat. Update the summary with the new "
+        "messages below. Keep participants, destinations, dates, budgets, preferences, decisions and open "
+        "questions; drop small talk. Reply with the updated summary only, in under 300 words.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\n"
+        "New messages:\n" + "\n".join(lines)
+    )
+    return get_llm_guard().call(
+        "summarize",
+        lambda: get_llm().invoke([HumanMessage(content=prompt)], config={"callbacks": tracing.callbacks()}).content,
+    )
 
-# Build the workflow
-workflow = StateGraph(State)
 
-# Add nodes
-workflow.add_node("extract_trip_intent", extract_trip_intent)
-workflow.add_node("plan_places", plan_places)
-workflow.add_node("plan_transport", plan_transport)
-workflow.add_node("format_response", format_response)
+def _degraded_llm_response(mongo_db, session_id: str) -> dict:
+    """Response served while the LLM circuit breaker is open: the last reply for the session, if any."""
+    state = mongo_db.get_collection(SUMMARIES_COLLECTION).find_one({"session_id": session_id}) or {}
+    cached = state.get("last_llm_response")
+    if cached is not None:
+        tracing.count("cache_hits")
+    return {
+        "success": True,
+        "degraded": True,
+        "cached": cached is not None,
+        "messages": [],
+        "summary": state.get("summary", ""),
+        "llm_response": cached or "The assistant is temporarily unavailable. Please try again in a minute.",
+        "count": 0,
+    }
 
-# Add edges
-workflow.add_edge(START, "extract_trip_intent")
-workflow.add_conditional_edges(
-    "extract_trip_intent",
-    lambda state: "format_response" if state["trip_details"] is None else "plan_places",
-    {"format_response": "format_response", "plan_places": "plan_places"}
-)
-workflow.add_edge("plan_places", "plan_transport")
-workflow.add_edge("plan_transport", "format_response")
-workflow.add_edge("format_response", END)
 
-# Compile the workflow
-compiled_workflow = workflow.compile()
+def _run_llm(session_id: str) -> dict:
+    """Run the LLM on `session_id`, coalescing identical concurrent runs.
 
+    Runs are keyed by session ID and the session's latest message `_id`, so group
+    members opening the same conversation at once share a single agent call.
+    """
+    mongo_db = get_mongo_db()
+    coll = mongo_db.get_collection("messages")
+    if "messages" not in mongo_db.list_collection_names():
+        coll = mongo_db.get_collection("chat_history")
 
-# --- New: run LLM on an entire session's conversation -----------------
-MONGO_URI = os.getenv("MONGO_URI") or "mongodb+srv://cluster0.p0litw.mongodb.net/?authSource=%24external&authMechanism=MONGODB-X509&appName=Cluster0"
-mongo_client = MongoClient(MONGO_URI,
-                           tls=True,
-                           tlsCertificateKeyFile='cred.pem')
-mongo_db = mongo_client.get_database("chat_app")
+    latest = coll.find_one({"session_id": session_id}, projection={"_id": 1}, sort=[("_id", -1)])
+    key = (session_id, str(latest["_id"]) if latest else None)
+    leader = []
 
+    def run():
+        leader.append(True)
+        return _run_llm_uncoalesced(mongo_db, coll, session_id)
 
-@app.get("/api/sessions/{session_id}/run-llm")
-def run_llm_on_session(session_id: str):
+    result = _llm_runs.do(key, run)
+    if not leader:
+        tracing.count("cache_hits")
+    return result
+
+
+def _generate_reply(guard, conversation_text: str, mongo_db, session_id: str):
+    """Reply text from the agent, else the model directly; a dict when degraded."""
+    from langchain_core.messages import HumanMessage
+
+    # Prefer the agent; its model calls are guarded one by one (get_agent)
+    try:
+        return get_agent().invoke(
+            {"messages": [HumanMessage(content=conversation_text)]},
+            config={"callbacks": tracing.callbacks()},
+        )["messages"][-1].content
+    except CircuitOpenError:
+        return _degraded_llm_response(mongo_db, session_id)
+    except Exception:
+        # Fall back to calling the llm directly, within what is left of the run's deadline
+        # Use a simple prompt asking the model to respond as assistant summarizing or continuing
+        prompt = (
+            "You are a travel planning assistant. Continue the conversation or provide a summary/reply based on the chat below:\n\n"
+            + conversation_text
+        )
+        try:
+            return guard.call(
+                "llm",
+                lambda: get_llm().invoke([HumanMessage(content=prompt)], config={"callbacks": tracing.callbacks()}).content,
+                deadline_seconds=_remaining_budget(),
+                fallback=lambda: _degraded_llm_response(mongo_db, session_id),
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"LLM call failed: {e}")
+
+
+def _run_llm_uncoalesced(mongo_db, coll, session_id: str) -> dict:
     """Fetch the conversation for `session_id`, forward to the LLM/agent, and return the LLM output.
 
-    The endpoint tries to use the `messages` collection first and falls back to
-    `chat_history` if needed. It converts each entry to a plain string message
-    prefixed with the author (e.g., `[Alex]: ...`) and sends the whole conversation
-    to the `agent` if available, otherwise calls `llm` directly with a single prompt.
+    Messages are read from `coll` (`messages`, or `chat_history` if that collection
+    does not exist), rendered as `[author]: ...` lines and compacted (photo URLs,
+    emoji and repeated itinerary blocks removed). Only messages newer than the
+    session's rolling summary are read: the most recent ones that fit the token
+    budget are sent verbatim and older ones are folded into the summary, so the
+    prompt stays bounded as the session grows. The context goes to the `agent`,
+    falling back to calling `llm` directly with a single prompt. All model calls go
+    through the outbound guard; while its breaker is open the session's last reply
+    is returned instead (`degraded: true`).
     """
+    guard = get_llm_guard()
+    if guard.is_open():
+        return _degraded_llm_response(mongo_db, session_id)
+
     try:
-        coll = mongo_db.get_collection("messages")
-        if "messages" not in mongo_db.list_collection_names():
-            coll = mongo_db.get_collection("chat_history")
+        context = build_session_context(mongo_db, coll, session_id, _summarize_messages)
+    except CircuitOpenError:
+        return _degraded_llm_response(mongo_db, session_id)
 
-        docs = list(coll.find({"session_id": session_id}).sort("timestamp", 1))
+    if not context["tail"] and not context["summary"]:
+        return {"success": True, "messages": [], "llm_response": "No messages found", "count": 0}
 
-        if not docs:
-            return {"success": True, "messages": [], "llm_response": "No messages found", "count": 0}
+    # Summary of older messages + recent tail
+    conversation_text = render_context(context)
 
-        # Build a simple conversation text for the LLM
-        convo_lines = []
-        for d in docs:
-            author = d.get("role") or d.get("username") or "user"
-            content = d.get("content") or d.get("message") or ""
-            # If username is stored separately (like [Alex]: ... in content), prefer that raw content
-            convo_lines.append(f"[{author}]: {content}")
+    # One deadline covers the agent's model steps and the direct fallback together
+    token = _run_deadline.set(time.monotonic() + guard.deadline_seconds)
+    try:
+        llm_out = _generate_reply(guard, conversation_text, mongo_db, session_id)
+    finally:
+        _run_deadline.reset(token)
+    if isinstance(llm_out, dict):
+        return llm_out
+
+    mongo_db.get_collection(SUMMARIES_COLLECTION).update_one(
+        {"session_id": session_id},
+        {"$set": {"last_llm_response": llm_out}},
+        upsert=True,
+    )
 
-        conversation_text = "\n".join(convo_lines)
+    return {
+        "success": True,
+        "messages": context["tail"],
+        "summary": context["summary"],
+        "llm_response": llm_out,
+        "count": len(context["tail"]),
+        "summarized_now": context["folded"],
+        "estimated_prompt_tokens": estimate_tokens(conversation_text),
+        "compaction": context["compaction"],
+    }
 
-        # Prefer the agent if callable
-        try:
-            # The ReAct agent may accept a prompt-like input; fallback if interface differs
-            agent_response = agent.run(conversation_text)
-            llm_out = agent_response
-        except Exception:
-            # Fall back to calling the llm directly
-            # Use a simple prompt asking the model to respond as assistant summarizing or continuing
-            prompt = (
-                "You are a travel planning assistant. Continue the conversation or provide a summary/reply based on the chat below:\n\n"
-                + conversation_text
-            )
-            # ChatOpenAI from langchain_openai may accept a simple call pattern; adapt as needed
-            try:
-                llm_resp = llm.call([HumanMessage(content=prompt)])
-                # `llm.call` may return a Message-like object or a string
-                if hasattr(llm_resp, "content"):
-                    llm_out = llm_resp.content
-                else:
-                    llm_out = str(llm_resp)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"LLM call failed: {e}")
 
-        return {"success": True, "messages": convo_lines, "llm_response": llm_out, "count": len(convo_lines)}
+@app.get("/api/sessions/{session_id}/run-llm")
+def run_llm_on_session(session_id: str, x_debug_trace: Optional[str] = Header(None)):
+    """Run the LLM on `session_id` and wait for the result.
 
+    Long agent runs hold a worker for their whole duration; prefer the job API
+    (`POST /api/sessions/{session_id}/run-llm/jobs`). Send `X-Debug-Trace: 1` to
+    get the request's trace back under `trace`.
+    """
+    try:
+        with tracing.start_trace("run-llm", tracing.tracing_enabled(x_debug_trace), session_id=session_id) as trace:
+            result = _run_llm(session_id)
+        if trace and tracing.debug_requested(x_debug_trace):
+            result = {**result, "trace": trace.to_dict()}
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _run_llm_job(session_id: str) -> dict:
+    """Job body for a queued run; traced when TRACE_EXPORT_PATH is set."""
+    with tracing.start_trace("run-llm-job", tracing.tracing_enabled(), session_id=session_id):
+        return _run_llm(session_id)
+
+
+def _job_view(job: dict) -> dict:
+    """Public representation of a job record."""
+    view = {k: v for k, v in job.items() if k != "_id"}
+    view["job_id"] = job["_id"]
+    return view
+
+
+@app.post("/api/sessions/{session_id}/run-llm/jobs", status_code=202)
+def submit_llm_job(session_id: str):
+    """Queue an LLM run on `session_id` and return its job ID immediately.
+
+    Poll `GET /api/jobs/{job_id}` or stream `GET /api/jobs/{job_id}/events` for the result.
+    """
+    from jobs import QueueFullError
+
+    try:
+        job = get_job_queue().submit("run-llm", lambda: _run_llm_job(session_id), {"session_id": session_id})
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "job_id": job["_id"], "status": job["status"]}
+
+
+@app.get("/api/jobs/{job_id}")
+def get_llm_job(job_id: str):
+    """Status of a queued LLM run, with its result or error once finished."""
+    job = get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": _job_view(job)}
+
+
+# Longest a job event stream stays open
+JOB_EVENTS_MAX_SECONDS = float(os.getenv("LLM_JOB_EVENTS_MAX_SECONDS", "900"))
+
+@app.get("/api/jobs/{job_id}/events")
+async def llm_job_events(job_id: str, interval: float = Query(0.5, ge=0.1, le=10)):
+    """
+    Server-Sent Events for a queued LLM run.
+    Emits a `status` event whenever the job's status changes and ends with a `final`
+    event carrying the finished job, or an `error` event if the job no longer exists
+    or has not finished within JOB_EVENTS_MAX_SECONDS (poll the job to keep waiting).
+    """
+    from jobs import FINISHED_STATUSES
+
+    queue = get_job_queue()
+    if not await asyncio.to_thread(queue.get, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_status = None
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        while True:
+            if time.monotonic() >= deadline:
+                yield _encode_event({"event": "error", "job_id": job_id, "status": last_status,
+                                     "detail": "Job did not finish before the stream timed out"}, "sse")
+                return
+            job = await asyncio.to_thread(queue.get, job_id)
+            if job is None:
+                # Evicted from the memory store or expired/deleted in Mongo
+                yield _encode_event({"event": "error", "job_id": job_id, "detail": "Job no longer exists"}, "sse")
+                return
+            if job["status"] in FINISHED_STATUSES:
+                yield _encode_event({"event": "final", "job": _job_view(job)}, "sse")
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield _encode_event({"event": "status", "job_id": job_id, "status": last_status}, "sse")
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @app.post("/plan-trip")
-async def plan_trip(request: QueryRequest):
+async def plan_trip(request: QueryRequest, x_debug_trace: Optional[str] = Header(None)):
     """
     Endpoint to plan a trip based on a natural language query.
     The workflow will use the available nodes to gather information and provide a travel plan.
+    Send `X-Debug-Trace: 1` to get per-node timings back under `trace`.
     """
     try:
-        state = compiled_workflow.invoke({"user_query": request.query})
-        return {"response": state["final_response"]}
+        with tracing.start_trace("plan-trip", tracing.tracing_enabled(x_debug_trace)) as trace:
+            state = await get_workflow().ainvoke({"user_query": request.query})
+        response = {"response": state["final_response"]}
+        if trace and tracing.debug_requested(x_debug_trace):
+            response["trace"] = trace.to_dict()
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+def _encode_event(event: dict, fmt: str) -> str:
+    """Encode a stream event as an SSE frame or an NDJSON line."""
+    payload = json.dumps(event, default=str)
+    if fmt == "sse":
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+@app.post("/plan-trip/stream")
+async def plan_trip_stream(request: QueryRequest, format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+                           x_debug_trace: Optional[str] = Header(None)):
+    """
+    Streaming variant of /plan-trip.
+    Emits a `node` event as each workflow node completes, `token` events with the
+    response text as format_response builds it, then a `final` event with the full
+    response. Use `?format=sse` for
+    Server-Sent Events, otherwise newline-delimited JSON is returned. With
+    `X-Debug-Trace: 1` a `trace` event precedes `final`.
+    """
+    async def event_stream():
+        final_response = None
+        try:
+            with tracing.start_trace("plan-trip-stream", tracing.tracing_enabled(x_debug_trace)) as trace:
+                async for mode, chunk in get_workflow().astream(
+                    {"user_query": request.query}, stream_mode=["updates", "custom"]
+                ):
+                    if mode == "custom":
+                        yield _encode_event({"event": "token", "node": "format_response", **chunk}, format)
+                        continue
+
+                    for node, update in chunk.items():
+                        if update and update.get("final_response"):
+                            final_response = update["final_response"]
+                        yield _encode_event({"event": "node", "node": node, "data": update}, format)
+
+            if trace and tracing.debug_requested(x_debug_trace):
+                yield _encode_event({"event": "trace", "trace": trace.to_dict()}, format)
+            yield _encode_event({"event": "final", "response": final_response}, format)
+        except Exception as e:
+            yield _encode_event({"event": "error", "detail": f"Error processing request: {str(e)}"}, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/maps/stats")
+async def maps_stats():
+    """Per-API Google Maps call counts, errors, retries, coalesced calls and latency, plus photo and distance caches."""
+    from distance_service import get_distance_service
+    from maps_gateway import get_maps_gateway
+    from photo_cache import get_photo_cache
+    return {"success": True, "stats": get_maps_gateway().stats(), "photos": get_photo_cache().stats(),
+            "distances": get_distance_service().stats()}
+
+# Photos are content-addressed, so a URL's bytes never change
+PHOTO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def _etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Weak comparison of `etag` against an If-None-Match list (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+@app.get("/api/photos/{photo_reference}")
+def get_photo(photo_reference: str, request: Request, w: Optional[int] = Query(None, ge=16, le=1600),
+              sig: Optional[str] = None):
+    """
+    Caching proxy for Google Places photos.
+    The photo is fetched from Google once and served from the disk cache afterwards;
+    `w` selects a resized thumbnail. A reference that is not cached yet needs the
+    `sig` of the URL the tools handed out (403 otherwise), so the proxy cannot be
+    used to spend Google quota on arbitrary references. Responses carry an ETag
+    and long-lived cache headers. Set PHOTO_SENDFILE_HEADER (X-Accel-Redirect or
+    X-Sendfile) to hand the file to the front proxy instead of streaming it from Python.
+    """
+    from photo_cache import get_photo_cache, verify_reference
+
+    cache = get_photo_cache()
+    if not verify_reference(photo_reference, sig) and not cache.is_cached(photo_reference):
+        raise HTTPException(status_code=403, detail="Unknown or unsigned photo reference")
+    try:
+        path, content_type, etag = cache.get(photo_reference, w)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error fetching photo: {str(e)}")
+
+    headers = {"ETag": etag, "Cache-Control": PHOTO_CACHE_CONTROL}
+    if _etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+
+    sendfile_header = os.getenv("PHOTO_SENDFILE_HEADER")
+    if sendfile_header == "X-Sendfile":
+        return Response(media_type=content_type, headers={**headers, "X-Sendfile": str(path)})
+    if sendfile_header:
+        # nginx internal location mapped onto the cache directory
+        prefix = os.getenv("PHOTO_SENDFILE_PREFIX", "/photo-cache").rstrip("/")
+        internal = f"{prefix}/{path.relative_to(cache.root).as_posix()}"
+        return Response(media_type=content_type, headers={**headers, sendfile_header: internal})
+    # FileResponse uses the server's zero-copy pathsend extension when available
+    return FileResponse(path, media_type=content_type, headers=headers)
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """Outbound LLM concurrency limit, circuit breaker and per-operation counters for this process."""
+    return {"success": True, "stats": get_llm_guard().stats(), "coalesced_runs": _llm_runs.stats()}
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
@@ -0,0 +1,263 @@
+"""
+Process-wide gateway for Google Maps API calls.
+
+Every tool shares one `googlemaps.Client` backed by a pooled keep-alive
+`requests.Session`, a token-bucket limiter per Google API, jittered retries on
+OVER_QUERY_LIMIT and per-API call/latency counters. Identical concurrent calls
+are coalesced into a single request.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import googlemaps
+import requests
+from googlemaps.exceptions import ApiError
+from requests.adapters import HTTPAdapter
+
+import tracing
+from single_flight import SingleFlight
+
+
+# API names used for rate limiting and stats
+TEXT_SEARCH = "text_search"
+DETAILS = "details"
+DISTANCE_MATRIX = "distance_matrix"
+PHOTO = "photo"
+
+# Default sustained queries per second for each API (override with env vars,
+# e.g. GOOGLE_MAPS_QPS_TEXT_SEARCH=5)
+DEFAULT_RATES = {
+    TEXT_SEARCH: 10.0,
+    DETAILS: 20.0,
+    DISTANCE_MATRIX: 10.0,
+    PHOTO: 20.0,
+}
+
+MAX_RETRIES = int(os.getenv("GOOGLE_MAPS_MAX_RETRIES", "4"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+HTTP_POOL_SIZE = int(os.getenv("GOOGLE_MAPS_POOL_SIZE", "20"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class ApiStats:
+    """Call, error and latency counters for a single Google API."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.over_query_limit = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.throttled_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "over_query_limit": self.over_query_limit,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+            "avg_latency_ms": round(self.total_latency / self.calls * 1000, 2) if self.calls else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+
+
+def _is_over_query_limit(error: Exception) -> bool:
+    return isinstance(error, ApiError) and error.status == "OVER_QUERY_LIMIT"
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def _flight_key(func_name: str, args: tuple, kwargs: dict) -> str:
+    """Key identifying a call by its normalized arguments.
+
+    Whitespace is collapsed everywhere; the free-text search query is also lowercased.
+    """
+    args = _normalize(args)
+    kwargs = _normalize(kwargs)
+    if func_name == "places":
+        if args:
+            args[0] = args[0].lower() if isinstance(args[0], str) else args[0]
+        if isinstance(kwargs.get("query"), str):
+            kwargs["query"] = kwargs["query"].lower()
+    return json.dumps([func_name, args, kwargs], sort_keys=True, default=str)
+
+
+class MapsGateway:
+    """Shared Google Maps client with per-API rate limiting, retries and stats.
+
+    Exposes the subset of the `googlemaps.Client` interface our tools use
+    (`places`, `place`, `distance_matrix`, `places_photo`), so it can be used as a drop-in client.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, rates: Optional[dict] = None, client=None):
+        self.api_key = api_key if api_key is not None else os.getenv("GOOGLE_API_KEY")
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        rates = {**DEFAULT_RATES, **(rates or {})}
+        for api in rates:
+            env_rate = os.getenv(f"GOOGLE_MAPS_QPS_{api.upper()}")
+            if env_rate:
+                rates[api] = float(env_rate)
+        self._buckets = {api: TokenBucket(rate) for api, rate in rates.items()}
+        self._stats = {api: ApiStats() for api in rates}
+        self._flights = SingleFlight()
+
+    @property
+    def client(self):
+        """Lazily build the underlying client on a pooled keep-alive session."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                    session.mount("https://", adapter)
+                    self._client = googlemaps.Client(
+                        key=self.api_key,
+                        requests_session=session,
+                        # Rate limiting and OVER_QUERY_LIMIT retries are handled here
+                        queries_per_second=1000,
+                        retry_over_query_limit=False,
+                    )
+        return self._client
+
+    def _call(self, api: str, func_name: str, *args, **kwargs):
+        """Make the call, sharing the result with identical calls already in flight."""
+        leader = []
+
+        def run():
+            leader.append(True)
+            return self._call_with_retries(api, func_name, *args, **kwargs)
+
+        with tracing.span(f"google.{api}", "google"):
+            result = self._flights.do(_flight_key(func_name, args, kwargs), run)
+            if not leader:
+                tracing.count("cache_hits")
+                with self._stats_lock:
+                    self._stats[api].coalesced += 1
+        return result
+
+    def _call_with_retries(self, api: str, func_name: str, *args, **kwargs):
+        bucket = self._buckets[api]
+        stats = self._stats[api]
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            tracing.count("google_calls")
+            start = time.perf_counter()
+            try:
+                result = getattr(self.client, func_name)(*args, **kwargs)
+                if func_name == "places_photo":
+                    # The client streams chunks; read them inside the timed, retried attempt
+                    result = b"".join(chunk for chunk in result if chunk)
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                over_limit = _is_over_query_limit(e)
+                with self._stats_lock:
+                    stats.calls += 1
+                    stats.errors += 1
+                    stats.total_latency += elapsed
+                    stats.max_latency = max(stats.max_latency, elapsed)
+                    stats.throttled_seconds += waited
+                    if over_limit:
+                        stats.over_query_limit += 1
+                if not over_limit or attempt >= MAX_RETRIES:
+                    raise
+                attempt += 1
+                with self._stats_lock:
+                    stats.retries += 1
+                # Full jitter exponential backoff
+                time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+                continue
+
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                stats.calls += 1
+                stats.total_latency += elapsed
+                stats.max_latency = max(stats.max_latency, elapsed)
+                stats.throttled_seconds += waited
+            return result
+
+    def places(self, *args, **kwargs):
+        """Places text search (`googlemaps.Client.places`)."""
+        return self._call(TEXT_SEARCH, "places", *args, **kwargs)
+
+    def place(self, *args, **kwargs):
+        """Place details (`googlemaps.Client.place`)."""
+        return self._call(DETAILS, "place", *args, **kwargs)
+
+    def distance_matrix(self, *args, **kwargs):
+        """Distance matrix (`googlemaps.Client.distance_matrix`)."""
+        return self._call(DISTANCE_MATRIX, "distance_matrix", *args, **kwargs)
+
+    def places_photo(self, photo_reference: str, max_width: Optional[int] = None,
+                     max_height: Optional[int] = None) -> bytes:
+        """Place photo bytes (`googlemaps.Client.places_photo`, fully read)."""
+        return self._call(PHOTO, "places_photo", photo_reference, max_width=max_width, max_height=max_height)
+
+    def stats(self) -> dict:
+        """Snapshot of per-API counters."""
+        with self._stats_lock:
+            return {api: s.as_dict() for api, s in self._stats.items()}
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_maps_gateway() -> MapsGateway:
+    """Return the process-wide gateway, creating it on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None and os.getenv("GOOGLE_MAPS_FAKE") == "1":
+                # Offline fixture-backed client (fakes.py)
+                from fakes import FakeMapsClient
+                _gateway = MapsGateway(api_key="fake", client=FakeMapsClient.from_env())
+            elif _gateway is None:
+                _gateway = MapsGateway()
+    return _gateway
@@ -0,0 +1,317 @@
+"""
+Content-addressed disk cache for Google Places photos.
+
+Each photo is fetched from Google once (through the Maps gateway, so the API
+key never reaches clients) and stored under the SHA-256 of its bytes:
+
+    <root>/refs/<sha256(photo_reference)>     -> "<digest> <content type>"
+    <root>/blobs/<dd>/<digest>                 original bytes
+    <root>/blobs/<dd>/<digest>.w<width>.jpg    resized thumbnail variants
+
+Thumbnails need Pillow; without it every width is served the original image.
+Identical photos reachable through different references share one blob.
+
+Proxy URLs are signed (`photo_url`), so the proxy only spends Google quota on
+references this service handed out; cached references are served unsigned.
+Set PHOTO_URL_SECRET in production; without it a random key is generated and
+kept in the cache directory, which only the workers of one host share.
+
+The blobs are bounded by PHOTO_CACHE_MAX_BYTES: past it, the least recently
+served files are deleted (a photo whose original was evicted is fetched again).
+"""
+
+import hashlib
+import hmac
+import os
+import tempfile
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Tuple
+
+from single_flight import SingleFlight
+
+try:
+    from PIL import Image
+except ImportError:  # Optional: thumbnails fall back to the original image
+    Image = None
+
+
+PHOTO_CACHE_DIR = os.getenv("PHOTO_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "travel-photo-cache")
+# Width requested from Google for the cached original
+ORIGINAL_MAX_WIDTH = int(os.getenv("PHOTO_ORIGINAL_MAX_WIDTH", "1600"))
+# Thumbnail widths served; other requested widths round up to the next one
+THUMBNAIL_WIDTHS = (200, 400, 800, 1200)
+THUMBNAIL_QUALITY = 82
+PHOTO_CACHE_MAX_BYTES = int(os.getenv("PHOTO_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Eviction deletes down to this fraction of the limit, so it does not run on every write
+EVICT_TO_FRACTION = 0.9
+# Public base of the proxy URLs embedded in tool output; relative URLs when unset
+PHOTO_PROXY_BASE_URL = os.getenv("PHOTO_PROXY_BASE_URL", "").rstrip("/")
+if not PHOTO_PROXY_BASE_URL:
+    print("PHOTO_PROXY_BASE_URL is not set; photo URLs in tool output are relative (/api/photos/...)")
+
+_MAGIC = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def sniff_content_type(data: bytes) -> str:
+    """Image MIME type from the leading bytes."""
+    for magic, content_type in _MAGIC:
+        if data.startswith(magic):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def thumbnail_width(requested: Optional[int]) -> Optional[int]:
+    """Smallest thumbnail width >= `requested`, or None for the original."""
+    if not requested:
+        return None
+    for width in THUMBNAIL_WIDTHS:
+        if width >= requested:
+            return width
+    return None
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class PhotoCache:
+    """Fetch-once, content-addressed photo store with lazily built thumbnails."""
+
+    def __init__(self, root=PHOTO_CACHE_DIR, gateway=None, max_bytes: int = PHOTO_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self._gateway = gateway
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.thumbnails_built = 0
+        self.evicted = 0
+        self.max_bytes = max_bytes
+        # Bytes under blobs/, counted on the first write (approximate across processes)
+        self._size = None
+
+    @property
+    def gateway(self):
+        if self._gateway is None:
+            from maps_gateway import get_maps_gateway
+            self._gateway = get_maps_gateway()
+        return self._gateway
+
+    def _ref_path(self, photo_reference: str) -> Path:
+        key = hashlib.sha256(photo_reference.encode("utf-8")).hexdigest()
+        return self.root / "refs" / key
+
+    def _blob_path(self, digest: str, width: Optional[int] = None) -> Path:
+        name = digest if width is None else f"{digest}.w{width}.jpg"
+        return self.root / "blobs" / digest[:2] / name
+
+    def _lookup(self, photo_reference: str) -> Optional[Tuple[str, str]]:
+        try:
+            digest, content_type = self._ref_path(photo_reference).read_text().split()
+        except (FileNotFoundError, ValueError):
+            return None
+        return (digest, content_type) if self._blob_path(digest).exists() else None
+
+    def _fetch(self, photo_reference: str) -> Tuple[str, str]:
+        # Another request may have stored it while this one waited
+        found = self._lookup(photo_reference)
+        if found:
+            return found
+        data = self.gateway.places_photo(photo_reference, max_width=ORIGINAL_MAX_WIDTH)
+        if not data:
+            raise LookupError("Empty photo response")
+        digest = hashlib.sha256(data).hexdigest()
+        content_type = sniff_content_type(data)
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            _atomic_write(blob, data)
+            self._added(len(data))
+        _atomic_write(self._ref_path(photo_reference), f"{digest} {content_type}".encode("ascii"))
+        with self._lock:
+            self.misses += 1
+        return digest, content_type
+
+    def _thumbnail(self, digest: str, width: int) -> Optional[Path]:
+        path = self._blob_path(digest, width)
+        if path.exists():
+            return path
+        if Image is None:
+            return None
+        with Image.open(self._blob_path(digest)) as image:
+            if image.width <= width:
+                return None
+            image = image.convert("RGB")
+            image.thumbnail((width, width * image.height // image.width + 1))
+            out = BytesIO()
+            image.save(out, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+        _atomic_write(path, out.getvalue())
+        with self._lock:
+            self.thumbnails_built += 1
+        self._added(len(out.getvalue()))
+        return path
+
+    def _blob_files(self) -> list:
+        files = []
+        for path in (self.root / "blobs").glob("*/*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if not path.name.startswith(".tmp-"):
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _added(self, size: int) -> None:
+        """Count a new blob file and evict the least recently served ones past `max_bytes`."""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(f[1] for f in self._blob_files())
+            else:
+                self._size += size
+            if self._size <= self.max_bytes:
+                return
+            # Rescan: other processes share the directory
+            files = sorted(self._blob_files(), key=lambda f: f[0])
+            total = sum(f[1] for f in files)
+            target = self.max_bytes * EVICT_TO_FRACTION
+            for _, file_size, path in files:
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= file_size
+                self.evicted += 1
+            self._size = total
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        # The mtime doubles as the last-served time for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def is_cached(self, photo_reference: str) -> bool:
+        """True if the photo is already on disk (serving it costs no Google call)."""
+        return self._lookup(photo_reference) is not None
+
+    def get(self, photo_reference: str, width: Optional[int] = None) -> Tuple[Path, str, str]:
+        """Return (file path, content type, etag) for a photo, fetching it on first use.
+
+        Args:
+            photo_reference: Google Places photo reference.
+            width: Desired width in pixels; rounded up to a thumbnail size. None for the original.
+        """
+        found = self._lookup(photo_reference)
+        if found:
+            with self._lock:
+                self.hits += 1
+        else:
+            # Concurrent first requests for a reference share one Google fetch
+            found = self._flights.do(("photo", photo_reference), lambda: self._fetch(photo_reference))
+        digest, content_type = found
+
+        variant = thumbnail_width(width)
+        if variant:
+            path = self._flights.do(("thumb", digest, variant), lambda: self._thumbnail(digest, variant))
+            if path is not None:
+                self._touch(path)
+                return path, "image/jpeg", f'"{digest[:32]}-w{variant}"'
+        path = self._blob_path(digest)
+        self._touch(path)
+        return path, content_type, f'"{digest[:32]}"'
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "thumbnails_built": self.thumbnails_built,
+                "thumbnails_enabled": Image is not None,
+                "evicted": self.evicted,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "root": str(self.root),
+            }
+
+
+_photo_cache = None
+_photo_cache_lock = threading.Lock()
+
+
+def get_photo_cache() -> PhotoCache:
+    """Return the process-wide photo cache, creating it on first use."""
+    global _photo_cache
+    if _photo_cache is None:
+        with _photo_cache_lock:
+            if _photo_cache is None:
+                _photo_cache = PhotoCache()
+    return _photo_cache
+
+
+_signing_key = None
+
+
+def _load_signing_key() -> bytes:
+    """PHOTO_URL_SECRET, else a random key created once in the cache directory."""
+    secret = os.getenv("PHOTO_URL_SECRET")
+    if secret:
+        return hashlib.sha256(secret.encode("utf-8")).digest()
+    print("PHOTO_URL_SECRET is not set; signing photo URLs with a key generated for this host")
+    path = Path(PHOTO_CACHE_DIR) / ".url-secret"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another worker created it; wait out its write
+        for _ in range(50):
+            key = path.read_bytes()
+            if len(key) == 32:
+                return key
+            threading.Event().wait(0.01)
+        raise RuntimeError(f"Unreadable photo URL key in {path}")
+    with os.fdopen(fd, "wb") as f:
+        key = os.urandom(32)
+        f.write(key)
+    return key
+
+
+def _key() -> bytes:
+    global _signing_key
+    if _signing_key is None:
+        with _photo_cache_lock:
+            if _signing_key is None:
+                _signing_key = _load_signing_key()
+    return _signing_key
+
+
+def sign_reference(photo_reference: str) -> str:
+    """URL signature of a photo reference."""
+    return hmac.new(_key(), photo_reference.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def verify_reference(photo_reference: str, signature: Optional[str]) -> bool:
+    return bool(signature) and hmac.compare_digest(sign_reference(photo_reference), signature)
+
+
+def photo_url(photo_reference: str, width: int = 400) -> str:
+    """Signed proxy URL for a photo, as embedded in tool output (relative unless PHOTO_PROXY_BASE_URL is set)."""
+    return f"{PHOTO_PROXY_BASE_URL}/api/photos/{photo_reference}?w={width}&sig={sign_reference(photo_reference)}"
@@ -0,0 +1,113 @@
+"""
+Compaction pass for chat history before it is sent to the LLM.
+
+Assistant itineraries carry long Google photo URLs, emoji and markdown
+decoration, and are often repeated as the plan evolves. `compact_messages`
+rewrites message lines to keep their meaning with far fewer tokens:
+
+- markdown images and bare URLs become short placeholders (runs of images collapse to one)
+- blocks (paragraphs) already seen earlier in the window become a back-reference
+- emoji and markdown decoration are stripped, whitespace is collapsed
+"""
+
+import hashlib
+import re
+from typing import List, Tuple
+from urllib.parse import urlparse
+
+
+# Blocks shorter than this are never collapsed (greetings, "ok", etc.)
+MIN_REPEAT_BLOCK_CHARS = 120
+
+_MARKDOWN_IMAGE = re.compile(r"!\[([^\]]*)\]\((\S+?)\)")
+_MARKDOWN_LINK = re.compile(r"\[([^\]]+)\]\((https?://\S+?)\)")
+_URL = re.compile(r"https?://[^\s)\]>]+")
+_EMOJI = re.compile(
+    "["
+    "\U0001F000-\U0001FAFF"  # pictographs, emoticons, transport, supplemental symbols
+    "\u2600-\u27BF"  # misc symbols and dingbats
+    "\u2B00-\u2BFF"  # misc symbols and arrows (stars, etc.)
+    "\uFE0F\u200D\u20E3"  # variation selector, zero-width joiner, keycap
+    "]+"
+)
+_HEADING = re.compile(r"^[ \t]{0,3}#{1,6}[ \t]*", re.MULTILINE)
+_EMPHASIS = re.compile(r"(\*\*|__|\*|`)")
+_RULE = re.compile(r"^[ \t]*([-*_=])\1{2,}[ \t]*$", re.MULTILINE)
+_SPACES = re.compile(r"[ \t]{2,}")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_IMAGE_RUN = re.compile(r"\[image: ([^\]\n]*)\](?:\n\[image: \1\])+")
+_BLOCK_SPLIT = re.compile(r"\n\s*\n")
+_AUTHOR_PREFIX = re.compile(r"^\[[^\]\n]+\]: ")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _url_placeholder(url: str) -> str:
+    parsed = urlparse(url)
+    if "/place/photo" in parsed.path or parsed.path.startswith("/api/photos/"):
+        return "[photo]"
+    return f"[link: {parsed.netloc}]"
+
+
+def compact_text(text: str) -> str:
+    """Strip images, URLs, emoji and markdown decoration from a single message."""
+    text = _MARKDOWN_IMAGE.sub(lambda m: f"[image: {m.group(1)}]" if m.group(1) else "[image]", text)
+    text = _MARKDOWN_LINK.sub(lambda m: m.group(1), text)
+    text = _URL.sub(lambda m: _url_placeholder(m.group(0)), text)
+    text = _EMOJI.sub("", text)
+    text = _RULE.sub("", text)
+    text = _HEADING.sub("", text)
+    text = _EMPHASIS.sub("", text)
+    text = _SPACES.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    text = _IMAGE_RUN.sub(lambda m: f"[images: {m.group(1)}]", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def _block_key(block: str) -> str:
+    normalized = " ".join(block.lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def compact_messages(lines: List[str]) -> Tuple[List[str], dict]:
+    """Compact a window of message lines.
+
+    Args:
+        lines: Message lines in chronological order (e.g. `[assistant]: ...`).
+
+    Returns:
+        (compacted lines, stats) where stats reports estimated tokens before and
+        after, tokens saved, and how many repeated blocks were collapsed.
+    """
+    seen = {}
+    compacted = []
+    repeated = 0
+    for line in lines:
+        # Keep the `[author]: ` prefix intact
+        m = _AUTHOR_PREFIX.match(line)
+        prefix = m.group(0) if m else ""
+        blocks = []
+        for block in _BLOCK_SPLIT.split(compact_text(line[len(prefix):])):
+            if len(block) >= MIN_REPEAT_BLOCK_CHARS:
+                key = _block_key(block)
+                if key in seen:
+                    repeated += 1
+                    blocks.append(f"[repeats earlier block: \"{seen[key]}...\"]")
+                    continue
+                seen[key] = " ".join(block.split())[:40]
+            blocks.append(block)
+        compacted.append(prefix + "\n\n".join(blocks))
+
+    before = sum(estimate_tokens(line) for line in lines)
+    after = sum(estimate_tokens(line) for line in compacted)
+    stats = {
+        "tokens_before": before,
+        "tokens_after": after,
+        "tokens_saved": before - after,
+        "savings_ratio": round((before - after) / before, 3) if before else 0.0,
+        "repeated_blocks": repeated,
+    }
+    return compacted, stats
@@ -0,0 +1,266 @@
+"""
+Multi-city route optimizer.
+
+Given a set of cities, a total number of days and a group size, finds the best
+visiting orders and day allocations. Stays and travel are priced offline with
+the city cost table and the airport index. A leg between two cities is
+priced as ground transport when they are close, otherwise as a flight.
+
+Travel happens on the first day in the next city ("2 days Paris, 2 days
+Amsterdam, 3 days Berlin (includes travel)"), so the two searches are independent:
+
+- ordering: Held-Karp dynamic programming over (visited set, last city),
+  keeping the k best partial routes per state, vectorized per visited set;
+- days: memoized DP over (city, days left), keeping the k cheapest allocations.
+
+The k best combinations are returned, one per route before any second day split
+of the same route. Ten cities take a few tens of milliseconds.
+"""
+
+import functools
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from airports import get_airport_index
+from budget import flight_fare, get_city_costs
+
+
+MAX_CITIES = 12
+
+# Legs shorter than this go by train/bus
+GROUND_MAX_KM = 700
+GROUND_SPEED_KMH = 110
+GROUND_OVERHEAD_HOURS = 0.5
+GROUND_COST_PER_KM = 0.15
+FLIGHT_SPEED_KMH = 800
+# Getting to and through the airport
+FLIGHT_OVERHEAD_HOURS = 3.0
+# Travel time is scored at this many dollars per traveler hour
+HOUR_VALUE_USD = 20.0
+
+_SEQUENCE_SEPARATOR = re.compile(r"\s*(?:→|->|➡|—>|\bthen\b)\s*")
+_CITY_NAME = re.compile(r"[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*")
+
+
+def parse_city_sequence(text: str) -> List[str]:
+    """Cities in an "A → B → C" (or "A then B") phrase, resolved against the airport index."""
+    parts = _SEQUENCE_SEPARATOR.split(text or "")
+    if len(parts) < 2:
+        return []
+    airports = get_airport_index()
+    cities = []
+    for i, part in enumerate(parts):
+        names = _CITY_NAME.findall(part)
+        if not names:
+            continue
+        # The city is the last name before an arrow and the first one after it
+        name = names[-1] if i == 0 else names[0]
+        if airports.resolve_index(name) is not None and name not in cities:
+            cities.append(name)
+    return cities
+
+
+def leg_matrix(cities: Sequence[str], travelers: int = 1) -> Dict[str, np.ndarray]:
+    """Pairwise distance (km), hours, group cost (USD) and ground/flight mode between cities."""
+    airports = get_airport_index()
+    rows = [airports.resolve_index(c) for c in cities]
+    unknown = [c for c, r in zip(cities, rows) if r is None]
+    if unknown:
+        raise ValueError(f"Unknown cities: {', '.join(unknown)}")
+
+    km = airports.pairwise_km(rows)
+    ground = km < GROUND_MAX_KM
+    hours = np.where(ground, km / GROUND_SPEED_KMH + GROUND_OVERHEAD_HOURS,
+                     km / FLIGHT_SPEED_KMH + FLIGHT_OVERHEAD_HOURS)
+    fare = np.where(ground, km * GROUND_COST_PER_KM, flight_fare(km))
+    np.fill_diagonal(hours, 0.0)
+    return {"km": km, "hours": hours, "cost": fare * travelers, "ground": ground}
+
+
+def daily_stay_costs(cities: Sequence[str], travelers: int = 1) -> Tuple[np.ndarray, List[str]]:
+    """Per-day stay cost for the group in each city; cities missing from the table use the median."""
+    costs = get_city_costs()
+    median = np.median(costs.hotel) + (np.median(costs.food) + np.median(costs.transport)) * travelers
+    daily, estimated = [], []
+    for city in cities:
+        d = costs.daily(city)
+        if d is None:
+            estimated.append(city)
+            daily.append(median)
+        else:
+            daily.append(d["hotel"] + (d["food"] + d["transport"]) * travelers)
+    return np.asarray(daily, dtype=np.float64), estimated
+
+
+def best_orders(weights: np.ndarray, start: np.ndarray, end: np.ndarray, k: int) -> List[Tuple[float, List[int]]]:
+    """The k lowest-weight paths visiting every node once (Held-Karp with k best per state).
+
+    Args:
+        weights: (n, n) leg weights.
+        start: (n,) weight of starting at each node (e.g. from the home city).
+        end: (n,) weight of finishing at each node (e.g. flying home).
+        k: Number of paths to return.
+    """
+    n = len(weights)
+    full = (1 << n) - 1
+    dp = np.full((full + 1, n, k), np.inf)
+    parent = np.zeros((full + 1, n, k), dtype=np.int64)
+    for i in range(n):
+        dp[1 << i, i, 0] = start[i]
+
+    bits = 1 << np.arange(n)
+    for mask in range(1, full + 1):
+        lasts = np.flatnonzero(mask & bits)
+        if len(lasts) < 2:
+            continue
+        # (last, prev, rank): extend each of prev's k best paths to `last`
+        candidates = dp[mask ^ bits[lasts]] + weights[:, lasts].T[:, :, None]
+        flat = candidates.reshape(len(lasts), -1)
+        keep = min(k, flat.shape[1])
+        idx = np.argpartition(flat, keep - 1, axis=1)[:, :keep]
+        order = np.take_along_axis(flat, idx, axis=1).argsort(axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        dp[mask, lasts, :keep] = np.take_along_axis(flat, idx, axis=1)
+        parent[mask, lasts, :keep] = idx
+
+    totals = (dp[full] + end[:, None]).ravel()
+    results = []
+    for flat_idx in np.argsort(totals)[:k]:
+        if not np.isfinite(totals[flat_idx]):
+            break
+        last, rank = divmod(int(flat_idx), k)
+        path, mask = [], full
+        while True:
+            path.append(last)
+            if mask == 1 << last:
+                break
+            prev, rank = divmod(int(parent[mask, last, rank]), k)
+            mask ^= 1 << last
+            last = prev
+        results.append((float(totals[flat_idx]), path[::-1]))
+    return results
+
+
+def best_allocations(daily: np.ndarray, total_days: int, ranges: Sequence[Tuple[int, int]],
+                     k: int) -> List[Tuple[float, Tuple[int, ...]]]:
+    """The k cheapest ways to split `total_days` over cities, each within its (min, max) days."""
+
+    @functools.lru_cache(maxsize=None)
+    def allocate(i: int, remaining: int) -> Tuple[Tuple[float, Tuple[int, ...]], ...]:
+        if i == len(daily):
+            return ((0.0, ()),) if remaining == 0 else ()
+        low, high = ranges[i]
+        options = []
+        for days in range(low, min(high, remaining) + 1):
+            for cost, rest in allocate(i + 1, remaining - days):
+                options.append((cost + days * daily[i], (days,) + rest))
+        options.sort()
+        return tuple(options[:k])
+
+    return list(allocate(0, total_days))
+
+
+def _day_ranges(cities: Sequence[str], total_days: int,
+                day_constraints: Optional[Dict[str, Union[int, Sequence[int]]]]) -> List[Tuple[int, int]]:
+    ranges = {}
+    for city in cities:
+        constraint = (day_constraints or {}).get(city)
+        if constraint is None:
+            continue
+        if isinstance(constraint, (int, float, str)):
+            low = high = int(constraint)
+        else:
+            low, high = (int(days) for days in constraint)
+        if not 1 <= low <= high:
+            raise ValueError(f"Days for {city} must be at least 1, with min <= max")
+        ranges[city] = (low, high)
+
+    # Unconstrained cities stay within a day of an even split of the days the others leave
+    free = len(cities) - len(ranges)
+    even = max(1.0, (total_days - sum(low for low, _ in ranges.values())) / max(free, 1))
+    default = (max(1, math.floor(even) - 1), math.ceil(even) + 1)
+    return [ranges.get(city, default) for city in cities]
+
+
+def optimize_route(cities: Sequence[str], total_days: int, travelers: int = 1, origin: Optional[str] = None,
+                   budget: Optional[float] = None, day_constraints: Optional[dict] = None,
+                   top_k: int = 3) -> dict:
+    """Rank multi-city itineraries by cost plus travel time.
+
+    Args:
+        cities: Cities to visit, each once.
+        total_days: Days for the whole trip; travel happens on arrival days.
+        travelers: Group size.
+        origin: Home city; when given the trip starts and ends there.
+        budget: Total budget; itineraries within it rank first.
+        day_constraints: City -> exact days or (min, max) days.
+        top_k: Number of itineraries to return.
+
+    Returns:
+        dict with ranked `itineraries` (route, per-city days, legs, costs) and any
+        cities whose stay costs were estimated.
+    """
+    cities = list(dict.fromkeys(cities))
+    if not 1 <= len(cities) <= MAX_CITIES:
+        raise ValueError(f"Between 1 and {MAX_CITIES} cities are supported")
+    n = len(cities)
+    nodes = cities + ([origin] if origin else [])
+    legs = leg_matrix(nodes, travelers)
+    score = legs["cost"] + HOUR_VALUE_USD * travelers * legs["hours"]
+
+    if origin:
+        start, end = score[n, :n], score[:n, n]
+    else:
+        start = end = np.zeros(n)
+    # Routes cost the same in either direction; ask for extra routes and drop the mirrors
+    orders = best_orders(score[:n, :n], start, end, top_k * 2)
+    seen = set()
+    orders = [(s, o) for s, o in orders if not (tuple(o[::-1]) in seen or seen.add(tuple(o)))][:top_k]
+
+    daily, estimated = daily_stay_costs(cities, travelers)
+    allocations = best_allocations(daily, total_days, _day_ranges(cities, total_days, day_constraints), top_k)
+    if not allocations:
+        raise ValueError("Day constraints cannot be met within the total days")
+
+    itineraries = []
+    for order_score, order in orders:
+        stops = ([n] if origin else []) + order + ([n] if origin else [])
+        leg_list = [
+            {
+                "from": nodes[a],
+                "to": nodes[b],
+                "mode": "ground" if legs["ground"][a, b] else "flight",
+                "distance_km": round(float(legs["km"][a, b]), 1),
+                "hours": round(float(legs["hours"][a, b]), 1),
+                "cost": round(float(legs["cost"][a, b]), 2),
+            }
+            for a, b in zip(stops[:-1], stops[1:])
+        ]
+        travel_cost = sum(leg["cost"] for leg in leg_list)
+        travel_hours = sum(leg["hours"] for leg in leg_list)
+        for stay_cost, days in allocations:
+            total = travel_cost + stay_cost
+            itineraries.append({
+                "route": [cities[i] for i in order],
+                "days": [{"city": cities[i], "days": days[i]} for i in order],
+                "legs": leg_list,
+                "travel_cost": round(travel_cost, 2),
+                "stay_cost": round(stay_cost, 2),
+                "total_cost": round(total, 2),
+                "travel_hours": round(travel_hours, 1),
+                "within_budget": budget is None or total <= budget,
+                "score": round(order_score + stay_cost, 2),
+            })
+
+    itineraries.sort(key=lambda it: (not it["within_budget"], it["score"]))
+    # Best itinerary of each route first, then the other day splits, so the
+    # results are not one route with different allocations
+    routes, firsts, others = set(), [], []
+    for it in itineraries:
+        route = tuple(it["route"])
+        (others if route in routes else firsts).append(it)
+        routes.add(route)
+    return {"itineraries": (firsts + others)[:top_k], "estimated_costs": estimated}
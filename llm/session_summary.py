@@ -0,0 +1,146 @@
+"""
+Incremental rolling summaries for long chat sessions.
+
+Each session keeps a summary document in Mongo with a high-water-mark message
+`_id`. A run only reads messages after that mark: the newest ones that fit the
+token budget are sent verbatim as the "recent tail", and anything older is
+folded into the summary in bounded chunks and the mark advances past it.
+"""
+
+import datetime
+import os
+from typing import Callable, List, Optional
+
+from prompt_compaction import compact_messages, estimate_tokens
+
+
+SUMMARIES_COLLECTION = "session_summaries"
+
+# Approximate prompt budget for summary + recent tail (override with LLM_CONTEXT_TOKEN_BUDGET)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("LLM_CONTEXT_TOKEN_BUDGET", "6000"))
+# Maximum size of one batch of messages folded into the summary per LLM call
+SUMMARY_CHUNK_TOKENS = int(os.getenv("LLM_SUMMARY_CHUNK_TOKENS", "3000"))
+
+# (previous_summary, new_message_lines) -> updated summary
+Summarizer = Callable[[str, List[str]], str]
+
+
+def format_message(doc: dict) -> str:
+    """Render a stored message as `[author]: content`."""
+    author = doc.get("role") or doc.get("username") or "user"
+    content = doc.get("content") or doc.get("message") or ""
+    return f"[{author}]: {content}"
+
+
+def _fold(summary: str, lines: List[str], summarize: Summarizer) -> str:
+    """Fold `lines` into `summary`, one chunk of at most SUMMARY_CHUNK_TOKENS per call."""
+    chunk, chunk_tokens = [], 0
+    for line in lines:
+        tokens = estimate_tokens(line)
+        if chunk and chunk_tokens + tokens > SUMMARY_CHUNK_TOKENS:
+            summary = summarize(summary, chunk)
+            chunk, chunk_tokens = [], 0
+        chunk.append(line)
+        chunk_tokens += tokens
+    if chunk:
+        summary = summarize(summary, chunk)
+    return summary
+
+
+def _merge_stats(a: dict, b: dict) -> dict:
+    merged = {key: a[key] + b[key] for key in ("tokens_before", "tokens_after", "tokens_saved", "repeated_blocks")}
+    before = merged["tokens_before"]
+    merged["savings_ratio"] = round(merged["tokens_saved"] / before, 3) if before else 0.0
+    return merged
+
+
+def build_session_context(db, messages_coll, session_id: str, summarize: Summarizer,
+                          token_budget: Optional[int] = None, compact: bool = True) -> dict:
+    """Update the session's rolling summary and return "summary + recent tail".
+
+    Args:
+        db: Mongo database holding the summaries collection.
+        messages_coll: Collection the session's messages are stored in.
+        session_id: Session to build context for.
+        summarize: Callable that folds new message lines into the previous summary.
+        token_budget: Approximate token budget for summary + tail (default CONTEXT_TOKEN_BUDGET).
+        compact: Run the prompt compaction pass over new messages (default True); the
+            folded messages and the tail are compacted separately.
+
+    Returns:
+        dict with `summary`, `tail` (message lines sent verbatim), `folded` (messages
+        summarized on this run), `last_summarized_id` and `compaction` stats.
+    """
+    token_budget = token_budget or CONTEXT_TOKEN_BUDGET
+    summaries = db.get_collection(SUMMARIES_COLLECTION)
+
+    state = summaries.find_one({"session_id": session_id}) or {}
+    summary = state.get("summary", "")
+    high_water_mark = state.get("last_message_id")
+
+    query = {"session_id": session_id}
+    if high_water_mark is not None:
+        query["_id"] = {"$gt": high_water_mark}
+    docs = list(messages_coll.find(query).sort("_id", 1))
+    raw = [format_message(d) for d in docs]
+    lines = compact_messages(raw)[0] if compact else raw
+
+    # Keep the newest messages that fit next to the summary; always keep the latest one
+    remaining = token_budget - estimate_tokens(summary)
+    tail_start = len(lines)
+    while tail_start > 0:
+        tokens = estimate_tokens(lines[tail_start - 1])
+        if tail_start < len(lines) and tokens > remaining:
+            break
+        remaining -= tokens
+        tail_start -= 1
+
+    compaction = None
+    if compact:
+        # Compact the folded part and the tail separately, so no tail line refers to a
+        # repeated block that only the summarizer saw; that can make the tail longer,
+        # so drop its oldest lines until it fits again
+        while True:
+            tail, tail_stats = compact_messages(raw[tail_start:])
+            fits = sum(estimate_tokens(line) for line in tail) <= token_budget - estimate_tokens(summary)
+            if fits or tail_start >= len(raw) - 1:
+                break
+            tail_start += 1
+        head, head_stats = compact_messages(raw[:tail_start])
+        lines = head + tail
+        compaction = _merge_stats(head_stats, tail_stats)
+
+    folded = docs[:tail_start]
+    if folded:
+        summary = _fold(summary, lines[:tail_start], summarize)
+        high_water_mark = folded[-1]["_id"]
+        summaries.update_one(
+            {"session_id": session_id},
+            {
+                "$set": {
+                    "summary": summary,
+                    "last_message_id": high_water_mark,
+                    "updated_at": datetime.datetime.utcnow(),
+                },
+                "$inc": {"summarized_count": len(folded)},
+            },
+            upsert=True,
+        )
+
+    return {
+        "summary": summary,
+        "tail": lines[tail_start:],
+        "folded": len(folded),
+        "last_summarized_id": high_water_mark,
+        "compaction": compaction,
+    }
+
+
+def render_context(context: dict) -> str:
+    """Render the output of `build_session_context` as conversation text for the prompt."""
+    parts = []
+    if context["summary"]:
+        parts.append("Summary of the earlier conversation:\n" + context["summary"])
+    if context["tail"]:
+        parts.append("Recent messages:\n" + "\n".join(context["tail"]))
+    return "\n\n".join(parts)
@@ -0,0 +1,17 @@
+"""
+Test setup: offline fakes for the LLM, Google Maps and Mongo.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("LLM_FAKE", "1")
+os.environ.setdefault("GOOGLE_MAPS_FAKE", "1")
+os.environ.setdefault("MONGO_URI", "mongomock://")
+os.environ.setdefault("LLM_WARMUP", "0")
+os.environ.setdefault("LLM_JOB_STORE", "memory")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("PHOTO_URL_SECRET", "test-secret")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,35 @@
+import numpy as np
+
+import airports
+from fakes import call_counts, reset_call_counts
+
+
+def test_first_load_saves_the_index_for_the_next_process(tmp_path, monkeypatch):
+    index_dir = tmp_path / "airport_index"
+    monkeypatch.setenv("AIRPORT_INDEX_DIR", str(index_dir))
+    monkeypatch.setattr(airports, "_index", None)
+
+    built = airports.get_airport_index()
+    assert (index_dir / "meta.json").exists()
+    assert not isinstance(built.lat, np.memmap)
+
+    monkeypatch.setattr(airports, "_index", None)
+    loaded = airports.get_airport_index()
+    assert isinstance(loaded.lat, np.memmap)
+    assert loaded.resolve("Paris")["iata"] == built.resolve("Paris")["iata"]
+    monkeypatch.setattr(airports, "_index", None)
+
+
+def test_city_outside_the_index_falls_back_to_places():
+    from tools import _calculate_flights
+    assert airports.get_airport_index().resolve("Timbuktu") is None
+
+    reset_call_counts()
+    flights = _calculate_flights("Timbuktu", "Paris")
+    assert "error" not in flights[0]
+    assert flights[0]["destination_airport"].startswith("Timbuktu")
+    assert call_counts().get("maps.places") == 1
+
+    reset_call_counts()
+    assert "error" not in _calculate_flights("London", "Paris")[0]
+    assert not call_counts().get("maps.places")
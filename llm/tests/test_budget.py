@@ -0,0 +1,27 @@
+from budget import CityCostTable, estimate_budgets, get_city_costs
+
+
+def test_scenarios_are_ranked_and_filtered():
+    result = estimate_budgets(["Paris", "Bangkok"], [3, 5], [1, 2], budget=2000)
+    totals = [s["total"] for s in result["scenarios"]]
+    assert result["evaluated"] == 8
+    assert totals == sorted(totals) and all(t <= 2000 for t in totals)
+
+
+def test_destination_without_an_airport_is_reported():
+    bundled = get_city_costs()
+    paris = bundled.daily("Paris")
+    costs = CityCostTable(["Paris", "Atlantis"], [paris["hotel"], 100], [paris["food"], 40],
+                          [paris["transport"], 10])
+
+    result = estimate_budgets(["Paris", "Atlantis", "Gotham"], origins=["London"], costs=costs)
+
+    assert [s["destination"] for s in result["scenarios"]] == ["Paris"]
+    assert result["scenarios"][0]["flights"] > 0
+    assert result["unknown_destinations"] == ["Gotham"]
+    assert result["unknown_destination_airports"] == ["Atlantis"]
+
+    # Without origins there are no flights to price, so every costed city is ranked
+    result = estimate_budgets(["Paris", "Atlantis"], costs=costs)
+    assert {s["destination"] for s in result["scenarios"]} == {"Paris", "Atlantis"}
+    assert result["unknown_destination_airports"] == []
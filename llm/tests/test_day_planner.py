@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+
+from day_planner import _assign, _distance_matrix, _path_length, cluster_days, order_route, plan_days
+
+
+def _places(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"name": f"p{i}", "lat": 48.85 + rng.uniform(-0.05, 0.05), "lon": 2.35 + rng.uniform(-0.08, 0.08),
+             "rating": round(rng.uniform(3, 5), 2)} for i in range(n)]
+
+
+def _nearest_neighbour(dist, start):
+    path, left = [start], set(range(len(dist))) - {start}
+    while left:
+        path.append(min(left, key=lambda j: dist[path[-1], j]))
+        left.remove(path[-1])
+    return path
+
+
+def test_assign_fills_closest_pairs_within_capacity():
+    sq_dist = np.array([[0.0, 9.0], [1.0, 8.0], [2.0, 7.0], [3.0, 0.5]])
+    labels = _assign(sq_dist, capacity=2)
+    # Points 0 and 1 take centroid 0's two slots, so point 2 goes to centroid 1 despite being closer to 0
+    assert labels.tolist() == [0, 0, 1, 1]
+
+
+def test_clusters_are_balanced():
+    rng = np.random.default_rng(3)
+    # Two dense blobs of unequal size: plain k-means would give the big blob most days' worth
+    xy = np.vstack([rng.normal(0, 1, (80, 2)), rng.normal(50, 1, (20, 2))])
+    labels = cluster_days(xy, 7)
+    sizes = np.bincount(labels, minlength=7)
+    assert sizes.sum() == 100 and sizes.max() <= 15
+    assert set(labels.tolist()) == set(range(7))
+
+    # Fewer points than days: one point per cluster
+    assert sorted(cluster_days(xy[:3], 5).tolist()) == [0, 1, 2]
+
+
+def test_two_opt_is_never_longer_than_nearest_neighbour():
+    rng = np.random.default_rng(5)
+    for trial in range(20):
+        coords = tuple(map(tuple, rng.uniform([48.8, 2.25], [48.9, 2.45], (int(rng.integers(3, 40)), 2))))
+        dist = _distance_matrix(coords)
+        start = int(rng.integers(len(dist)))
+        route = order_route(dist, start)
+        assert route[0] == start and sorted(route) == list(range(len(dist)))
+        assert _path_length(dist, route) <= _path_length(dist, _nearest_neighbour(dist, start)) + 1e-9
+
+
+def test_short_routes():
+    dist = np.array([[0.0, 1.0], [1.0, 0.0]])
+    assert order_route(dist, 1) == [1, 0]
+    assert order_route(np.zeros((1, 1)), 0) == [0]
+
+
+def test_empty_and_too_few_candidates():
+    assert plan_days([], 3) == [{"day": d, "places": [], "distance_km": 0.0} for d in (1, 2, 3)]
+    # Places without coordinates are dropped
+    assert all(not day["places"] for day in plan_days([{"name": "nowhere"}], 2))
+
+    days = plan_days(_places(2), 4)
+    assert [d["day"] for d in days] == [1, 2, 3, 4]
+    assert sorted(len(d["places"]) for d in days) == [0, 0, 1, 1]
+
+
+def test_plan_keeps_best_rated_places_and_visits_each_once():
+    places = _places(30)
+    days = plan_days(places, 3, max_per_day=4)
+    visited = [p["name"] for d in days for p in d["places"]]
+    best = {p["name"] for p in sorted(places, key=lambda p: -p["rating"])[:12]}
+    assert len(visited) == 12 and set(visited) == best
+    assert all(len(d["places"]) == 4 for d in days)
+
+
+def test_lays_out_a_hundred_places_in_milliseconds():
+    places = _places(150, seed=9)
+    plan_days(_places(20, seed=10), 2)  # warm up imports and NumPy
+    started = time.perf_counter()
+    days = plan_days(places, 5)
+    elapsed = time.perf_counter() - started
+    assert sum(len(d["places"]) for d in days) == 150
+    # Typically ~15 ms; the bound leaves room for slow CI machines
+    assert elapsed < 0.5
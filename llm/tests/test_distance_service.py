@@ -0,0 +1,63 @@
+import numpy as np
+
+from day_planner import travel_seconds
+from distance_service import DistanceService, location_key
+from fakes import FakeMapsClient
+
+
+class RecordingGateway(FakeMapsClient):
+    def __init__(self):
+        super().__init__(fixtures_path=None)
+        self.requests = []
+
+    def distance_matrix(self, origins, destinations, mode=None, **kwargs):
+        self.requests.append((list(origins), list(destinations)))
+        return super().distance_matrix(origins, destinations, mode=mode, **kwargs)
+
+
+def _places(n):
+    return [(48.85 + i * 0.01, 2.35 + i * 0.005) for i in range(n)]
+
+
+def test_block_is_fetched_once_and_read_both_ways():
+    gateway = RecordingGateway()
+    service = DistanceService(gateway=gateway)
+    places = _places(8)
+
+    meters, seconds = service.matrix(places, mode="walking")
+    # One request for the upper triangle of an 8 x 8 block
+    assert len(gateway.requests) == 1
+    origins, destinations = gateway.requests[0]
+    assert len(origins) * len(destinations) <= 100
+    assert np.array_equal(meters, meters.T) and np.array_equal(seconds, seconds.T)
+    assert (np.diag(meters) == 0).all() and (meters[~np.eye(8, dtype=bool)] > 0).all()
+
+    # Reversed order and reversed pairs are served from the mirrored cache entries
+    reversed_meters, _ = service.matrix(places[::-1], mode="walking")
+    assert np.array_equal(reversed_meters, meters[::-1, ::-1])
+    b, a = location_key(places[5]), location_key(places[2])
+    assert service.pairs([(places[5], places[2])], mode="walking")[(b, a)][0] == meters[5, 2]
+    assert len(gateway.requests) == 1
+    assert service.stats()["misses"] == 28
+
+    # Another travel mode is a separate cache
+    service.matrix(places, mode="driving")
+    assert len(gateway.requests) == 2
+
+
+def test_large_matrix_splits_into_symmetric_blocks():
+    gateway = RecordingGateway()
+    service = DistanceService(gateway=gateway)
+    service.matrix(_places(15))
+    # Blocks of 10: (0, 0), (0, 1) and (1, 1); the mirrored (1, 0) block is never requested
+    assert len(gateway.requests) == 3
+    assert all(len(o) * len(d) <= 100 for o, d in gateway.requests)
+
+
+def test_day_planner_travel_seconds_uses_the_service():
+    gateway = RecordingGateway()
+    service = DistanceService(gateway=gateway)
+    places = [{"lat": lat, "lon": lon} for lat, lon in _places(4)]
+    seconds = travel_seconds(places, "walking", service=service)
+    assert seconds.shape == (4, 4) and np.array_equal(seconds, seconds.T)
+    assert len(gateway.requests) == 1
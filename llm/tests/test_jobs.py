@@ -0,0 +1,72 @@
+import asyncio
+import datetime
+import json
+import time
+
+import pytest
+
+import main
+from jobs import (
+    FAILED, INTERRUPTED_ERROR, QUEUED, RUNNING, SUCCEEDED, JobQueue, MemoryJobStore, MongoJobStore,
+)
+
+
+def test_job_events_end_with_error_when_job_disappears():
+    store = main.get_job_queue().store
+    store.create({"_id": "gone", "kind": "test", "status": RUNNING})
+
+    async def collect():
+        response = await main.llm_job_events("gone", interval=0.1)
+        events = []
+        async for frame in response.body_iterator:
+            events.append(json.loads(frame.split("data: ", 1)[1]))
+            # Evict the job after its first status event
+            store._jobs.pop("gone", None)
+        return events
+
+    events = asyncio.run(collect())
+    assert [e["event"] for e in events] == ["status", "error"]
+
+
+def test_stream_ends_with_error_after_its_maximum_lifetime(monkeypatch):
+    monkeypatch.setattr(main, "JOB_EVENTS_MAX_SECONDS", 0.3)
+    main.get_job_queue().store.create({"_id": "stuck", "kind": "test", "status": RUNNING})
+
+    async def collect():
+        response = await main.llm_job_events("stuck", interval=0.1)
+        return [json.loads(frame.split("data: ", 1)[1]) async for frame in response.body_iterator]
+
+    events = asyncio.run(collect())
+    assert [e["event"] for e in events] == ["status", "error"]
+    assert events[-1]["status"] == RUNNING
+
+
+def test_jobs_of_a_dead_process_are_failed_on_startup():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().db.llm_jobs
+    old = datetime.datetime.utcnow() - datetime.timedelta(minutes=10)
+    collection.insert_many([
+        {"_id": "crashed", "status": RUNNING, "created_at": old, "heartbeat_at": old},
+        {"_id": "legacy", "status": QUEUED, "created_at": old},
+        {"_id": "live", "status": RUNNING, "created_at": old, "heartbeat_at": datetime.datetime.utcnow()},
+        {"_id": "done", "status": SUCCEEDED, "created_at": old, "heartbeat_at": old},
+    ])
+
+    queue = JobQueue(MongoJobStore(collection), lease_seconds=60)
+    try:
+        statuses = {job["_id"]: job["status"] for job in collection.find()}
+        assert statuses == {"crashed": FAILED, "legacy": FAILED, "live": RUNNING, "done": SUCCEEDED}
+        assert collection.find_one({"_id": "crashed"})["error"] == INTERRUPTED_ERROR
+        assert queue.stats()["interrupted"] == 2
+    finally:
+        queue.shutdown()
+
+
+def test_running_jobs_keep_their_lease():
+    queue = JobQueue(MemoryJobStore(), lease_seconds=0.15)
+    try:
+        job = queue.submit("test", lambda: time.sleep(0.5) or {"ok": True})
+        time.sleep(0.7)
+        assert queue.get(job["_id"])["status"] == SUCCEEDED
+    finally:
+        queue.shutdown()
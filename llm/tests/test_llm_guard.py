@@ -0,0 +1,105 @@
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage, ToolMessage
+
+import fakes
+import llm_guard
+import main
+from llm_guard import AdaptiveLimiter, CircuitBreaker, DeadlineExceeded, LLMGuard
+
+
+class Overloaded(Exception):
+    status_code = 503
+
+
+def test_attempt_is_abandoned_at_the_deadline():
+    guard = LLMGuard(max_retries=5)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        guard.call("slow", lambda: time.sleep(0.5), deadline_seconds=0.1)
+    assert time.monotonic() - start < 0.4
+    assert guard.stats()["operations"]["slow"]["timeouts"] == 1
+    assert guard.call("slow", lambda: time.sleep(0.5), deadline_seconds=0.1, fallback=lambda: "cached") == "cached"
+
+
+def test_abandoned_attempts_keep_their_slot_until_they_return():
+    guard = LLMGuard(limiter=AdaptiveLimiter(initial=1, minimum=1, maximum=1))
+    with pytest.raises(DeadlineExceeded):
+        guard.call("slow", lambda: time.sleep(0.5), deadline_seconds=0.1)
+    # The provider call is still running, so no second call may start
+    assert guard.limiter.in_flight == 1
+    with pytest.raises(DeadlineExceeded):
+        guard.call("next", lambda: "ok", deadline_seconds=0.1)
+    time.sleep(0.5)
+    assert guard.limiter.in_flight == 0
+    assert guard.call("next", lambda: "ok") == "ok"
+
+
+def test_direct_fallback_gets_only_the_rest_of_the_run_deadline(monkeypatch):
+    class FailingAgent:
+        def invoke(self, *args, **kwargs):
+            time.sleep(0.3)
+            raise ValueError("agent failed")
+
+    def unexpected_llm():
+        raise AssertionError("no time was left for a direct model call")
+
+    monkeypatch.setattr(main, "get_agent", lambda: FailingAgent())
+    monkeypatch.setattr(main, "get_llm", unexpected_llm)
+    monkeypatch.setattr(main, "_degraded_llm_response", lambda db, session_id: {"degraded": True})
+    token = main._run_deadline.set(time.monotonic() + 0.2)
+    try:
+        assert main._generate_reply(LLMGuard(), "hello", None, "s1") == {"degraded": True}
+    finally:
+        main._run_deadline.reset(token)
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(llm_guard, "BACKOFF_BASE_SECONDS", 0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Overloaded()
+        return "ok"
+
+    guard = LLMGuard(breaker=CircuitBreaker(failure_threshold=10))
+    assert guard.call("flaky", flaky) == "ok"
+    assert len(attempts) == 3
+    assert guard.stats()["operations"]["flaky"]["retries"] == 2
+
+
+class FailsAfterTool(fakes.FakeChatModel):
+    """Fails once on the model step that follows a tool call."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if isinstance(messages[-1], ToolMessage) and not FAILED:
+            FAILED.append(True)
+            raise Overloaded()
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+FAILED = []
+
+
+def test_agent_retries_the_model_step_not_the_tool_calls(monkeypatch):
+    monkeypatch.setattr(llm_guard, "BACKOFF_BASE_SECONDS", 0.001)
+    monkeypatch.setattr(llm_guard, "_guard", LLMGuard())
+    monkeypatch.setattr(main, "_llm", FailsAfterTool())
+    monkeypatch.setattr(main, "_agent", None)
+    fakes.reset_call_counts()
+
+    result = main.get_agent().invoke({"messages": [HumanMessage(content="Plan a trip to Paris")]})
+
+    assert FAILED
+    assert result["messages"][-1].content.startswith("Based on the places found:")
+    # Tool (places) calls ran once; only the model step after them was repeated
+    tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert len(tool_messages) == 1
+    assert llm_guard.get_llm_guard().stats()["operations"]["agent"]["retries"] == 1
+    # The failed attempt raised before reaching the fake model, so two model calls are counted
+    counts = fakes.call_counts()
+    assert counts["llm"] == 2
+    assert counts["maps.places"] == 1
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import photo_cache
+from photo_cache import PhotoCache, photo_url, sign_reference
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(photo_cache, "_photo_cache", PhotoCache(tmp_path))
+    return TestClient(main.app)
+
+
+def test_photo_url_is_signed_and_relative_without_a_base(monkeypatch):
+    assert photo_url("ref-1", 400) == f"/api/photos/ref-1?w=400&sig={sign_reference('ref-1')}"
+    monkeypatch.setattr(photo_cache, "PHOTO_PROXY_BASE_URL", "https://trips.example.com")
+    assert photo_url("ref-1", 400).startswith("https://trips.example.com/api/photos/ref-1?")
+
+
+def test_without_a_secret_a_random_key_is_persisted(tmp_path, monkeypatch):
+    monkeypatch.delenv("PHOTO_URL_SECRET")
+    monkeypatch.setattr(photo_cache, "PHOTO_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(photo_cache, "_signing_key", None)
+    signature = sign_reference("ref-1")
+    assert len((tmp_path / ".url-secret").read_bytes()) == 32
+
+    # Another worker (or a restart) reads the same key
+    monkeypatch.setattr(photo_cache, "_signing_key", None)
+    assert sign_reference("ref-1") == signature
+    monkeypatch.setattr(photo_cache, "_signing_key", None)
+    (tmp_path / ".url-secret").unlink()
+    assert sign_reference("ref-1") != signature
+
+
+def test_disk_cache_evicts_least_recently_served_blobs(tmp_path):
+    class Gateway:
+        def places_photo(self, photo_reference, max_width=None):
+            return photo_reference.encode() * 1000
+
+    cache = PhotoCache(tmp_path, gateway=Gateway(), max_bytes=3500)
+    cache.get("a")
+    cache.get("b")
+    cache.get("c")
+    os.utime(cache.get("a")[0], (0, 0))
+    os.utime(cache.get("b")[0], (1, 1))
+    cache.get("c")
+    cache.get("d")
+
+    assert cache.stats()["evicted"] == 1
+    assert sum(p.stat().st_size for p in (tmp_path / "blobs").glob("*/*")) <= 3500
+    assert not cache.is_cached("a")
+    assert all(cache.is_cached(ref) for ref in "bcd")
+
+
+def test_unsigned_references_are_served_only_once_cached(client):
+    assert client.get("/api/photos/ref-1").status_code == 403
+    assert client.get("/api/photos/ref-1", params={"sig": "0" * 32}).status_code == 403
+
+    assert client.get("/api/photos/ref-1", params={"sig": sign_reference("ref-1")}).status_code == 200
+    assert client.get("/api/photos/ref-1").status_code == 200
+
+
+def test_if_none_match_compares_whole_entity_tags(client):
+    response = client.get("/api/photos/ref-2", params={"sig": sign_reference("ref-2")})
+    etag = response.headers["etag"]
+
+    def status(if_none_match):
+        return client.get("/api/photos/ref-2", headers={"If-None-Match": if_none_match}).status_code
+
+    assert status(etag) == 304
+    assert status(f'"other", W/{etag}') == 304
+    assert status("*") == 304
+    # Substrings of a longer tag are not matches
+    assert status(f'"x{etag[1:-1]}y"') == 200
+    assert status(f'"{etag[1:-2]}"') == 200
@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from route_optimizer import _day_ranges, best_allocations, best_orders, optimize_route
+
+
+def test_best_orders_matches_brute_force():
+    rng = np.random.default_rng(7)
+    for n in range(1, 7):
+        weights = rng.uniform(1, 100, (n, n))
+        start, end = rng.uniform(0, 50, n), rng.uniform(0, 50, n)
+        brute = sorted(
+            start[p[0]] + sum(weights[a, b] for a, b in zip(p, p[1:])) + end[p[-1]]
+            for p in itertools.permutations(range(n))
+        )
+        k = 5
+        results = best_orders(weights, start, end, k)
+        assert [cost for cost, _ in results] == pytest.approx(brute[:k])
+        for cost, path in results:
+            assert sorted(path) == list(range(n))
+            assert cost == pytest.approx(
+                start[path[0]] + sum(weights[a, b] for a, b in zip(path, path[1:])) + end[path[-1]])
+
+
+def test_best_allocations_matches_brute_force():
+    rng = np.random.default_rng(11)
+    daily = rng.uniform(50, 300, 4)
+    ranges = [(1, 4), (2, 3), (1, 5), (2, 2)]
+    for total in range(6, 15):
+        brute = sorted(
+            float(np.dot(days, daily))
+            for days in itertools.product(*(range(lo, hi + 1) for lo, hi in ranges))
+            if sum(days) == total
+        )
+        results = best_allocations(daily, total, ranges, 4)
+        assert [cost for cost, _ in results] == pytest.approx(brute[:4])
+        for cost, days in results:
+            assert sum(days) == total
+            assert all(lo <= d <= hi for d, (lo, hi) in zip(days, ranges))
+
+
+def test_day_ranges_accepts_floats_and_validates():
+    assert _day_ranges(["Paris", "Rome"], 6, {"Paris": 2.0, "Rome": [2.0, 4.0]}) == [(2, 2), (2, 4)]
+    with pytest.raises(ValueError):
+        _day_ranges(["Paris"], 6, {"Paris": [4, 2]})
+    with pytest.raises(ValueError):
+        _day_ranges(["Paris"], 6, {"Paris": 0})
+
+
+def test_unconstrained_cities_split_the_days_left_over():
+    assert _day_ranges(["Paris", "Amsterdam", "Berlin"], 10, {"Paris": 8}) == [(8, 8), (1, 2), (1, 2)]
+    itinerary = optimize_route(["Paris", "Amsterdam", "Berlin"], 10, day_constraints={"Paris": 8})["itineraries"][0]
+    assert {d["city"]: d["days"] for d in itinerary["days"]} == {"Paris": 8, "Amsterdam": 1, "Berlin": 1}
+
+
+def test_optimize_route_returns_distinct_routes():
+    for origin in (None, "London"):
+        routes = [tuple(it["route"]) for it in optimize_route(["Paris", "Berlin", "Rome"], 9, origin=origin)["itineraries"]]
+        assert len(routes) == 3
+        # No route twice, and no route together with its reverse
+        assert len({min(r, r[::-1]) for r in routes}) == 3
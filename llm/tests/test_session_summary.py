@@ -0,0 +1,41 @@
+import pytest
+
+from session_summary import build_session_context
+
+mongomock = pytest.importorskip("mongomock")
+
+BLOCK = "Day 1: Louvre in the morning, lunch in the Marais, a walk along the Seine and dinner in Saint-Germain near the river, then a late evening cruise past Notre-Dame."
+
+
+def _summarize(summary, lines):
+    return (summary + " " if summary else "") + f"{len(lines)} messages folded"
+
+
+def _db(contents):
+    db = mongomock.MongoClient().db
+    db.messages.insert_many([
+        {"_id": i, "session_id": "s1", "role": "assistant" if i % 2 else "user", "content": content}
+        for i, content in enumerate(contents)
+    ])
+    return db
+
+
+def test_tail_never_refers_to_a_folded_block():
+    filler = ["Sounds good, what about the budget for food and museums?"] * 6
+    db = _db([BLOCK + "\n\nShall I book it?"] + filler + ["Here it is again:\n\n" + BLOCK])
+
+    context = build_session_context(db, db.messages, "s1", _summarize, token_budget=120)
+
+    assert context["folded"] > 0
+    assert "repeats earlier block" not in "\n".join(context["tail"])
+    assert BLOCK in context["tail"][-1]
+
+
+def test_repeats_within_the_tail_are_still_collapsed():
+    db = _db([BLOCK, "ok", "Again:\n\n" + BLOCK])
+
+    context = build_session_context(db, db.messages, "s1", _summarize, token_budget=5000)
+
+    assert context["folded"] == 0
+    assert "repeats earlier block" in context["tail"][-1]
+    assert context["compaction"]["repeated_blocks"] == 1
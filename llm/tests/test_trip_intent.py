@@ -0,0 +1,16 @@
+import pytest
+
+from trip_intent import load_corpus, missing_fields, parse_trip_query
+
+
+CORPUS = load_corpus()
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["query"][:60] for case in CORPUS])
+def test_labeled_query(case):
+    assert parse_trip_query(case["query"]) == case["expected"]
+
+
+def test_missing_fields_ask_for_the_basics():
+    assert missing_fields(parse_trip_query("hello")) == ["destination", "duration", "travelers"]
+    assert missing_fields(parse_trip_query("Plan a 5-day trip to Paris for 2 people")) == []
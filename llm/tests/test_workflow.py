@@ -0,0 +1,29 @@
+import asyncio
+import json
+
+import main
+
+
+def _stream(query):
+    async def collect():
+        response = await main.plan_trip_stream(main.QueryRequest(query=query), format="ndjson", x_debug_trace=None)
+        return [json.loads(line) async for line in response.body_iterator]
+    return asyncio.run(collect())
+
+
+def test_stream_sends_the_response_text_before_final():
+    events = _stream("Plan a 3-day trip to Paris for 2 people with a budget of $2000")
+    kinds = [e["event"] for e in events]
+
+    assert kinds[-1] == "final" and "error" not in kinds
+    tokens = [e for e in events if e["event"] == "token"]
+    assert len(tokens) > 1 and all(e["node"] == "format_response" for e in tokens)
+    assert "".join(e["content"] for e in tokens) == events[-1]["response"]
+    assert kinds.index("token") < max(i for i, k in enumerate(kinds) if k == "node")
+
+
+def test_follow_up_question_is_streamed_too():
+    events = _stream("hello")
+    tokens = [e["content"] for e in events if e["event"] == "token"]
+    assert events[-1]["event"] == "final"
+    assert tokens == [events[-1]["response"]]
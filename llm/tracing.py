@@ -0,0 +1,257 @@
+"""
+Lightweight request tracing for the planning workflow, tools and outbound calls.
+
+A trace is started per request with `start_trace`; inside it, `span` (or the
+`traced` decorator) records a timed span, and `count` adds to counters on the
+current span and every span above it. Standard counters:
+
+    google_calls, openai_calls, input_tokens, output_tokens, cache_hits
+
+LangGraph nodes, `@tool` functions, Google Maps calls and LLM calls (via the
+callback handler from `callbacks()`) are instrumented. Outside a trace every
+helper is a no-op.
+
+Finished traces are appended as JSON lines to TRACE_EXPORT_PATH ("-" for
+stdout) and can be returned in the response when a request sends
+`X-Debug-Trace: 1`.
+"""
+
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+DEBUG_HEADER = "X-Debug-Trace"
+
+_current_trace = ContextVar("trace", default=None)
+_current_span = ContextVar("span", default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("span_id", "parent", "name", "kind", "start", "end", "attributes", "counters")
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attributes: dict):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = attributes
+        self.counters = {}
+
+    def to_dict(self, origin: float) -> dict:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+            "counters": self.counters,
+        }
+
+
+class Trace:
+    """All spans recorded for one request."""
+
+    def __init__(self, name: str, attributes: dict):
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.root = Span(name, "request", None, attributes)
+        self.spans = [self.root]
+        self.lock = threading.Lock()
+
+    def add_span(self, name: str, kind: str, parent: Optional[Span], attributes: dict) -> Span:
+        span_ = Span(name, kind, parent or self.root, attributes)
+        with self.lock:
+            self.spans.append(span_)
+        return span_
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            spans = [s.to_dict(self.root.start) for s in self.spans]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": spans[0]["duration_ms"],
+            "totals": dict(self.root.counters),
+            "spans": spans,
+        }
+
+
+def _export(trace: Trace) -> None:
+    if not EXPORT_PATH:
+        return
+    line = json.dumps(trace.to_dict(), default=str)
+    with _export_lock:
+        if EXPORT_PATH == "-":
+            print(line, file=sys.stdout, flush=True)
+        else:
+            with open(EXPORT_PATH, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def tracing_enabled(debug_header: Optional[str] = None) -> bool:
+    """Trace when exporting is configured or the caller asked for the trace."""
+    return bool(EXPORT_PATH) or debug_requested(debug_header)
+
+
+def debug_requested(debug_header: Optional[str]) -> bool:
+    return (debug_header or "").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def start_trace(name: str, enabled: bool = True, **attributes):
+    """Trace the enclosed block as one request; yields the Trace (or None when disabled)."""
+    if not enabled:
+        yield None
+        return
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.attributes["error"] = str(e)
+        raise
+    finally:
+        trace.root.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _export(trace)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Record the enclosed block as a child of the current span."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    span_ = trace.add_span(name, kind, _current_span.get(), attributes)
+    token = _current_span.set(span_)
+    try:
+        yield span_
+    except BaseException as e:
+        span_.attributes["error"] = str(e)
+        raise
+    finally:
+        span_.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def count(name: str, value: float = 1) -> None:
+    """Add `value` to counter `name` on the current span and all of its ancestors."""
+    trace = _current_trace.get()
+    span_ = _current_span.get()
+    if trace is not None and span_ is not None:
+        _add(trace, span_, name, value)
+
+
+def _add(trace: Trace, span_: Span, name: str, value: float) -> None:
+    with trace.lock:
+        while span_ is not None:
+            span_.counters[name] = span_.counters.get(name, 0) + value
+            span_ = span_.parent
+
+
+def traced(kind: str, name: Optional[str] = None):
+    """Decorator recording each call of a sync or async function as a span."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+_handler_class = None
+
+
+def _llm_handler_class():
+    """Build the LangChain callback handler class on first use (keeps imports light)."""
+    global _handler_class
+    if _handler_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class LLMTraceHandler(BaseCallbackHandler):
+            """Records one `openai` span per model call with its token usage."""
+
+            def __init__(self, trace: Trace):
+                self.trace = trace
+                self._open = {}
+
+            def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+                self._start(run_id, serialized)
+
+            def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+                self._start(run_id, serialized)
+
+            def _start(self, run_id, serialized):
+                # Callbacks may run on another thread; fall back to the root span there
+                model = ((serialized or {}).get("kwargs") or {}).get("model_name") or (serialized or {}).get("name")
+                self._open[run_id] = self.trace.add_span("llm", "openai", _current_span.get(), {"model": model})
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                span_ = self._open.pop(run_id, None)
+                if span_ is None:
+                    return
+                span_.end = time.perf_counter()
+                usage = {}
+                for generations in response.generations:
+                    for generation in generations:
+                        message_usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                        for key in ("input_tokens", "output_tokens"):
+                            usage[key] = usage.get(key, 0) + ((message_usage or {}).get(key) or 0)
+                if not any(usage.values()):
+                    token_usage = (response.llm_output or {}).get("token_usage") or {}
+                    usage = {"input_tokens": token_usage.get("prompt_tokens", 0),
+                             "output_tokens": token_usage.get("completion_tokens", 0)}
+                _add(self.trace, span_, "openai_calls", 1)
+                for key, value in usage.items():
+                    if value:
+                        _add(self.trace, span_, key, value)
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                span_ = self._open.pop(run_id, None)
+                if span_ is not None:
+                    span_.end = time.perf_counter()
+                    span_.attributes["error"] = str(error)
+
+        _handler_class = LLMTraceHandler
+    return _handler_class
+
+
+def callbacks() -> list:
+    """LangChain callbacks to pass in `config` so model calls are traced (empty outside a trace)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return []
+    return [_llm_handler_class()(trace)]
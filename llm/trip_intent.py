@@ -0,0 +1,173 @@
+"""
+Heuristic trip intent extraction.
+
+All patterns are compiled once at import time, the query is lowercased once,
+and preference keywords are found with a single pass over a combined keyword
+pattern. `data/trip_intent_corpus.jsonl` holds labeled sample queries;
+tests/test_trip_intent.py checks every one of them, and running this module
+directly measures throughput on them:
+
+    python trip_intent.py [--iterations N]
+"""
+
+import datetime
+import json
+import re
+import time
+from pathlib import Path
+from typing import List, Optional
+
+
+CORPUS_PATH = Path(__file__).resolve().parent / "data" / "trip_intent_corpus.jsonl"
+
+REQUIRED_FIELDS = ["destination", "duration", "travelers"]
+
+# Case-sensitive patterns, matched against the original query
+_DESTINATION = re.compile(r"(?:to|in)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)")
+_STARTING_POINT = re.compile(r"from\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)")
+_DOLLAR_BUDGET = re.compile(r"\$\s*(\d+(?:,\d{3})?(?:\.\d+)?)")
+_DATE_RANGE = re.compile(
+    r"(20\d{2})[-/.](\d{1,2})[-/.](\d{1,2})\s*(?:to|-)\s*(20\d{2})[-/.](\d{1,2})[-/.](\d{1,2})"
+)
+
+# Patterns matched against the lowercased query
+_BUDGET = re.compile(r"budget\s*(?:of)?\s*(\d+(?:,\d{3})?)")
+_DURATION = re.compile(r"(\d+)[-\s]?day|for\s+(\d+)\s+days")
+_MONTH_DATES = re.compile(
+    r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{1,2}(?:-\d{1,2})?(?:,?\s*20\d{2})?"
+)
+_TRAVELERS = re.compile(r"(\d+)\s*(?:people|persons|guests|travellers|travelers)")
+_HOURS = re.compile(r"(\d+)\s*hours")
+
+# Preference keywords by trip style; earlier styles take precedence
+PREFERENCE_KEYWORDS = {
+    "relaxing": ["relax", "resort", "chill"],
+    "pilgrimage": ["pilgrim", "pilgrimage"],
+    "sightseeing": ["sightseeing", "tour"],
+}
+_STYLE_RANK = {style: rank for rank, style in enumerate(PREFERENCE_KEYWORDS)}
+_KEYWORD_STYLE = {kw: style for style, kws in PREFERENCE_KEYWORDS.items() for kw in kws}
+# One left-to-right scan reporting the keyword starting at each position; the lookahead
+# keeps overlapping keywords (e.g. "touresort") visible, longest alternative first
+_KEYWORDS = re.compile(
+    "(?=(" + "|".join(re.escape(kw) for kw in sorted(_KEYWORD_STYLE, key=len, reverse=True)) + "))"
+)
+
+
+def _date_or_none(year: str, month: str, day: str) -> Optional[str]:
+    try:
+        return datetime.date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def _relaxation_type(q: str) -> Optional[str]:
+    best = None
+    for kw in _KEYWORDS.findall(q):
+        style = _KEYWORD_STYLE[kw]
+        if best is None or _STYLE_RANK[style] < _STYLE_RANK[best]:
+            best = style
+            if _STYLE_RANK[best] == 0:
+                break
+    return best
+
+
+def parse_trip_query(user_query: str) -> dict:
+    """Extract trip details from a free-text query.
+
+    Args:
+        user_query: The user's message.
+
+    Returns:
+        dict with destination, budget, starting_point, duration, travel_dates,
+        travelers and preferences; fields that were not found are None.
+    """
+    user_query = user_query or ""
+    q = user_query.lower()
+
+    trip = {
+        "destination": None,
+        "budget": None,
+        "starting_point": None,
+        "duration": None,
+        "travel_dates": None,
+        "travelers": None,
+        "preferences": {"sightseeing_hours": None, "relaxation_type": None},
+    }
+
+    # Destination: 'to <City>' or 'in <City>'
+    m = _DESTINATION.search(user_query)
+    if m:
+        trip["destination"] = m.group(1)
+
+    # Budget: '$2000' or 'budget of 2000'
+    m = _DOLLAR_BUDGET.search(user_query) or _BUDGET.search(q)
+    if m:
+        trip["budget"] = float(m.group(1).replace(",", ""))
+
+    # Starting point: 'from <City>'
+    m = _STARTING_POINT.search(user_query)
+    if m:
+        trip["starting_point"] = m.group(1)
+
+    # Duration: '3-day' or 'for 3 days'
+    m = _DURATION.search(q)
+    if m:
+        trip["duration"] = int(m.group(1) or m.group(2))
+
+    # Travel dates: explicit range like '2026-01-15 to 2026-01-20', else 'June 5-8'
+    m = _DATE_RANGE.search(user_query)
+    if m:
+        d1 = _date_or_none(*m.group(1, 2, 3))
+        d2 = _date_or_none(*m.group(4, 5, 6))
+        if d1 and d2:
+            trip["travel_dates"] = f"{d1} to {d2}"
+    else:
+        m = _MONTH_DATES.search(q)
+        if m:
+            trip["travel_dates"] = m.group(0)
+
+    # Travelers: '2 people'
+    m = _TRAVELERS.search(q)
+    if m:
+        trip["travelers"] = int(m.group(1))
+
+    # Preferences: sightseeing hours ('8 hours') and trip style keywords
+    m = _HOURS.search(q)
+    if m:
+        trip["preferences"]["sightseeing_hours"] = int(m.group(1))
+
+    trip["preferences"]["relaxation_type"] = _relaxation_type(q)
+
+    return trip
+
+
+def missing_fields(trip: dict) -> List[str]:
+    """Required fields that are missing from `trip`."""
+    return [f for f in REQUIRED_FIELDS if not trip.get(f)]
+
+
+def load_corpus(path=CORPUS_PATH) -> List[dict]:
+    """Load the labeled sample queries (`{"query": ..., "expected": {...}}` per line)."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def benchmark(corpus: List[dict], iterations: int = 200) -> float:
+    """Queries per second over `iterations` passes of the corpus."""
+    queries = [case["query"] for case in corpus]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in queries:
+            parse_trip_query(query)
+    return len(queries) * iterations / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure trip intent throughput on the labeled corpus.")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"Throughput: {benchmark(load_corpus(), args.iterations):,.0f} queries/s")
@@ -42,13 +42,15 @@ def extract_trip_intent(state: State):
 @tool
 def plan_places(state: State):
     """Plan places to visit based on the extracted trip details."""
+    from day_planner import plan_city_days
+
     trip_details = state["trip_details"]
-    # Simulate planning logic
-    places_plan = {
-        "day_1": ["Eiffel Tower", "Louvre Museum"],
-        "day_2": ["Notre Dame Cathedral", "Seine River Cruise"],
-        "day_3": ["Versailles Palace"]
-    }
+    planned = plan_city_days(
+        trip_details["destination"],
+        trip_details["duration"],
+        trip_details["preferences"].get("sightseeing_hours")
+    )
+    places_plan = {f"day_{d['day']}": [p["name"] for p in d["places"]] for d in planned}
     return {"places_plan": places_plan}
 
 # Transport Planner Node
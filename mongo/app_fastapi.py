@@ -4,7 +4,7 @@ FastAPI application entry point.
 
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from contextlib import asynccontextmanager
@@ -15,8 +15,12 @@ from database import db
 from services import (
     create_user, list_users, get_user, delete_user,
     create_session, list_sessions, get_session, update_session, delete_session,
-    put_message, get_messages, get_message, delete_message, clear_session_messages
+    put_message, get_messages, get_message, delete_message, clear_session_messages,
+    get_changes, get_itinerary, get_session_flights,
+    add_expense, get_expenses, delete_expense, get_balances, get_settlements,
+    semantic_search, search
 )
+from utils import etag_matches
 
 
 # ============== PYDANTIC MODELS ==============
@@ -40,6 +44,16 @@ class MessageCreate(BaseModel):
     content: str
 
 
+class ExpenseCreate(BaseModel):
+    description: str
+    amount: float
+    paidBy: str
+    splitBetween: list[str] = []
+    currency: Optional[str] = "USD"
+    date: Optional[str] = None
+    note: Optional[str] = None
+
+
 # ============== APP SETUP ==============
 
 @asynccontextmanager
@@ -207,6 +221,107 @@ async def api_delete_message(message_id: str):
     return handle_response(result, error_code=404)
 
 
+# ============== SYNC ENDPOINTS ==============
+
+@app.get("/api/sessions/{session_id}/changes", tags=["Sync"])
+async def api_get_changes(session_id: str, since: Optional[str] = Query(None, description="sync_token from the previous response")):
+    """
+    Get messages added and deleted since a sync token.
+    Without a token, or with one older than the retained tombstones, returns every message with reset=true.
+    """
+    result = get_changes(session_id, since)
+    return handle_response(result, error_code=404)
+
+
+# ============== ITINERARY ENDPOINTS ==============
+
+@app.get("/api/sessions/{session_id}/itinerary", tags=["Itinerary"])
+async def api_get_itinerary(session_id: str, request: Request):
+    """
+    Get the session's structured itinerary (TravelPlan shape).
+    Only messages added since the last read are processed. Supports If-None-Match.
+    """
+    result = handle_response(get_itinerary(session_id), error_code=404)
+    headers = {"ETag": result["etag"], "Cache-Control": "no-cache"}
+    if etag_matches(result["etag"], request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(result, headers=headers)
+
+
+# ============== FLIGHT ENDPOINTS ==============
+
+@app.get("/api/sessions/{session_id}/flights", tags=["Flights"])
+async def api_get_session_flights(session_id: str):
+    """Get flights extracted from a session's messages when they were added."""
+    result = get_session_flights(session_id)
+    return handle_response(result, error_code=404)
+
+
+# ============== EXPENSE ENDPOINTS ==============
+
+@app.post("/api/sessions/{session_id}/expenses", status_code=201, tags=["Expenses"])
+async def api_add_expense(session_id: str, expense: ExpenseCreate):
+    """Add a shared expense; balances are updated incrementally."""
+    result = add_expense(
+        session_id, expense.description, expense.amount, expense.paidBy,
+        expense.splitBetween, expense.currency, expense.date, expense.note
+    )
+    return handle_response(result, success_code=201)
+
+
+@app.get("/api/sessions/{session_id}/expenses", tags=["Expenses"])
+async def api_get_expenses(session_id: str):
+    """Get all expenses in a session."""
+    result = get_expenses(session_id)
+    return handle_response(result, error_code=404)
+
+
+@app.delete("/api/sessions/{session_id}/expenses/{expense_id}", tags=["Expenses"])
+async def api_delete_expense(session_id: str, expense_id: str):
+    """Delete an expense and reverse it from the balances."""
+    result = delete_expense(session_id, expense_id)
+    return handle_response(result, error_code=404)
+
+
+@app.get("/api/sessions/{session_id}/balances", tags=["Expenses"])
+async def api_get_balances(session_id: str):
+    """Get each participant's running balance."""
+    result = get_balances(session_id)
+    return handle_response(result)
+
+
+@app.get("/api/sessions/{session_id}/settlements", tags=["Expenses"])
+async def api_get_settlements(session_id: str):
+    """Get the fewest transfers that settle all balances."""
+    result = get_settlements(session_id)
+    return handle_response(result)
+
+
+# ============== SEARCH ENDPOINTS ==============
+
+@app.get("/api/search", tags=["Search"])
+async def api_search(
+    q: str = Query(..., description="Search words"),
+    user_id: Optional[str] = Query(None, description="Only search this user's sessions"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(20, ge=1, le=100, description="Results per page")
+):
+    """Full-text search over session titles and message content, best match first."""
+    result = search(q, user_id, page, page_size)
+    return handle_response(result)
+
+
+@app.get("/api/search/semantic", tags=["Search"])
+async def api_semantic_search(
+    q: str = Query(..., description="Free-text query"),
+    user_id: Optional[str] = Query(None, description="Only search this user's sessions"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results")
+):
+    """Find messages by meaning, using embeddings computed when they were added."""
+    result = semantic_search(q, user_id, limit)
+    return handle_response(result)
+
+
 # ============== PARTICIPANTS ENDPOINT ==============
 
 @app.get("/api/participants", tags=["Participants"])
@@ -11,6 +11,21 @@ DATABASE_NAME = "chat"  # Database name
 USERS_COLLECTION = "user"
 SESSIONS_COLLECTION = "session"
 HISTORY_COLLECTION = "history"
+EXPENSES_COLLECTION = "expense"
+BALANCES_COLLECTION = "balance"
+TOMBSTONES_COLLECTION = "tombstone"
+
+# Sync tombstones older than this are compacted; older tokens get a full reset
+TOMBSTONE_RETENTION_DAYS = 30
+
+# Full-text search: "mongo" ($text indexes) or "memory" (in-process inverted index)
+TEXT_SEARCH_BACKEND = "mongo"
+
+# Semantic search (on-disk vector index, relative to this directory)
+SEMANTIC_INDEX_DIR = "semantic_index"
+EMBEDDING_DIM = 512
+# "module:function" returning an (n, dim) array for a list of texts; empty uses the hashing vectorizer
+EMBEDDING_FUNCTION = ""
 
 # API Configuration
 API_HOST = "0.0.0.0"
@@ -2,14 +2,18 @@
 Database connection and collection management.
 """
 
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, TEXT
 from config import (
     MONGODB_URI,
     MONGODB_CERT_FILE,
     DATABASE_NAME,
     USERS_COLLECTION,
     SESSIONS_COLLECTION,
-    HISTORY_COLLECTION
+    HISTORY_COLLECTION,
+    EXPENSES_COLLECTION,
+    BALANCES_COLLECTION,
+    TOMBSTONES_COLLECTION,
+    TEXT_SEARCH_BACKEND
 )
 
 
@@ -55,6 +59,18 @@ class Database:
     def history(self):
         return self._db[HISTORY_COLLECTION]
     
+    @property
+    def expenses(self):
+        return self._db[EXPENSES_COLLECTION]
+    
+    @property
+    def balances(self):
+        return self._db[BALANCES_COLLECTION]
+    
+    @property
+    def tombstones(self):
+        return self._db[TOMBSTONES_COLLECTION]
+    
     def setup_indexes(self):
         """Create indexes for better query performance."""
         # User indexes
@@ -68,6 +84,32 @@ class Database:
         # History indexes
         self.history.create_index([("session_id", ASCENDING)])
         self.history.create_index([("session_id", ASCENDING), ("timestamp", ASCENDING)])
+        # Incremental reads of messages after a stored _id
+        self.history.create_index([("session_id", ASCENDING), ("_id", ASCENDING)])
+        # Delta sync: messages after a sync token
+        self.history.create_index([("session_id", ASCENDING), ("seq", ASCENDING)], sparse=True)
+        # Flights extracted at write time, queryable across sessions
+        self.history.create_index(
+            [("flights.from", ASCENDING), ("flights.to", ASCENDING), ("flights.departure", ASCENDING)],
+            sparse=True
+        )
+        
+        # Sync tombstones, read by token and compacted by age
+        self.tombstones.create_index([("session_id", ASCENDING), ("seq", ASCENDING)])
+        self.tombstones.create_index([("deleted_at", ASCENDING)])
+        
+        # Full-text search over titles and messages
+        if TEXT_SEARCH_BACKEND == "mongo":
+            self.sessions.create_index([("title", TEXT)])
+            self.history.create_index([("content", TEXT)])
+        
+        # Expense indexes
+        self.expenses.create_index([("session_id", ASCENDING), ("_id", ASCENDING)])
+        # One running balance per participant and currency
+        self.balances.create_index(
+            [("session_id", ASCENDING), ("currency", ASCENDING), ("participant", ASCENDING)],
+            unique=True
+        )
         
         print("Indexes created successfully!")
     
@@ -6,8 +6,12 @@ from flask import Blueprint, request, jsonify
 from services import (
     create_user, list_users, get_user, delete_user,
     create_session, list_sessions, get_session, update_session, delete_session,
-    put_message, get_messages, get_message, delete_message, clear_session_messages
+    put_message, get_messages, get_message, delete_message, clear_session_messages,
+    get_changes, get_itinerary, get_session_flights,
+    add_expense, get_expenses, delete_expense, get_balances, get_settlements,
+    semantic_search, search
 )
+from utils import etag_matches
 
 api = Blueprint('api', __name__)
 
@@ -173,3 +177,123 @@ def api_delete_message(message_id):
     result = delete_message(message_id)
     status_code = 200 if result['success'] else 404
     return jsonify(result), status_code
+
+
+# ============== SYNC ROUTES ==============
+
+@api.route('/sessions/<session_id>/changes', methods=['GET'])
+def api_get_changes(session_id):
+    """Get messages added and deleted since a sync token."""
+    result = get_changes(session_id, request.args.get('since'))
+    status_code = 200 if result['success'] else 404
+    return jsonify(result), status_code
+
+
+# ============== ITINERARY ROUTES ==============
+
+@api.route('/sessions/<session_id>/itinerary', methods=['GET'])
+def api_get_itinerary(session_id):
+    """Get the session's structured itinerary. Supports If-None-Match."""
+    result = get_itinerary(session_id)
+    if not result['success']:
+        return jsonify(result), 404
+    
+    headers = {"ETag": result['etag'], "Cache-Control": "no-cache"}
+    if etag_matches(result['etag'], request.headers.get('If-None-Match')):
+        return '', 304, headers
+    return jsonify(result), 200, headers
+
+
+# ============== FLIGHT ROUTES ==============
+
+@api.route('/sessions/<session_id>/flights', methods=['GET'])
+def api_get_session_flights(session_id):
+    """Get flights extracted from a session's messages."""
+    result = get_session_flights(session_id)
+    status_code = 200 if result['success'] else 404
+    return jsonify(result), status_code
+
+
+# ============== EXPENSE ROUTES ==============
+
+@api.route('/sessions/<session_id>/expenses', methods=['POST'])
+def api_add_expense(session_id):
+    """Add a shared expense."""
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({"success": False, "error": "Request body is required"}), 400
+    if data.get('amount') is None:
+        return jsonify({"success": False, "error": "amount is required"}), 400
+    
+    result = add_expense(
+        session_id,
+        data.get('description', ''),
+        data['amount'],
+        data.get('paidBy'),
+        data.get('splitBetween', []),
+        data.get('currency', 'USD'),
+        data.get('date'),
+        data.get('note')
+    )
+    status_code = 201 if result['success'] else 400
+    return jsonify(result), status_code
+
+
+@api.route('/sessions/<session_id>/expenses', methods=['GET'])
+def api_get_expenses(session_id):
+    """Get all expenses in a session."""
+    result = get_expenses(session_id)
+    status_code = 200 if result['success'] else 404
+    return jsonify(result), status_code
+
+
+@api.route('/sessions/<session_id>/expenses/<expense_id>', methods=['DELETE'])
+def api_delete_expense(session_id, expense_id):
+    """Delete an expense."""
+    result = delete_expense(session_id, expense_id)
+    status_code = 200 if result['success'] else 404
+    return jsonify(result), status_code
+
+
+@api.route('/sessions/<session_id>/balances', methods=['GET'])
+def api_get_balances(session_id):
+    """Get each participant's running balance."""
+    result = get_balances(session_id)
+    status_code = 200 if result['success'] else 400
+    return jsonify(result), status_code
+
+
+@api.route('/sessions/<session_id>/settlements', methods=['GET'])
+def api_get_settlements(session_id):
+    """Get the fewest transfers that settle all balances."""
+    result = get_settlements(session_id)
+    status_code = 200 if result['success'] else 400
+    return jsonify(result), status_code
+
+
+# ============== SEARCH ROUTES ==============
+
+@api.route('/search', methods=['GET'])
+def api_search():
+    """Full-text search over session titles and message content."""
+    result = search(
+        request.args.get('q', ''),
+        request.args.get('user_id'),
+        request.args.get('page', 1, type=int),
+        request.args.get('page_size', 20, type=int)
+    )
+    status_code = 200 if result['success'] else 400
+    return jsonify(result), status_code
+
+
+@api.route('/search/semantic', methods=['GET'])
+def api_semantic_search():
+    """Find messages by meaning."""
+    result = semantic_search(
+        request.args.get('q', ''),
+        request.args.get('user_id'),
+        request.args.get('limit', 10, type=int)
+    )
+    status_code = 200 if result['success'] else 400
+    return jsonify(result), status_code
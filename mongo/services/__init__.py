@@ -5,6 +5,12 @@ Services package - contains all business logic.
 from services.user_service import create_user, list_users, get_user, delete_user
 from services.session_service import create_session, list_sessions, get_session, update_session, delete_session
 from services.message_service import put_message, get_messages, get_message, delete_message, clear_session_messages
+from services.itinerary_service import get_itinerary
+from services.sync_service import get_changes
+from services.flight_service import get_session_flights
+from services.expense_service import add_expense, get_expenses, delete_expense, get_balances, get_settlements
+from services.semantic_search_service import semantic_search
+from services.search_service import search
 
 __all__ = [
     # User operations
@@ -24,4 +30,19 @@ __all__ = [
     'get_message',
     'delete_message',
     'clear_session_messages',
+    # Sync operations
+    'get_changes',
+    # Itinerary operations
+    'get_itinerary',
+    # Flight operations
+    'get_session_flights',
+    # Expense operations
+    'add_expense',
+    'get_expenses',
+    'delete_expense',
+    'get_balances',
+    'get_settlements',
+    # Search operations
+    'semantic_search',
+    'search',
 ]
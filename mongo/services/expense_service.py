@@ -0,0 +1,382 @@
+"""
+Expense service - shared expenses, running balances and settlements per session.
+
+Server-side version of `frontend/src/hooks/useSplits.ts`. Amounts are kept in
+integer cents. Every expense stores the exact per-participant deltas it applied,
+and those are `$inc`-ed into one balance document per (session, currency,
+participant) when the expense is added, then reversed when it is removed. Reading
+balances therefore costs O(participants) no matter how many expenses exist.
+"""
+
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from database import db
+from utils import serialize_doc, is_valid_object_id, create_response
+
+
+# Largest number of non-zero balances settled exactly (subset DP is O(2^n * n))
+EXACT_SETTLEMENT_MAX = 14
+
+
+def _to_cents(amount) -> int:
+    return int(round(float(amount) * 100))
+
+
+def _shares(amount_cents: int, paid_by: str, split_between: list) -> list:
+    """Per-participant balance deltas for one expense; they always sum to zero."""
+    people = split_between or [paid_by]
+    share, remainder = divmod(amount_cents, len(people))
+    deltas = {paid_by: amount_cents}
+    for i, person in enumerate(people):
+        # Spread leftover cents over the first participants
+        deltas[person] = deltas.get(person, 0) - share - (1 if i < remainder else 0)
+    return [{"participant": p, "cents": c} for p, c in deltas.items() if c]
+
+
+def _apply_shares(session_id: ObjectId, currency: str, shares: list, sign: int) -> None:
+    if not shares:
+        return
+    db.balances.bulk_write([
+        UpdateOne(
+            {"session_id": session_id, "currency": currency, "participant": s["participant"]},
+            {"$inc": {"cents": sign * s["cents"]}},
+            upsert=True
+        )
+        for s in shares
+    ], ordered=False)
+
+
+def _rebuild_balances(session_id: ObjectId, currency: str) -> None:
+    """
+    Re-derive one currency's balances from the stored expenses.
+
+    Used when a balance update fails partway: some `$inc` ops may have been
+    applied and others not, so the expenses are the only reliable source.
+    """
+    totals = {}
+    for expense in db.expenses.find({"session_id": session_id, "currency": currency}, {"shares": 1}):
+        for share in expense["shares"]:
+            totals[share["participant"]] = totals.get(share["participant"], 0) + share["cents"]
+    db.balances.delete_many({"session_id": session_id, "currency": currency})
+    if totals:
+        db.balances.insert_many([
+            {"session_id": session_id, "currency": currency, "participant": p, "cents": c}
+            for p, c in totals.items()
+        ])
+
+
+# ============== SETTLEMENT ==============
+
+def _settle_group(balances: list) -> list:
+    """Largest debtor pays largest creditor; n - 1 transfers for a zero-sum group."""
+    creditors = sorted(([p, c] for p, c in balances if c > 0), key=lambda x: -x[1])
+    debtors = sorted(([p, -c] for p, c in balances if c < 0), key=lambda x: -x[1])
+    transfers = []
+    i = j = 0
+    while i < len(debtors) and j < len(creditors):
+        amount = min(debtors[i][1], creditors[j][1])
+        transfers.append((debtors[i][0], creditors[j][0], amount))
+        debtors[i][1] -= amount
+        creditors[j][1] -= amount
+        if debtors[i][1] == 0:
+            i += 1
+        if creditors[j][1] == 0:
+            j += 1
+    return transfers
+
+
+def _exact_groups(balances: list) -> list:
+    """
+    Split balances into the largest number of zero-sum groups.
+
+    Settling each group separately takes (group size - 1) transfers, so
+    maximising the number of groups minimises the total transfers.
+    """
+    n = len(balances)
+    full = (1 << n) - 1
+    sums = [0] * (full + 1)
+    best = [0] * (full + 1)
+    choice = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + balances[low.bit_length() - 1][1]
+        for i in range(n):
+            bit = 1 << i
+            if mask & bit and best[mask ^ bit] >= best[mask]:
+                best[mask], choice[mask] = best[mask ^ bit], i
+        if sums[mask] == 0:
+            best[mask] += 1
+
+    # Walk the removal order back; every zero-sum mask on the way closes a group
+    groups, current, mask = [], [], full
+    while mask:
+        if sums[mask] == 0 and current:
+            groups.append(current)
+            current = []
+        i = choice[mask]
+        current.append(balances[i])
+        mask ^= 1 << i
+    groups.append(current)
+    return groups
+
+
+def _heuristic_groups(balances: list) -> list:
+    """Pair off exactly opposite balances, leave the rest as one group."""
+    by_amount = {}
+    groups, rest = [], []
+    for entry in balances:
+        match = by_amount.get(-entry[1])
+        if match:
+            groups.append([match.pop(), entry])
+        else:
+            by_amount.setdefault(entry[1], []).append(entry)
+    for entries in by_amount.values():
+        rest.extend(entries)
+    if rest:
+        groups.append(rest)
+    return groups
+
+
+def settle(balances: dict) -> list:
+    """
+    Minimal-transfer settlement for one currency.
+
+    Exact for up to EXACT_SETTLEMENT_MAX non-zero balances; above that, opposite
+    pairs are matched first and the result is never worse than plain greedy.
+
+    Args:
+        balances: Participant -> balance in cents (positive is owed money)
+
+    Returns:
+        list: (from, to, cents) transfers
+    """
+    entries = [(p, c) for p, c in balances.items() if c]
+    if not entries:
+        return []
+    if len(entries) <= EXACT_SETTLEMENT_MAX:
+        groups = _exact_groups(entries)
+    else:
+        groups = _heuristic_groups(entries)
+    transfers = [t for group in groups for t in _settle_group(group)]
+    greedy = _settle_group(entries)
+    return transfers if len(transfers) <= len(greedy) else greedy
+
+
+# ============== SERVICE ==============
+
+def add_expense(session_id: str, description: str, amount: float, paid_by: str,
+                split_between: list, currency: str = "USD", date: str = None, note: str = None) -> dict:
+    """
+    Add an expense to a session and update the running balances.
+
+    Args:
+        session_id: Session's ObjectId as string
+        description: What the expense was for
+        amount: Amount paid
+        paid_by: Participant who paid
+        split_between: Participants sharing the cost (defaults to the payer)
+        currency: Currency code
+        date: Optional date of the expense
+        note: Optional note
+
+    Returns:
+        dict: Response with expense_id or error
+    """
+    try:
+        if not is_valid_object_id(session_id):
+            return create_response(False, error="Invalid session ID format")
+
+        if not db.sessions.find_one({"_id": ObjectId(session_id)}, {"_id": 1}):
+            return create_response(False, error="Session not found")
+
+        if not paid_by or not paid_by.strip():
+            return create_response(False, error="paidBy is required")
+
+        amount_cents = _to_cents(amount)
+        if amount_cents <= 0:
+            return create_response(False, error="Amount must be positive")
+
+        currency = (currency or "USD").upper()
+        split_between = list(dict.fromkeys(p for p in (split_between or []) if p))
+        shares = _shares(amount_cents, paid_by, split_between)
+
+        expense = {
+            "session_id": ObjectId(session_id),
+            "description": description or "",
+            "amount_cents": amount_cents,
+            "currency": currency,
+            "paid_by": paid_by,
+            "split_between": split_between or [paid_by],
+            "shares": shares,
+            "date": date,
+            "note": note,
+            "created_at": datetime.utcnow()
+        }
+
+        result = db.expenses.insert_one(expense)
+        try:
+            _apply_shares(ObjectId(session_id), currency, shares, 1)
+        except Exception:
+            # Part of the $inc ops may have run; drop the expense and re-derive the balances
+            db.expenses.delete_one({"_id": result.inserted_id})
+            _rebuild_balances(ObjectId(session_id), currency)
+            raise
+
+        return create_response(True, {
+            "expense_id": str(result.inserted_id),
+            "message": "Expense added successfully"
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
+
+
+def _expense_view(expense: dict) -> dict:
+    """Expense in the frontend `Expense` shape."""
+    expense = serialize_doc(expense)
+    return {
+        "id": expense["_id"],
+        "description": expense["description"],
+        "amount": expense["amount_cents"] / 100,
+        "currency": expense["currency"],
+        "paidBy": expense["paid_by"],
+        "splitBetween": expense["split_between"],
+        "date": expense.get("date"),
+        "note": expense.get("note"),
+        "created_at": expense.get("created_at")
+    }
+
+
+def get_expenses(session_id: str) -> dict:
+    """
+    Get all expenses in a session, oldest first.
+
+    Args:
+        session_id: Session's ObjectId as string
+
+    Returns:
+        dict: Response with list of expenses
+    """
+    try:
+        if not is_valid_object_id(session_id):
+            return create_response(False, error="Invalid session ID format")
+
+        expenses = list(db.expenses.find({"session_id": ObjectId(session_id)}).sort("_id", 1))
+
+        return create_response(True, {
+            "expenses": [_expense_view(e) for e in expenses],
+            "count": len(expenses)
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
+
+
+def delete_expense(session_id: str, expense_id: str) -> dict:
+    """
+    Remove an expense and reverse its effect on the balances.
+
+    Args:
+        session_id: Session's ObjectId as string
+        expense_id: Expense's ObjectId as string
+
+    Returns:
+        dict: Response with deletion status
+    """
+    try:
+        if not is_valid_object_id(session_id) or not is_valid_object_id(expense_id):
+            return create_response(False, error="Invalid ID format")
+
+        # Deleting first means a repeated request cannot reverse the shares twice
+        expense = db.expenses.find_one_and_delete(
+            {"_id": ObjectId(expense_id), "session_id": ObjectId(session_id)}
+        )
+        if not expense:
+            return create_response(False, error="Expense not found")
+
+        try:
+            _apply_shares(expense["session_id"], expense["currency"], expense["shares"], -1)
+        except Exception:
+            _rebuild_balances(expense["session_id"], expense["currency"])
+            raise
+
+        return create_response(True, {
+            "message": "Expense deleted successfully"
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
+
+
+def _session_balances(session_id: str) -> dict:
+    """Currency -> {participant: cents} for the non-zero balances."""
+    by_currency = {}
+    for doc in db.balances.find({"session_id": ObjectId(session_id), "cents": {"$ne": 0}}):
+        by_currency.setdefault(doc["currency"], {})[doc["participant"]] = doc["cents"]
+    return by_currency
+
+
+def get_balances(session_id: str) -> dict:
+    """
+    Get each participant's running balance (positive means they are owed money).
+
+    Args:
+        session_id: Session's ObjectId as string
+
+    Returns:
+        dict: Response with balances sorted by amount, credits first
+    """
+    try:
+        if not is_valid_object_id(session_id):
+            return create_response(False, error="Invalid session ID format")
+
+        balances = [
+            {"user": participant, "amount": cents / 100, "currency": currency}
+            for currency, people in _session_balances(session_id).items()
+            for participant, cents in people.items()
+        ]
+        balances.sort(key=lambda b: (b["currency"], -b["amount"]))
+
+        return create_response(True, {
+            "balances": balances
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
+
+
+def get_settlements(session_id: str) -> dict:
+    """
+    Get the transfers that settle all balances, using as few as possible.
+
+    Args:
+        session_id: Session's ObjectId as string
+
+    Returns:
+        dict: Response with settlements and their count
+    """
+    try:
+        if not is_valid_object_id(session_id):
+            return create_response(False, error="Invalid session ID format")
+
+        settlements = [
+            {"from": debtor, "to": creditor, "amount": cents / 100, "currency": currency}
+            for currency, people in sorted(_session_balances(session_id).items())
+            for debtor, creditor, cents in settle(people)
+        ]
+
+        return create_response(True, {
+            "settlements": settlements,
+            "count": len(settlements)
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
+
+
+def delete_session_expenses(session_ids: list) -> None:
+    """Drop all expenses and balances of the given sessions."""
+    query = {"session_id": {"$in": [ObjectId(s) for s in session_ids]}}
+    db.expenses.delete_many(query)
+    db.balances.delete_many(query)
@@ -0,0 +1,194 @@
+"""
+Flight service - extracts flights from messages when they are written.
+
+Port of `frontend/src/lib/flightParser.ts`: a message that contains the
+`[[FLIGHT_DATA]]` marker is parsed once in `put_message` (JSON blocks first,
+then a plain-text fallback) and the flights are stored on the history document
+as `flights`, in the frontend `Flight` shape. Clients read them back through
+`get_session_flights` instead of re-parsing the whole history.
+"""
+
+import json
+import re
+import uuid
+from datetime import datetime
+from bson import ObjectId
+from database import db
+from utils import is_valid_object_id, create_response
+
+
+FLIGHT_MARKER = "[[FLIGHT_DATA]]"
+
+_JSON_FENCE = re.compile(r"```json([\s\S]*?)```", re.IGNORECASE)
+_GENERIC_FENCE = re.compile(r"```([\s\S]*?)```")
+# Requires a currency code or "$" so dates and flight numbers aren't read as prices
+_MONEY = re.compile(r"(?:\b(USD|EUR|GBP|CAD|AUD|INR|JPY|SGD|CHF|CNY)\s*\$?|\$)\s*([\d,]+(?:\.\d+)?)", re.IGNORECASE)
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T\s]\d{2}:\d{2}(?::\d{2})?)?")
+_TIME = re.compile(r"(\d{1,2}:\d{2}\s?(?:AM|PM)?)", re.IGNORECASE)
+_ROUTE = re.compile(r"([A-Za-z]{3,})\s*(?:to|→|➡|->|—|–|-)\s*([A-Za-z]{3,})", re.IGNORECASE)
+_FLIGHT_NUMBER = re.compile(r"\b([A-Z]{2}\d{2,4})\b")
+
+
+def _first_group(patterns, text: str):
+    for pattern in patterns:
+        m = re.search(pattern, text, re.IGNORECASE)
+        if m:
+            return m.group(1)
+    return None
+
+
+def _extract_json_blocks(content: str) -> list:
+    blocks = []
+    fenced = _JSON_FENCE.findall(content)
+    for block in fenced or _GENERIC_FENCE.findall(content):
+        try:
+            blocks.append(json.loads(block.strip()))
+        except ValueError:
+            pass
+
+    # As a final attempt, parse the whole content if it looks like JSON
+    stripped = content.strip()
+    if stripped.startswith(("{", "[")):
+        try:
+            blocks.append(json.loads(stripped))
+        except ValueError:
+            pass
+    return blocks
+
+
+def _coerce_money(text: str) -> dict:
+    m = _MONEY.search(text or "")
+    if not m:
+        return None
+    return {"amount": float(m.group(2).replace(",", "")), "currency": (m.group(1) or "USD").upper()}
+
+
+def _normalize_flight(raw) -> dict:
+    if not isinstance(raw, dict) or not raw.get("from") or not raw.get("to"):
+        return None
+    now = datetime.utcnow().isoformat() + "Z"
+    flight = {
+        "id": raw.get("id") or str(uuid.uuid4()),
+        "from": str(raw["from"]).strip(),
+        "to": str(raw["to"]).strip(),
+        "departure": raw.get("departure") or now,
+        "arrival": raw.get("arrival") or now,
+    }
+    for key in ("airline", "number", "confirmation"):
+        if raw.get(key):
+            flight[key] = str(raw[key]).strip()
+    for key in ("cost", "notes"):
+        if raw.get(key):
+            flight[key] = raw[key]
+    return flight
+
+
+def _parse_flights_from_json(content: str) -> list:
+    for block in _extract_json_blocks(content):
+        items = block if isinstance(block, list) else None
+        if isinstance(block, dict) and isinstance(block.get("flights"), list):
+            items = block["flights"]
+        if items is not None:
+            return [f for f in (_normalize_flight(item) for item in items) if f]
+    return []
+
+
+def _parse_date_like(value: str) -> str:
+    """UTC timestamp with a "Z" suffix, as the frontend parser's toISOString() gives."""
+    cleaned = value.strip()
+    m = _ISO_DATE.search(cleaned)
+    if m:
+        try:
+            return datetime.fromisoformat(m.group(0).replace(" ", "T")).isoformat() + "Z"
+        except ValueError:
+            pass
+
+    # Time only; anchor to today
+    m = _TIME.search(cleaned)
+    if m:
+        text = " ".join(m.group(1).upper().split())
+        for fmt in ("%I:%M %p", "%I:%M%p", "%H:%M"):
+            try:
+                t = datetime.strptime(text, fmt).time()
+                return datetime.combine(datetime.utcnow().date(), t).isoformat() + "Z"
+            except ValueError:
+                continue
+    return None
+
+
+def _parse_flights_from_text(content: str) -> list:
+    flights = []
+    for segment in re.split(r"\n{2,}", content):
+        route = _ROUTE.search(segment)
+        if not route:
+            continue
+
+        departure = _first_group((r"depart(?:ure)?[:\-\s]*([^\n]+)", r"outbound[:\-\s]*([^\n]+)", _TIME.pattern), segment)
+        arrival = _first_group((r"arriv(?:al|es)[:\-\s]*([^\n]+)", r"landing[:\-\s]*([^\n]+)"), segment)
+        airline = _first_group((r"airline[:\-\s]*([^\n]+)", r"with\s+([A-Za-z\s]+)\b"), segment)
+        number = _FLIGHT_NUMBER.search(segment)
+
+        flight = _normalize_flight({
+            "from": route.group(1),
+            "to": route.group(2),
+            "departure": _parse_date_like(departure) if departure else None,
+            "arrival": _parse_date_like(arrival) if arrival else None,
+            "airline": airline,
+            "number": number.group(1) if number else None,
+            "cost": _coerce_money(segment),
+            "notes": segment.strip(),
+        })
+        if flight:
+            flights.append(flight)
+    return flights
+
+
+def extract_flights(content: str) -> list:
+    """
+    Parse flights from a message that carries the flight marker.
+
+    Args:
+        content: Message content
+
+    Returns:
+        list: Flights in the frontend `Flight` shape (empty without the marker)
+    """
+    if not content or FLIGHT_MARKER not in content:
+        return []
+    return _parse_flights_from_json(content) or _parse_flights_from_text(content)
+
+
+def get_session_flights(session_id: str) -> dict:
+    """
+    Get all flights extracted from a session's messages, in message order.
+
+    Args:
+        session_id: Session's ObjectId as string
+
+    Returns:
+        dict: Response with list of flights (each tagged with its message_id)
+    """
+    try:
+        if not is_valid_object_id(session_id):
+            return create_response(False, error="Invalid session ID format")
+
+        if not db.sessions.find_one({"_id": ObjectId(session_id)}, {"_id": 1}):
+            return create_response(False, error="Session not found")
+
+        messages = db.history.find(
+            {"session_id": ObjectId(session_id), "flights.0": {"$exists": True}},
+            {"flights": 1}
+        ).sort("_id", 1)
+
+        flights = [
+            {**flight, "message_id": str(message["_id"])}
+            for message in messages for flight in message["flights"]
+        ]
+
+        return create_response(True, {
+            "flights": flights,
+            "count": len(flights)
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
@@ -0,0 +1,216 @@
+"""
+Itinerary service - maintains a structured travel plan per session.
+
+The plan follows the frontend `TravelPlan` shape and is stored on the session
+document together with the `_id` of the last message folded into it. Each read
+folds only the messages added since then, so extraction runs once per message
+instead of once per client per view. Deleting messages resets the plan, which
+is then rebuilt from the remaining history on the next read.
+"""
+
+import hashlib
+import json
+import re
+from datetime import datetime
+from bson import ObjectId
+from database import db
+from utils import is_valid_object_id, create_response
+
+
+# ============== EXTRACTION ==============
+
+_DESTINATION = re.compile(
+    r"\b(?:trip|travel(?:l?ing)?|vacation|holiday|visit(?:ing)?|going|itinerary)\s+(?:to|in|for)\s+"
+    r"([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)"
+)
+_DURATION = re.compile(r"\b(\d{1,2})[-\s]?days?\b", re.IGNORECASE)
+_BUDGET = re.compile(r"budget(?:\s+of)?:?\s*(?:USD\s*)?\$?\s*(\d[\d,]*(?:\.\d+)?)", re.IGNORECASE)
+_PARTICIPANTS = re.compile(r"^\W*(?:participants|travell?ers|group)\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_DAY_HEADER = re.compile(r"^[#*\s]*day[\s_]?(\d{1,2})\b[\s:.)\-–—*]*(.*)$", re.IGNORECASE)
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d{1,2}[.)])\s+(.+)$")
+_TIME_PREFIX = re.compile(r"^\**\s*(\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)?)\s*[-–—:]?\s*\**\s*(.+)$", re.IGNORECASE)
+_COST = re.compile(r"\$\s*(\d[\d,]*(?:\.\d+)?)")
+_MARKDOWN = re.compile(r"[*_`#]+")
+
+_RESTAURANT_WORDS = re.compile(
+    r"\b(restaurant|dinner|lunch|breakfast|brunch|cafe|café|bistro|food tour|eat)\b", re.IGNORECASE
+)
+_ACCOMMODATION_WORDS = re.compile(
+    r"\b(hotel|hostel|check[- ]?in|check[- ]?out|stay at|airbnb|resort)\b", re.IGNORECASE
+)
+_ENTRY_KINDS = ("activities", "accommodations", "restaurants")
+
+
+def _clean(text: str) -> str:
+    return " ".join(_MARKDOWN.sub("", text).split()).strip(" :-–—,")
+
+
+def _money(text: str) -> dict:
+    m = _COST.search(text)
+    return {"amount": float(m.group(1).replace(",", "")), "currency": "USD"} if m else None
+
+
+def _parse_entry(day: dict, text: str) -> None:
+    """Classify one itinerary line and append it to `day` with its start time and cost."""
+    start = None
+    m = _TIME_PREFIX.match(text)
+    if m and (":" in m.group(1) or re.search(r"[ap]\.?m", m.group(1), re.IGNORECASE)):
+        start, text = m.group(1).strip(), m.group(2)
+    title = _clean(_COST.sub("", text)).rstrip(" (")
+    if not title:
+        return
+
+    index = sum(len(day.get(kind, [])) for kind in _ENTRY_KINDS) + 1
+    if _ACCOMMODATION_WORDS.search(text):
+        kind, entry = "accommodations", {"id": f"d{day['day']}-h{index}", "name": title}
+    elif _RESTAURANT_WORDS.search(text):
+        kind, entry = "restaurants", {"id": f"d{day['day']}-r{index}", "name": title}
+    else:
+        kind, entry = "activities", {"id": f"d{day['day']}-a{index}", "title": title}
+    if start and kind != "accommodations":
+        entry["time"] = {"start": start}
+    cost = _money(text)
+    if cost:
+        entry["cost"] = cost
+    day.setdefault(kind, []).append(entry)
+
+
+def _parse_days(content: str) -> dict:
+    """Day number -> ItineraryDay for every `Day N` section in a message."""
+    days = {}
+    current = None
+    for line in content.splitlines():
+        header = _DAY_HEADER.match(line)
+        if header:
+            current = {"day": int(header.group(1))}
+            days[current["day"]] = current
+            rest = _clean(header.group(2))
+            # Inline form: "Day 1: Eiffel Tower, Louvre Museum"
+            if rest and "," in rest:
+                for part in rest.split(","):
+                    _parse_entry(current, part)
+            elif rest:
+                current["summary"] = rest
+            continue
+        if current is None or not line.strip():
+            continue
+        bullet = _BULLET.match(line)
+        if bullet:
+            _parse_entry(current, bullet.group(1))
+        elif not current.get("summary") and not any(k in current for k in _ENTRY_KINDS):
+            current["summary"] = _clean(line)
+    return days
+
+
+def fold_message(plan: dict, content: str, flights: list = None) -> dict:
+    """Fold one message into the plan; later messages override earlier details.
+
+    Args:
+        plan: Plan built from the earlier messages (TravelPlan shape)
+        content: Message content
+        flights: Flights extracted from the message when it was written
+
+    Returns:
+        dict: Updated plan
+    """
+    m = _DESTINATION.search(content)
+    if m:
+        name = m.group(1)
+        plan["destination"] = {"id": name.lower().replace(" ", "-"), "name": name, "country": ""}
+
+    m = _BUDGET.search(content)
+    if m:
+        plan["budget"] = {"amount": float(m.group(1).replace(",", "")), "currency": "USD"}
+
+    m = _PARTICIPANTS.search(content)
+    if m:
+        plan["participants"] = [p for p in (_clean(p) for p in re.split(r",|\band\b", m.group(1))) if p]
+
+    days = _parse_days(content)
+    if days:
+        # A message that lays out days replaces those days
+        merged = {d["day"]: d for d in plan.get("days", [])}
+        merged.update(days)
+        plan["days"] = [merged[n] for n in sorted(merged)]
+        plan["durationDays"] = max(plan.get("durationDays") or 0, max(merged))
+    else:
+        m = _DURATION.search(content)
+        if m:
+            plan["durationDays"] = int(m.group(1))
+
+    if flights:
+        known = {f["id"] for f in plan.get("flights", [])}
+        plan["flights"] = plan.get("flights", []) + [f for f in flights if f["id"] not in known]
+    return plan
+
+
+def _plan_etag(session_id: str, plan: dict) -> str:
+    digest = hashlib.sha1(json.dumps(plan, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f'"{session_id[-8:]}-{digest[:20]}"'
+
+
+# ============== SERVICE ==============
+
+def get_itinerary(session_id: str) -> dict:
+    """
+    Get a session's itinerary, folding in any messages added since the last read.
+
+    Args:
+        session_id: Session's ObjectId as string
+
+    Returns:
+        dict: Response with itinerary, etag, last_message_id and processed count
+    """
+    try:
+        if not is_valid_object_id(session_id):
+            return create_response(False, error="Invalid session ID format")
+
+        session = db.sessions.find_one({"_id": ObjectId(session_id)}, {"itinerary": 1})
+        if not session:
+            return create_response(False, error="Session not found")
+
+        state = session.get("itinerary") or {}
+        plan = state.get("plan") or {"id": session_id}
+        last_message_id = state.get("last_message_id")
+
+        query = {"session_id": ObjectId(session_id)}
+        if last_message_id:
+            query["_id"] = {"$gt": ObjectId(last_message_id)}
+        new_messages = list(db.history.find(query, {"content": 1, "flights": 1}).sort("_id", 1))
+
+        etag = state.get("etag")
+        if new_messages or not etag:
+            for message in new_messages:
+                plan = fold_message(plan, message.get("content") or "", message.get("flights"))
+            etag = _plan_etag(session_id, plan)
+            new_last_id = str(new_messages[-1]["_id"]) if new_messages else last_message_id
+            # Only advance; a concurrent reader may already have folded these messages
+            db.sessions.update_one(
+                {"_id": ObjectId(session_id), "itinerary.last_message_id": last_message_id},
+                {
+                    "$set": {
+                        "itinerary": {
+                            "plan": plan,
+                            "last_message_id": new_last_id,
+                            "etag": etag,
+                            "updated_at": datetime.utcnow()
+                        }
+                    }
+                }
+            )
+            last_message_id = new_last_id
+
+        return create_response(True, {
+            "itinerary": plan,
+            "etag": etag,
+            "last_message_id": last_message_id,
+            "processed": len(new_messages)
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
+
+
+def reset_itinerary(session_id) -> None:
+    """Drop a session's itinerary so it is rebuilt from the remaining messages."""
+    db.sessions.update_one({"_id": ObjectId(session_id)}, {"$unset": {"itinerary": ""}})
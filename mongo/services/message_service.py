@@ -6,6 +6,11 @@ from datetime import datetime
 from bson import ObjectId
 from database import db
 from utils import serialize_doc, serialize_docs, is_valid_object_id, create_response
+from services.itinerary_service import reset_itinerary
+from services.flight_service import extract_flights
+from services.semantic_search_service import index_message, unindex_messages, unindex_sessions
+from services import search_service
+from services.sync_service import next_sync_seq, record_deletion, record_clear
 
 
 VALID_ROLES = ["user", "assistant", "system"]
@@ -28,7 +33,8 @@ def put_message(session_id: str, role: str, content: str) -> dict:
             return create_response(False, error="Invalid session ID format")
         
         # Verify session exists
-        if not db.sessions.find_one({"_id": ObjectId(session_id)}):
+        session = db.sessions.find_one({"_id": ObjectId(session_id)}, {"user_id": 1})
+        if not session:
             return create_response(False, error="Session not found")
         
         # Validate role
@@ -46,16 +52,23 @@ def put_message(session_id: str, role: str, content: str) -> dict:
             "timestamp": datetime.utcnow()
         }
         
-        result = db.history.insert_one(message)
+        # Parsed once here so clients don't re-scan the history for flights
+        flights = extract_flights(content)
+        if flights:
+            message["flights"] = flights
         
-        # Update session's updated_at timestamp
-        db.sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {"$set": {"updated_at": datetime.utcnow()}}
-        )
+        # Sync sequence number; also updates the session's updated_at timestamp
+        message["seq"] = next_sync_seq(session_id)
+        if message["seq"] is None:
+            return create_response(False, error="Session not found")
+        
+        result = db.history.insert_one(message)
+        index_message(result.inserted_id, session_id, session.get("user_id"), content)
+        search_service.index_message(result.inserted_id, session_id, session.get("user_id"), content)
         
         return create_response(True, {
             "message_id": str(result.inserted_id),
+            "flights_count": len(flights),
             "message": "Message added successfully"
         })
         
@@ -135,11 +148,18 @@ def delete_message(message_id: str) -> dict:
         if not is_valid_object_id(message_id):
             return create_response(False, error="Invalid message ID format")
         
-        result = db.history.delete_one({"_id": ObjectId(message_id)})
+        message = db.history.find_one_and_delete({"_id": ObjectId(message_id)}, {"session_id": 1, "seq": 1})
         
-        if result.deleted_count == 0:
+        if not message:
             return create_response(False, error="Message not found")
         
+        # The itinerary may include details from the deleted message
+        reset_itinerary(message["session_id"])
+        unindex_messages([message_id])
+        search_service.unindex_message(message_id)
+        # Lets syncing clients drop it too
+        record_deletion(message["session_id"], message_id, message.get("seq"))
+        
         return create_response(True, {
             "message": "Message deleted successfully"
         })
@@ -167,6 +187,10 @@ def clear_session_messages(session_id: str) -> dict:
             return create_response(False, error="Session not found")
         
         result = db.history.delete_many({"session_id": ObjectId(session_id)})
+        reset_itinerary(session_id)
+        unindex_sessions([session_id])
+        search_service.unindex_sessions([session_id], include_title=False)
+        record_clear(session_id)
         
         return create_response(True, {
             "message": f"Deleted {result.deleted_count} messages",
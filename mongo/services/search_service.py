@@ -0,0 +1,310 @@
+"""
+Search service - full-text search over message content and session titles.
+
+Two backends, chosen with TEXT_SEARCH_BACKEND in config.py:
+
+- "mongo": `$text` queries against the text indexes created by
+  `Database.setup_indexes`, ranked by `textScore`;
+- "memory": an in-process inverted index with BM25 ranking, for deployments
+  without text search. It is built from the database on first use and then
+  kept current by the message and session services, so a search never scans
+  the history. It belongs to one process; run a single API worker with it.
+
+Both return one ranked list of session and message hits with snippets, paged
+with `page` and `page_size`.
+"""
+
+import math
+import re
+import threading
+from bson import ObjectId
+from config import TEXT_SEARCH_BACKEND
+from database import db
+from utils import is_valid_object_id, create_response
+
+
+MAX_PAGE_SIZE = 100
+SNIPPET_CHARS = 160
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[^\W_]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be but by can do for from has have i in is it me my of on or our so that the "
+    "this to was we were what where which will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens (accented letters included) without stop words."""
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOP_WORDS]
+
+
+def _snippet(text: str, terms: list) -> str:
+    """Window of `text` around the first query term it contains."""
+    text = " ".join((text or "").split())
+    if len(text) <= SNIPPET_CHARS or not terms:
+        return text[:SNIPPET_CHARS]
+    m = re.search(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")", text, re.IGNORECASE)
+    start = max(0, m.start() - SNIPPET_CHARS // 4) if m else 0
+    end = start + SNIPPET_CHARS
+    return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+
+
+# ============== IN-PROCESS INDEX ==============
+
+class InvertedIndex:
+    """Term -> {doc key: term frequency} postings with BM25 scoring."""
+
+    def __init__(self):
+        self.postings = {}
+        # doc key -> (session_id, user_id, length, terms); message keys are message ids,
+        # session title keys are "session:<id>"
+        self.docs = {}
+        self.session_docs = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+        self._built = False
+
+    def _ensure_built(self) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            owners = {}
+            for session in db.sessions.find({}, {"user_id": 1, "title": 1}):
+                owners[session["_id"]] = str(session.get("user_id") or "")
+                self._add("session:" + str(session["_id"]), str(session["_id"]), owners[session["_id"]],
+                          session.get("title"))
+            for message in db.history.find({}, {"session_id": 1, "content": 1}):
+                self._add(str(message["_id"]), str(message["session_id"]), owners.get(message["session_id"], ""),
+                          message.get("content"))
+            self._built = True
+
+    def _add(self, key: str, session_id: str, user_id: str, text: str) -> None:
+        self._remove(key)
+        terms = {}
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + 1
+        length = sum(terms.values())
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[key] = count
+        self.docs[key] = (session_id, user_id, length, tuple(terms))
+        self.session_docs.setdefault(session_id, set()).add(key)
+        self.total_length += length
+
+    def _remove(self, key: str) -> None:
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        self.total_length -= doc[2]
+        keys = self.session_docs.get(doc[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.session_docs[doc[0]]
+        for term in doc[3]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[term]
+
+    # Before the first build the database is the source of truth, so updates are skipped;
+    # the build holds the lock, so an update racing it is applied after it
+
+    def add_message(self, message_id: str, session_id: str, user_id: str, content: str) -> None:
+        with self._lock:
+            if self._built:
+                self._add(message_id, session_id, user_id, content)
+
+    def set_session_title(self, session_id: str, title: str, user_id: str = None) -> None:
+        with self._lock:
+            if self._built:
+                key = "session:" + session_id
+                if user_id is None:
+                    user_id = self.docs[key][1] if key in self.docs else ""
+                self._add(key, session_id, user_id, title)
+
+    def remove_message(self, message_id: str) -> None:
+        with self._lock:
+            if self._built:
+                self._remove(message_id)
+
+    def remove_sessions(self, session_ids: list, include_title: bool = True) -> None:
+        with self._lock:
+            if self._built:
+                for session_id in session_ids:
+                    for key in list(self.session_docs.get(session_id, ())):
+                        if include_title or not key.startswith("session:"):
+                            self._remove(key)
+
+    def search(self, terms: list, user_id: str = None) -> list:
+        """(score, key, session_id) for every doc containing a term, best first."""
+        self._ensure_built()
+        with self._lock:
+            n = len(self.docs)
+            if not n:
+                return []
+            average = self.total_length / n or 1.0
+            scores = {}
+            for term in set(terms):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    doc = self.docs[key]
+                    if user_id is not None and doc[1] != user_id:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc[2] / average)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: -item[1])
+            return [(score, key, self.docs[key][0]) for key, score in ranked]
+
+
+_inverted_index = InvertedIndex()
+
+
+# ============== WRITE PATH ==============
+
+def index_message(message_id, session_id, user_id, content: str) -> None:
+    """Add a new message to the in-process index (no-op with the Mongo backend)."""
+    if TEXT_SEARCH_BACKEND == "memory":
+        _inverted_index.add_message(str(message_id), str(session_id), str(user_id or ""), content)
+
+
+def index_session_title(session_id, title: str, user_id=None) -> None:
+    """Index a session's (new) title (no-op with the Mongo backend)."""
+    if TEXT_SEARCH_BACKEND == "memory":
+        _inverted_index.set_session_title(str(session_id), title, None if user_id is None else str(user_id))
+
+
+def unindex_message(message_id) -> None:
+    """Drop a deleted message from the in-process index."""
+    if TEXT_SEARCH_BACKEND == "memory":
+        _inverted_index.remove_message(str(message_id))
+
+
+def unindex_sessions(session_ids: list, include_title: bool = True) -> None:
+    """Drop the messages (and by default the titles) of sessions from the in-process index."""
+    if TEXT_SEARCH_BACKEND == "memory":
+        _inverted_index.remove_sessions([str(s) for s in session_ids], include_title)
+
+
+# ============== BACKENDS ==============
+
+def _search_memory(terms: list, user_id: str, skip: int, limit: int) -> tuple:
+    ranked = _inverted_index.search(terms, user_id)
+    page = ranked[skip:skip + limit]
+    return len(ranked), [
+        ("session" if key.startswith("session:") else "message", key.split(":")[-1], session_id, score)
+        for score, key, session_id in page
+    ]
+
+
+def _search_mongo(query: str, user_id: str, skip: int, limit: int) -> tuple:
+    text = {"$text": {"$search": query}}
+    session_filter = dict(text)
+    message_filter = dict(text)
+    if user_id is not None:
+        session_ids = [s["_id"] for s in db.sessions.find({"user_id": ObjectId(user_id)}, {"_id": 1})]
+        session_filter["user_id"] = ObjectId(user_id)
+        message_filter["session_id"] = {"$in": session_ids}
+
+    # The page can come from either collection, so take the top skip + limit of each and merge
+    score = {"score": {"$meta": "textScore"}}
+    sessions = db.sessions.find(session_filter, score).sort([("score", {"$meta": "textScore"})]).limit(skip + limit)
+    messages = db.history.find(message_filter, {**score, "session_id": 1}).sort(
+        [("score", {"$meta": "textScore"})]).limit(skip + limit)
+    hits = [("session", str(s["_id"]), str(s["_id"]), s["score"]) for s in sessions]
+    hits += [("message", str(m["_id"]), str(m["session_id"]), m["score"]) for m in messages]
+    hits.sort(key=lambda hit: -hit[3])
+
+    total = db.sessions.count_documents(session_filter) + db.history.count_documents(message_filter)
+    return total, hits[skip:skip + limit]
+
+
+# ============== SERVICE ==============
+
+def search(query: str, user_id: str = None, page: int = 1, page_size: int = 20) -> dict:
+    """
+    Full-text search over session titles and message content.
+
+    Args:
+        query: Search words
+        user_id: Optional user ID to search only that user's sessions
+        page: 1-based page number
+        page_size: Results per page (1 to MAX_PAGE_SIZE)
+
+    Returns:
+        dict: Response with ranked results (type, ids, title, snippet, score) and paging info
+    """
+    try:
+        if not query or not query.strip():
+            return create_response(False, error="Query is required")
+
+        if user_id is not None and not is_valid_object_id(user_id):
+            return create_response(False, error="Invalid user ID format")
+
+        page = max(1, int(page or 1))
+        page_size = max(1, min(int(page_size or 20), MAX_PAGE_SIZE))
+        skip = (page - 1) * page_size
+
+        terms = tokenize(query)
+        if not terms:
+            total, hits = 0, []
+        elif TEXT_SEARCH_BACKEND == "memory":
+            total, hits = _search_memory(terms, user_id, skip, page_size)
+        else:
+            total, hits = _search_mongo(query, user_id, skip, page_size)
+
+        message_ids = [ObjectId(i) for kind, i, _, _ in hits if kind == "message"]
+        messages = {
+            str(m["_id"]): m for m in db.history.find(
+                {"_id": {"$in": message_ids}}, {"role": 1, "content": 1, "timestamp": 1}
+            )
+        } if message_ids else {}
+        titles = {
+            str(s["_id"]): s.get("title") for s in db.sessions.find(
+                {"_id": {"$in": list({ObjectId(session_id) for _, _, session_id, _ in hits})}}, {"title": 1}
+            )
+        } if hits else {}
+
+        results = []
+        for kind, doc_id, session_id, score in hits:
+            result = {
+                "type": kind,
+                "session_id": session_id,
+                "session_title": titles.get(session_id),
+                "score": round(score, 4)
+            }
+            if kind == "message":
+                message = messages.get(doc_id)
+                if not message:
+                    continue
+                result.update({
+                    "message_id": doc_id,
+                    "role": message.get("role"),
+                    "snippet": _snippet(message.get("content"), terms),
+                    "timestamp": message["timestamp"].isoformat() if message.get("timestamp") else None
+                })
+            else:
+                result["snippet"] = titles.get(session_id) or ""
+            results.append(result)
+
+        return create_response(True, {
+            "query": query,
+            "results": results,
+            "count": len(results),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "has_more": skip + page_size < total
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
@@ -0,0 +1,524 @@
+"""
+Semantic search service - finds messages by meaning across a user's sessions.
+
+Messages are embedded once, in `put_message`, and appended to an on-disk index
+in SEMANTIC_INDEX_DIR:
+
+- `vectors.f32`: one float32 row of EMBEDDING_DIM values per message, read
+  through `numpy.memmap` so searching does not load the file into memory;
+- `rows.jsonl`: an append-only log with one line per row (message, session,
+  user) and one line per deletion batch, replayed on startup;
+- `meta.json`: dimension, embedder and a generation that changes whenever the
+  files are rewritten (`clear`, `rebuild_semantic_index`, compaction).
+
+Deleted rows are only flagged in the log. Once they make up COMPACT_DEAD_FRACTION
+of an index of at least COMPACT_MIN_ROWS rows, the live rows are copied into
+fresh files, so dead vectors stop costing search time and the log stays bounded.
+
+A search is a single matrix-vector product over the live rows, optionally
+restricted to one user's rows, followed by a partial sort for the top k.
+
+The default embedding is a hashing vectorizer (words, word pairs and character
+trigrams), so it runs offline with no model. Set EMBEDDING_FUNCTION in config.py
+to "module:function" (or call `set_embedder`) to plug in a real model; the
+function takes a list of texts and returns an (n, dim) array. Changing the
+embedder or its dimension empties the index; run `rebuild_semantic_index()`
+(done by setup.py) to refill it from the history.
+
+Several processes (API workers, setup.py) can share the directory: writes hold
+an exclusive `flock` on `.lock` and searches a shared one, and each operation
+first catches up with the others' writes - the log tail since its last read,
+or a full reload when the generation changed.
+"""
+
+import importlib
+import json
+import math
+import os
+import re
+import threading
+import uuid
+import zlib
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from bson import ObjectId
+import numpy as np
+from config import SEMANTIC_INDEX_DIR, EMBEDDING_DIM, EMBEDDING_FUNCTION
+from database import db
+from utils import is_valid_object_id, create_response
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, run a single API worker
+    fcntl = None
+
+
+MAX_RESULTS = 50
+COMPACT_DEAD_FRACTION = 0.25
+COMPACT_MIN_ROWS = 256
+# Cosine similarity below this is hash-collision noise for the default embedding
+MIN_SCORE = 0.05
+SNIPPET_CHARS = 240
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be but by can do for from has have i in is it me my of on or our so that the "
+    "this to was we were what where which will with you your".split()
+)
+
+
+# ============== EMBEDDING ==============
+
+def _bucket(feature: str, dim: int) -> tuple:
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, 1.0 if h & 0x80000000 else -1.0
+
+
+def hashing_embed(texts: list, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Signed feature-hashing embedding, L2-normalised.
+
+    Words and adjacent word pairs carry the meaning; character trigrams at half
+    weight let plurals, possessives and small typos still match.
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = [w for w in _TOKEN.findall((text or "").lower()) if w not in _STOP_WORDS]
+        features = {}
+        for word in words:
+            features[word] = features.get(word, 0.0) + 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                gram = "#3" + padded[i:i + 3]
+                features[gram] = features.get(gram, 0.0) + 0.5
+        for first, second in zip(words, words[1:]):
+            pair = first + " " + second
+            features[pair] = features.get(pair, 0.0) + 1.0
+        for feature, count in features.items():
+            index, sign = _bucket(feature, dim)
+            # Sublinear counts so one repeated word doesn't dominate
+            vectors[row, index] += sign * math.log1p(count)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def _load_embedder():
+    if not EMBEDDING_FUNCTION:
+        return hashing_embed, "hashing"
+    module, _, name = EMBEDDING_FUNCTION.partition(":")
+    return getattr(importlib.import_module(module), name), EMBEDDING_FUNCTION
+
+
+_embed, _embedder_name = _load_embedder()
+
+
+def set_embedder(function, name: str) -> None:
+    """Use `function(texts) -> (n, dim) array` for new embeddings; resets the index."""
+    global _embed, _embedder_name, _index
+    _embed, _embedder_name = function, name
+    _index = None
+
+
+def _embed_texts(texts: list) -> np.ndarray:
+    vectors = np.asarray(_embed(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+# ============== INDEX ==============
+
+class SemanticIndex:
+    """Append-only float32 vector file plus a row log; see the module docstring."""
+
+    def __init__(self, directory: Path, dim: int, embedder: str):
+        self.directory = directory
+        self.dim = dim
+        self.embedder = embedder
+        self.vectors_path = directory / "vectors.f32"
+        self.rows_path = directory / "rows.jsonl"
+        self.meta_path = directory / "meta.json"
+        self.lock_path = directory / ".lock"
+        self._lock = threading.Lock()
+        with self._file_lock(exclusive=True):
+            self._load()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Cross-process lock on the index directory; take it before `self._lock`."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            # Closing the file releases the lock
+            yield
+
+    def _read_meta(self):
+        try:
+            return json.loads(self.meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, **extra) -> None:
+        meta = {"dim": self.dim, "embedder": self.embedder, "generation": uuid.uuid4().hex, **extra}
+        tmp = self.meta_path.with_name(".meta.tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.meta_path)
+
+    def _reset_files(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path.write_bytes(b"")
+        self.rows_path.write_text("")
+        self._write_meta()
+
+    def _replay(self) -> None:
+        """Apply the log lines written since the last read."""
+        with open(self.rows_path, "rb") as f:
+            f.seek(self._log_size)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partial last line from an interrupted write
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self._log_size += len(line)
+                if "deleted" in entry:
+                    for row in entry["deleted"]:
+                        if row < len(self.alive):
+                            self.alive[row] = 0
+                else:
+                    self._append_row(entry["m"], entry["s"], entry["u"])
+
+    def _sync(self) -> None:
+        """Catch up with other processes' writes; call with both locks held."""
+        meta = self._read_meta()
+        if (meta or {}).get("generation") != self.generation:
+            self._load()
+        elif self.rows_path.stat().st_size > self._log_size:
+            self._replay()
+
+    def _load(self) -> None:
+        self.message_ids = []
+        self.row_of = {}
+        self.session_codes = array("i")
+        self.user_codes = array("i")
+        self.alive = array("b")
+        self.session_ids = []
+        self.session_code = {}
+        self.user_code = {}
+        self._memmap = None
+        self._log_size = 0
+
+        meta = self._read_meta()
+        if meta and meta.get("compacting"):
+            print("Semantic index compaction was interrupted; the index is empty until rebuild_semantic_index()")
+        if (not meta or (meta.get("dim"), meta.get("embedder")) != (self.dim, self.embedder)
+                or meta.get("compacting") or not self.vectors_path.exists() or not self.rows_path.exists()):
+            self._reset_files()
+            meta = self._read_meta()
+        self.generation = meta.get("generation")
+
+        self._replay()
+        if self.rows_path.stat().st_size > self._log_size:
+            # Cut the partial line so the next append starts on a fresh one
+            with open(self.rows_path, "r+b") as f:
+                f.truncate(self._log_size)
+
+        # Drop rows whose vector or log line was not fully written
+        rows = min(len(self.message_ids), self.vectors_path.stat().st_size // (4 * self.dim))
+        if rows < len(self.message_ids):
+            for message_id in self.message_ids[rows:]:
+                self.row_of.pop(message_id, None)
+            del self.message_ids[rows:], self.session_codes[rows:], self.user_codes[rows:], self.alive[rows:]
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(rows * 4 * self.dim)
+
+    def clear(self) -> None:
+        """Drop every row."""
+        with self._file_lock(exclusive=True), self._lock:
+            self._reset_files()
+            self._load()
+
+    def _code(self, codes: dict, value: str) -> int:
+        if value not in codes:
+            codes[value] = len(codes)
+            if codes is self.session_code:
+                self.session_ids.append(value)
+        return codes[value]
+
+    def _append_row(self, message_id: str, session_id: str, user_id: str) -> None:
+        # A message indexed twice (e.g. during a rebuild) keeps only its latest row
+        if message_id in self.row_of:
+            self.alive[self.row_of[message_id]] = 0
+        self.row_of[message_id] = len(self.message_ids)
+        self.message_ids.append(message_id)
+        self.session_codes.append(self._code(self.session_code, session_id))
+        self.user_codes.append(self._code(self.user_code, user_id or ""))
+        self.alive.append(1)
+
+    def add(self, entries: list, vectors: np.ndarray) -> None:
+        """Append (message_id, session_id, user_id) rows with their embeddings."""
+        if not entries:
+            return
+        with self._file_lock(exclusive=True), self._lock:
+            self._sync()
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(self.rows_path, "ab") as f:
+                for message_id, session_id, user_id in entries:
+                    f.write((json.dumps({"m": message_id, "s": session_id, "u": user_id or ""}) + "\n").encode())
+                    self._append_row(message_id, session_id, user_id)
+                self._log_size = f.tell()
+
+    def _delete_rows(self, rows: list) -> int:
+        rows = [r for r in rows if self.alive[r]]
+        if rows:
+            with open(self.rows_path, "ab") as f:
+                f.write((json.dumps({"deleted": rows}) + "\n").encode())
+                self._log_size = f.tell()
+            for row in rows:
+                self.alive[row] = 0
+            self._maybe_compact()
+        return len(rows)
+
+    def _maybe_compact(self) -> None:
+        total = len(self.alive)
+        dead = total - (int(np.frombuffer(self.alive, dtype=np.int8).sum()) if total else 0)
+        if total >= COMPACT_MIN_ROWS and dead >= total * COMPACT_DEAD_FRACTION:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the files with the live rows only; call with both locks held exclusively."""
+        live = np.flatnonzero(np.frombuffer(self.alive, dtype=np.int8))
+        users = {code: user_id for user_id, code in self.user_code.items()}
+        vectors_tmp = self.vectors_path.with_name(".vectors.tmp")
+        rows_tmp = self.rows_path.with_name(".rows.tmp")
+        with open(vectors_tmp, "wb") as f:
+            if len(live):
+                f.write(np.ascontiguousarray(self._vectors(len(self.alive))[live]).tobytes())
+        with open(rows_tmp, "w") as f:
+            for row in live.tolist():
+                f.write(json.dumps({
+                    "m": self.message_ids[row],
+                    "s": self.session_ids[self.session_codes[row]],
+                    "u": users[self.user_codes[row]],
+                }) + "\n")
+        # The two data files cannot be swapped atomically together; a crash between the
+        # swaps leaves `compacting` in meta.json and the next load starts empty instead of misaligned
+        self._write_meta(compacting=True)
+        self._memmap = None
+        os.replace(vectors_tmp, self.vectors_path)
+        os.replace(rows_tmp, self.rows_path)
+        self._write_meta()
+        self._load()
+
+    def remove_messages(self, message_ids: list) -> int:
+        with self._file_lock(exclusive=True), self._lock:
+            self._sync()
+            return self._delete_rows([self.row_of[m] for m in message_ids if m in self.row_of])
+
+    def remove_sessions(self, session_ids: list) -> int:
+        with self._file_lock(exclusive=True), self._lock:
+            self._sync()
+            codes = [self.session_code[s] for s in session_ids if s in self.session_code]
+            if not codes:
+                return 0
+            matches = np.isin(np.frombuffer(self.session_codes, dtype=np.int32), codes)
+            return self._delete_rows(np.flatnonzero(matches).tolist())
+
+    def _vectors(self, rows: int) -> np.ndarray:
+        if self._memmap is None or len(self._memmap) < rows:
+            self._memmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._memmap[:rows]
+
+    def search(self, query: np.ndarray, k: int, user_id: str = None) -> list:
+        """Top-k (message_id, session_id, score) by cosine similarity among live rows."""
+        # The shared file lock also keeps the vector file from being emptied under the product
+        with self._file_lock(exclusive=False):
+            with self._lock:
+                self._sync()
+                rows = len(self.message_ids)
+                if not rows:
+                    return []
+                mask = np.frombuffer(self.alive, dtype=np.int8)[:rows].astype(bool)
+                if user_id is not None:
+                    code = self.user_code.get(user_id)
+                    if code is None:
+                        return []
+                    mask &= np.frombuffer(self.user_codes, dtype=np.int32)[:rows] == code
+                vectors = self._vectors(rows)
+                session_codes = np.frombuffer(self.session_codes, dtype=np.int32)[:rows].copy()
+                message_ids, session_ids = self.message_ids, self.session_ids
+
+            candidates = np.flatnonzero(mask)
+            if not len(candidates):
+                return []
+            # Unfiltered searches read every row sequentially; filtered ones only the user's rows
+            scores = vectors @ query if len(candidates) == rows else vectors[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (message_ids[candidates[i]], session_ids[session_codes[candidates[i]]], float(scores[i]))
+            for i in top if scores[i] >= MIN_SCORE
+        ]
+
+    def stats(self) -> dict:
+        with self._file_lock(exclusive=False), self._lock:
+            self._sync()
+            live = int(np.frombuffer(self.alive, dtype=np.int8).sum()) if len(self.alive) else 0
+            return {"rows": len(self.message_ids), "live": live, "dim": self.dim, "embedder": self.embedder}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _index_directory() -> Path:
+    directory = Path(SEMANTIC_INDEX_DIR)
+    return directory if directory.is_absolute() else Path(__file__).resolve().parent.parent / directory
+
+
+def get_semantic_index() -> SemanticIndex:
+    """Return the process-wide index, opening it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                dim = int(_embed_texts(["dimension probe"]).shape[1])
+                _index = SemanticIndex(_index_directory(), dim, _embedder_name)
+    return _index
+
+
+# ============== WRITE PATH ==============
+
+def index_message(message_id, session_id, user_id, content: str) -> None:
+    """Embed one new message and append it to the index (best effort; rebuild recovers)."""
+    try:
+        vector = _embed_texts([content])
+        get_semantic_index().add([(str(message_id), str(session_id), str(user_id or ""))], vector)
+    except Exception as e:
+        print(f"Semantic index update failed: {e}")
+
+
+def unindex_messages(message_ids: list) -> None:
+    """Drop messages from the index."""
+    try:
+        get_semantic_index().remove_messages([str(m) for m in message_ids])
+    except Exception as e:
+        print(f"Semantic index update failed: {e}")
+
+
+def unindex_sessions(session_ids: list) -> None:
+    """Drop every message of the given sessions from the index."""
+    try:
+        get_semantic_index().remove_sessions([str(s) for s in session_ids])
+    except Exception as e:
+        print(f"Semantic index update failed: {e}")
+
+
+def rebuild_semantic_index(batch_size: int = 512) -> int:
+    """Re-embed the whole history into a fresh index; returns the number of messages indexed."""
+    global _index
+    with _index_lock:
+        dim = int(_embed_texts(["dimension probe"]).shape[1])
+        index = SemanticIndex(_index_directory(), dim, _embedder_name)
+        index.clear()
+
+        owners = {s["_id"]: str(s.get("user_id") or "") for s in db.sessions.find({}, {"user_id": 1})}
+
+        def flush(batch):
+            vectors = _embed_texts([m.get("content") or "" for m in batch])
+            index.add([(str(m["_id"]), str(m["session_id"]), owners.get(m["session_id"], "")) for m in batch],
+                      vectors)
+
+        batch, total = [], 0
+        for message in db.history.find({}, {"session_id": 1, "content": 1}).sort("_id", 1):
+            batch.append(message)
+            if len(batch) >= batch_size:
+                flush(batch)
+                total, batch = total + len(batch), []
+        if batch:
+            flush(batch)
+            total += len(batch)
+        _index = index
+    return total
+
+
+# ============== SERVICE ==============
+
+def _snippet(content: str, query_words: set) -> str:
+    """Window of the message around the first query word it contains."""
+    content = " ".join((content or "").split())
+    if len(content) <= SNIPPET_CHARS:
+        return content
+    lowered = content.lower()
+    positions = [lowered.find(w) for w in query_words if w in lowered]
+    start = max(0, min(positions) - SNIPPET_CHARS // 3) if positions else 0
+    end = start + SNIPPET_CHARS
+    return ("…" if start else "") + content[start:end].strip() + ("…" if end < len(content) else "")
+
+
+def semantic_search(query: str, user_id: str = None, limit: int = 10) -> dict:
+    """
+    Find the messages closest in meaning to a query.
+
+    Args:
+        query: Free-text query, e.g. "where did we talk about the Louvre?"
+        user_id: Optional user ID to search only that user's sessions
+        limit: Maximum number of results (1 to MAX_RESULTS)
+
+    Returns:
+        dict: Response with results (message, session and similarity score), best first
+    """
+    try:
+        if not query or not query.strip():
+            return create_response(False, error="Query is required")
+
+        if user_id is not None and not is_valid_object_id(user_id):
+            return create_response(False, error="Invalid user ID format")
+
+        limit = max(1, min(int(limit or 10), MAX_RESULTS))
+        vector = _embed_texts([query])[0]
+        if not vector.any():
+            return create_response(True, {"query": query, "results": [], "count": 0})
+
+        hits = get_semantic_index().search(vector, limit, user_id)
+        messages = {
+            str(m["_id"]): m for m in db.history.find(
+                {"_id": {"$in": [ObjectId(message_id) for message_id, _, _ in hits]}},
+                {"role": 1, "content": 1, "timestamp": 1}
+            )
+        }
+        titles = {
+            str(s["_id"]): s.get("title") for s in db.sessions.find(
+                {"_id": {"$in": list({ObjectId(session_id) for _, session_id, _ in hits})}}, {"title": 1}
+            )
+        }
+
+        query_words = set(_TOKEN.findall(query.lower())) - _STOP_WORDS
+        results = []
+        for message_id, session_id, score in hits:
+            message = messages.get(message_id)
+            if not message:
+                continue
+            results.append({
+                "message_id": message_id,
+                "session_id": session_id,
+                "session_title": titles.get(session_id),
+                "role": message.get("role"),
+                "snippet": _snippet(message.get("content"), query_words),
+                "timestamp": message["timestamp"].isoformat() if message.get("timestamp") else None,
+                "score": round(score, 4)
+            })
+
+        return create_response(True, {
+            "query": query,
+            "results": results,
+            "count": len(results)
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
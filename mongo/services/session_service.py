@@ -6,6 +6,10 @@ from datetime import datetime
 from bson import ObjectId
 from database import db
 from utils import serialize_doc, serialize_docs, is_valid_object_id, create_response
+from services.expense_service import delete_session_expenses
+from services.semantic_search_service import unindex_sessions
+from services import search_service
+from services.sync_service import delete_session_tombstones
 
 
 def create_session(user_id: str, title: str = None) -> dict:
@@ -35,6 +39,7 @@ def create_session(user_id: str, title: str = None) -> dict:
         }
         
         result = db.sessions.insert_one(session)
+        search_service.index_session_title(result.inserted_id, session["title"], user_id)
         
         return create_response(True, {
             "session_id": str(result.inserted_id),
@@ -63,7 +68,8 @@ def list_sessions(user_id: str = None) -> dict:
                 return create_response(False, error="Invalid user ID format")
             query["user_id"] = ObjectId(user_id)
         
-        sessions = list(db.sessions.find(query).sort("updated_at", -1))
+        # The itinerary is served by its own endpoint
+        sessions = list(db.sessions.find(query, {"itinerary": 0}).sort("updated_at", -1))
         
         return create_response(True, {
             "sessions": serialize_docs(sessions),
@@ -88,7 +94,7 @@ def get_session(session_id: str) -> dict:
         if not is_valid_object_id(session_id):
             return create_response(False, error="Invalid session ID format")
         
-        session = db.sessions.find_one({"_id": ObjectId(session_id)})
+        session = db.sessions.find_one({"_id": ObjectId(session_id)}, {"itinerary": 0})
         
         if not session:
             return create_response(False, error="Session not found")
@@ -119,18 +125,20 @@ def update_session(session_id: str, title: str) -> dict:
         if not title or not title.strip():
             return create_response(False, error="Title is required")
         
-        result = db.sessions.update_one(
+        session = db.sessions.find_one_and_update(
             {"_id": ObjectId(session_id)},
             {
                 "$set": {
                     "title": title.strip(),
                     "updated_at": datetime.utcnow()
                 }
-            }
+            },
+            projection={"user_id": 1}
         )
         
-        if result.matched_count == 0:
+        if session is None:
             return create_response(False, error="Session not found")
+        search_service.index_session_title(session_id, title.strip(), session.get("user_id"))
         
         return create_response(True, {
             "message": "Session updated successfully"
@@ -161,6 +169,10 @@ def delete_session(session_id: str) -> dict:
         
         # Delete all messages in this session
         db.history.delete_many({"session_id": ObjectId(session_id)})
+        delete_session_expenses([session_id])
+        unindex_sessions([session_id])
+        search_service.unindex_sessions([session_id])
+        delete_session_tombstones([session_id])
         
         # Delete the session
         db.sessions.delete_one({"_id": ObjectId(session_id)})
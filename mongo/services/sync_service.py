@@ -0,0 +1,169 @@
+"""
+Sync service - per-session change feed for incremental client refreshes.
+
+Every change to a session's messages takes the next value of the session's
+`sync_seq` counter: a new message stores it as `seq`, a deleted message leaves
+a tombstone with its own `seq` (and the message's `message_seq`). A client
+keeps the `sync_token` from its last response and asks only for what changed
+after it.
+
+The token handed out is the highest sequence number up to which every value is
+accounted for. A value that is taken but not yet written (a write in flight)
+holds the token back, so it cannot be skipped; values still missing after
+SYNC_GAP_SECONDS are treated as failed writes.
+
+Clearing a session raises its `sync_floor` instead of writing one tombstone per
+message. Tombstones older than TOMBSTONE_RETENTION_DAYS are compacted the same
+way, for the session being read on every `get_changes` and for all sessions by
+setup.py. A token below the floor gets a full reset (`reset: true` and every
+message).
+"""
+
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from config import TOMBSTONE_RETENTION_DAYS
+from database import db
+from utils import serialize_docs, is_valid_object_id, create_response
+
+
+# Sequence values missing for longer than this belong to writes that failed
+SYNC_GAP_SECONDS = 30
+
+
+def next_sync_seq(session_id) -> int:
+    """Take the session's next sequence number and touch its updated_at; None if it doesn't exist."""
+    session = db.sessions.find_one_and_update(
+        {"_id": ObjectId(session_id)},
+        {"$inc": {"sync_seq": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        projection={"sync_seq": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return session["sync_seq"] if session else None
+
+
+def compact_tombstones(session_id=None, retention_days: int = TOMBSTONE_RETENTION_DAYS) -> int:
+    """
+    Drop tombstones older than the retention period.
+
+    Each affected session's sync floor is raised past them, so clients whose
+    token predates a dropped tombstone get a full reset instead of missing it.
+
+    Returns:
+        int: Number of tombstones dropped
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    match = {"deleted_at": {"$lt": cutoff}}
+    if session_id is not None:
+        match["session_id"] = ObjectId(session_id)
+
+    dropped = 0
+    for group in db.tombstones.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$session_id", "seq": {"$max": "$seq"}}}
+    ]):
+        db.sessions.update_one({"_id": group["_id"]}, {"$max": {"sync_floor": group["seq"]}})
+        dropped += db.tombstones.delete_many(
+            {"session_id": group["_id"], "seq": {"$lte": group["seq"]}}
+        ).deleted_count
+    return dropped
+
+
+def record_deletion(session_id, message_id, message_seq=None) -> None:
+    """Write a tombstone for a deleted message, then compact the session's expired ones."""
+    seq = next_sync_seq(session_id)
+    if seq is None:
+        return
+    db.tombstones.insert_one({
+        "session_id": ObjectId(session_id),
+        "message_id": ObjectId(message_id),
+        "message_seq": message_seq,
+        "seq": seq,
+        "deleted_at": datetime.utcnow()
+    })
+    compact_tombstones(session_id)
+
+
+def record_clear(session_id) -> None:
+    """Raise the sync floor past everything in the session; earlier tombstones are obsolete."""
+    seq = next_sync_seq(session_id)
+    if seq is None:
+        return
+    db.sessions.update_one({"_id": ObjectId(session_id)}, {"$max": {"sync_floor": seq}})
+    db.tombstones.delete_many({"session_id": ObjectId(session_id), "seq": {"$lte": seq}})
+
+
+def delete_session_tombstones(session_ids: list) -> None:
+    """Drop all tombstones of the given sessions."""
+    db.tombstones.delete_many({"session_id": {"$in": [ObjectId(s) for s in session_ids]}})
+
+
+def _frontier(since: int, seen: dict, now: datetime) -> int:
+    """Highest token t >= since with every value in since+1..t seen (or given up on)."""
+    token = since
+    for seq in sorted(seen):
+        if seq <= token:
+            continue
+        # A gap before `seq`: wait for it unless `seq` itself is old enough
+        if seq > token + 1 and now - seen[seq] < timedelta(seconds=SYNC_GAP_SECONDS):
+            break
+        token = seq
+    return token
+
+
+def get_changes(session_id: str, since: str = None) -> dict:
+    """
+    Get the messages added and deleted in a session since a sync token.
+
+    Args:
+        session_id: Session's ObjectId as string
+        since: Token from a previous response; omit for a full snapshot
+
+    Returns:
+        dict: Response with new messages, deleted message ids, the next
+        sync_token, and reset=True when the client must replace its copy
+    """
+    try:
+        if not is_valid_object_id(session_id):
+            return create_response(False, error="Invalid session ID format")
+
+        if since is not None and not str(since).isdigit():
+            return create_response(False, error="Invalid sync token")
+
+        # Expire old tombstones first so the floor read below accounts for them
+        compact_tombstones(session_id)
+        session = db.sessions.find_one({"_id": ObjectId(session_id)}, {"sync_floor": 1})
+        if not session:
+            return create_response(False, error="Session not found")
+
+        floor = session.get("sync_floor", 0)
+        reset = since is None or int(since) < floor
+        since = floor if reset else int(since)
+        now = datetime.utcnow()
+
+        if reset:
+            messages = list(db.history.find({"session_id": ObjectId(session_id)}).sort("timestamp", 1))
+        else:
+            messages = list(db.history.find({"session_id": ObjectId(session_id), "seq": {"$gt": since}}).sort("seq", 1))
+        tombstones = list(db.tombstones.find({"session_id": ObjectId(session_id), "seq": {"$gt": since}}))
+
+        # Sequence values accounted for after `since`, with when they were written;
+        # a deleted message's value is accounted for by its tombstone
+        seen = {m["seq"]: m["timestamp"] for m in messages if m.get("seq", 0) > since}
+        for t in tombstones:
+            seen[t["seq"]] = t["deleted_at"]
+            if t.get("message_seq"):
+                seen.setdefault(t["message_seq"], t["deleted_at"])
+
+        deleted = [] if reset else [str(t["message_id"]) for t in sorted(tombstones, key=lambda t: t["seq"])]
+
+        return create_response(True, {
+            "sync_token": str(_frontier(since, seen, now)),
+            "reset": reset,
+            "messages": serialize_docs(messages),
+            "deleted": deleted,
+            "count": len(messages) + len(deleted)
+        })
+
+    except Exception as e:
+        return create_response(False, error=str(e))
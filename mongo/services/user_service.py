@@ -6,6 +6,10 @@ from datetime import datetime
 from bson import ObjectId
 from database import db
 from utils import serialize_doc, serialize_docs, is_valid_object_id, create_response
+from services.expense_service import delete_session_expenses
+from services.semantic_search_service import unindex_sessions
+from services import search_service
+from services.sync_service import delete_session_tombstones
 
 
 def create_user(username: str, email: str) -> dict:
@@ -124,6 +128,10 @@ def delete_user(user_id: str) -> dict:
         # Delete all messages in user's sessions
         if session_ids:
             db.history.delete_many({"session_id": {"$in": session_ids}})
+            delete_session_expenses(session_ids)
+            unindex_sessions(session_ids)
+            search_service.unindex_sessions(session_ids)
+            delete_session_tombstones(session_ids)
         
         # Delete all user's sessions
         db.sessions.delete_many({"user_id": ObjectId(user_id)})
@@ -4,12 +4,17 @@ Run this once before starting the application.
 """
 
 from database import db
+from services.semantic_search_service import rebuild_semantic_index
+from services.sync_service import compact_tombstones
 
 
 def setup():
     """Initialize the database with required indexes."""
     print("Setting up database indexes...")
     db.setup_indexes()
+    print("Building semantic search index...")
+    print(f"Indexed {rebuild_semantic_index()} messages")
+    print(f"Dropped {compact_tombstones()} expired sync tombstones")
     print("Setup complete!")
     
     # Test connection
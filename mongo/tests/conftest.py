@@ -0,0 +1,44 @@
+"""
+Test setup: the services run against an in-memory mongomock client.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+import pymongo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+pymongo.MongoClient = lambda *args, **kwargs: mongomock.MongoClient()
+
+
+def _sequential_bulk_write(collection):
+    """mongomock's bulk_write rejects current pymongo UpdateOne objects; apply them one by one."""
+    def bulk_write(requests, ordered=True):
+        for op in requests:
+            collection.update_one(op._filter, op._doc, upsert=op._upsert)
+    return bulk_write
+
+
+@pytest.fixture(autouse=True)
+def clean_db(tmp_path, monkeypatch):
+    import config
+    from database import db
+    import services.semantic_search_service as semantic
+
+    monkeypatch.setattr(config, "SEMANTIC_INDEX_DIR", str(tmp_path / "semantic_index"))
+    monkeypatch.setattr(semantic, "SEMANTIC_INDEX_DIR", str(tmp_path / "semantic_index"))
+    monkeypatch.setattr(semantic, "_index", None)
+    for name in db.db.list_collection_names():
+        db.db.drop_collection(name)
+    db.balances.bulk_write = _sequential_bulk_write(db.balances)
+    yield db
+
+
+@pytest.fixture
+def session_id(clean_db):
+    from services import create_user, create_session
+    user_id = create_user("alice", "alice@example.com")["user_id"]
+    return create_session(user_id, "Trip")["session_id"]
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from database import db
+from services import add_expense, get_balances, delete_expense
+from services.expense_service import settle, _settle_group, _shares, EXACT_SETTLEMENT_MAX
+
+
+def _balances(session_id):
+    return {b["user"]: b["amount"] for b in get_balances(session_id)["balances"]}
+
+
+def _check_settles(balances, transfers):
+    net = dict(balances)
+    for debtor, creditor, cents in transfers:
+        assert cents > 0
+        net[debtor] += cents
+        net[creditor] -= cents
+    assert all(v == 0 for v in net.values())
+
+
+def test_shares_spread_remainder_and_sum_to_zero():
+    shares = {s["participant"]: s["cents"] for s in _shares(1000, "a", ["a", "b", "c"])}
+    assert shares == {"a": 666, "b": -333, "c": -333}
+    assert sum(shares.values()) == 0
+
+
+def test_add_and_delete_expense_update_balances(session_id):
+    expense_id = add_expense(session_id, "Hotel", 300, "alice", ["alice", "bob", "carol"])["expense_id"]
+    add_expense(session_id, "Dinner", 90, "bob", ["alice", "bob", "carol"])
+    assert _balances(session_id) == {"alice": 170.0, "bob": -40.0, "carol": -130.0}
+
+    assert delete_expense(session_id, expense_id)["success"]
+    assert _balances(session_id) == {"alice": -30.0, "bob": 60.0, "carol": -30.0}
+
+
+def test_deleting_a_session_or_user_drops_its_expenses(session_id):
+    from services import create_session, delete_session, delete_user
+    user_id = str(db.sessions.find_one({"_id": ObjectId(session_id)})["user_id"])
+    other = create_session(user_id, "Second trip")["session_id"]
+    for session in (session_id, other):
+        add_expense(session, "Hotel", 300, "alice", ["alice", "bob"])
+
+    assert delete_session(session_id)["success"]
+    assert db.expenses.count_documents({}) == 1 and _balances(other) == {"alice": 150.0, "bob": -150.0}
+
+    assert delete_user(user_id)["success"]
+    assert db.expenses.count_documents({}) == 0 and db.balances.count_documents({}) == 0
+
+
+def test_partial_balance_failure_leaves_balances_consistent(session_id, monkeypatch):
+    add_expense(session_id, "Hotel", 300, "alice", ["alice", "bob", "carol"])
+    before = _balances(session_id)
+    balances = db.balances
+
+    def failing_bulk_write(requests, ordered=True):
+        # The first $inc lands, then the write fails
+        op = requests[0]
+        balances.update_one(op._filter, op._doc, upsert=op._upsert)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 1, "errmsg": "boom"}], "nModified": 1})
+
+    monkeypatch.setattr(balances, "bulk_write", failing_bulk_write)
+    result = add_expense(session_id, "Taxi", 30, "bob", ["alice", "bob", "carol"])
+
+    assert not result["success"]
+    assert db.expenses.count_documents({"session_id": ObjectId(session_id)}) == 1
+    assert _balances(session_id) == before
+
+
+def test_exact_settlement_beats_greedy():
+    # Two independent pairs hidden among mixed balances: 3 transfers instead of greedy's 4
+    balances = {"a": 500, "b": -500, "c": 700, "d": -300, "e": -400}
+    transfers = settle(balances)
+    _check_settles(balances, transfers)
+    assert len(transfers) == 3
+    assert len(transfers) < len(_settle_group(list(balances.items())))
+
+
+def test_exact_settlement_is_never_worse_than_greedy():
+    rng = random.Random(1)
+    for _ in range(100):
+        values = [rng.choice([-1, 1]) * rng.choice([500, 700, 1000, 1500]) for _ in range(rng.randint(2, 9))]
+        values.append(-sum(values))
+        balances = {f"p{i}": v for i, v in enumerate(values)}
+        transfers = settle(balances)
+        _check_settles(balances, transfers)
+        assert len(transfers) <= len(_settle_group(list(balances.items())))
+
+
+def test_heuristic_settlement_above_exact_limit():
+    # Nine exactly opposite pairs plus a three-way remainder: 21 balances, above the exact limit
+    balances = {}
+    for i in range(9):
+        balances[f"c{i}"] = (i + 1) * 100
+        balances[f"d{i}"] = -(i + 1) * 100
+    balances.update({"x": 250, "y": 150, "z": -400})
+    assert len(balances) > EXACT_SETTLEMENT_MAX
+
+    transfers = settle(balances)
+    _check_settles(balances, transfers)
+    assert len(transfers) == 9 + 2
+    assert len(transfers) <= len(_settle_group(list(balances.items())))
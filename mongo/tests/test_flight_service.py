@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import pytest
+
+from services.flight_service import _parse_date_like
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-05-01 10:30", "2024-05-01T10:30:00Z"),
+    ("Departs 2024-05-01T08:05:00 from CDG", "2024-05-01T08:05:00Z"),
+    ("2024-05-01", "2024-05-01T00:00:00Z"),
+    ("no date here", None),
+])
+def test_parse_date_like_returns_utc_z(value, expected):
+    assert _parse_date_like(value) == expected
+
+
+def test_parse_time_only_is_anchored_to_today_utc():
+    assert _parse_date_like("7:45 PM") == datetime.utcnow().date().isoformat() + "T19:45:00Z"
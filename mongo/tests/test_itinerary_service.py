@@ -0,0 +1,72 @@
+from bson import ObjectId
+
+import services.itinerary_service as itinerary_service
+from database import db
+from services import put_message, delete_message, get_itinerary
+from utils import etag_matches
+
+
+def _put(session_id, content):
+    return put_message(session_id, "user", content)["message_id"]
+
+
+def test_each_read_folds_only_new_messages(session_id):
+    _put(session_id, "Planning a trip to Paris for 4 days")
+    _put(session_id, "Budget: $2,000")
+
+    first = get_itinerary(session_id)
+    assert first["processed"] == 2
+    assert first["itinerary"]["destination"]["name"] == "Paris"
+    assert first["itinerary"]["budget"]["amount"] == 2000
+
+    unchanged = get_itinerary(session_id)
+    assert unchanged["processed"] == 0 and unchanged["etag"] == first["etag"]
+
+    last = _put(session_id, "Day 1: Eiffel Tower, Louvre Museum")
+    updated = get_itinerary(session_id)
+    assert updated["processed"] == 1 and updated["last_message_id"] == last
+    assert updated["etag"] != first["etag"]
+    assert updated["itinerary"]["destination"]["name"] == "Paris"
+    assert [a["title"] for a in updated["itinerary"]["days"][0]["activities"]] == ["Eiffel Tower", "Louvre Museum"]
+
+
+def test_slower_reader_does_not_move_the_fold_back(session_id, monkeypatch):
+    _put(session_id, "Planning a trip to Paris")
+    fold = itinerary_service.fold_message
+    later = []
+
+    def fold_while_another_reader_finishes(plan, content, flights=None):
+        if not later:
+            # A message arrives and another reader folds everything before we write
+            later.append(_put(session_id, "Actually, a trip to Rome"))
+            monkeypatch.setattr(itinerary_service, "fold_message", fold)
+            assert get_itinerary(session_id)["processed"] == 2
+        return fold(plan, content, flights)
+
+    monkeypatch.setattr(itinerary_service, "fold_message", fold_while_another_reader_finishes)
+    assert get_itinerary(session_id)["processed"] == 1
+
+    stored = db.sessions.find_one({"_id": ObjectId(session_id)})["itinerary"]
+    assert stored["last_message_id"] == later[0]
+    assert stored["plan"]["destination"]["name"] == "Rome"
+    assert get_itinerary(session_id)["processed"] == 0
+
+
+def test_deleting_a_message_rebuilds_from_the_rest(session_id):
+    _put(session_id, "Planning a trip to Paris")
+    rome = _put(session_id, "Actually, a trip to Rome")
+    assert get_itinerary(session_id)["itinerary"]["destination"]["name"] == "Rome"
+
+    assert delete_message(rome)["success"]
+    rebuilt = get_itinerary(session_id)
+    assert rebuilt["processed"] == 1
+    assert rebuilt["itinerary"]["destination"]["name"] == "Paris"
+
+
+def test_if_none_match_uses_weak_list_comparison():
+    etag = '"abc-123"'
+    assert etag_matches(etag, '"abc-123"')
+    assert etag_matches(etag, '"old", W/"abc-123"')
+    assert etag_matches(etag, "*")
+    assert not etag_matches(etag, '"abc-1234"')
+    assert not etag_matches(etag, None)
@@ -0,0 +1,84 @@
+import pytest
+
+from services import (
+    clear_session_messages, create_session, create_user, delete_message, delete_session, put_message, search,
+    update_session,
+)
+from services import search_service
+
+
+@pytest.fixture(autouse=True)
+def memory_backend(monkeypatch):
+    monkeypatch.setattr(search_service, "TEXT_SEARCH_BACKEND", "memory")
+    monkeypatch.setattr(search_service, "_inverted_index", search_service.InvertedIndex())
+
+
+@pytest.fixture
+def users():
+    return create_user("alice", "alice@example.com")["user_id"], create_user("bob", "bob@example.com")["user_id"]
+
+
+def _ids(response, kind="message"):
+    return [r.get("message_id") or r["session_id"] for r in response["results"] if r["type"] == kind]
+
+
+def test_bm25_ranks_more_specific_matches_first(users):
+    session_id = create_session(users[0], "Spring")["session_id"]
+    both = put_message(session_id, "user", "Louvre tickets for the Paris museum day")["message_id"]
+    paris = put_message(session_id, "assistant", "Paris hotel near the station, breakfast included")["message_id"]
+    put_message(session_id, "user", "Packing list for the flight")
+
+    response = search("louvre paris")
+    assert response["total"] == 2
+    assert _ids(response) == [both, paris]
+    assert response["results"][0]["score"] > response["results"][1]["score"]
+    assert "Louvre" in response["results"][0]["snippet"]
+
+
+def test_paging_covers_every_hit_once(users):
+    session_id = create_session(users[0], "Rome")["session_id"]
+    for i in range(5):
+        put_message(session_id, "user", f"gelato stop number {i}")
+
+    pages = [search("gelato", page=page, page_size=2) for page in (1, 2, 3)]
+    assert [p["count"] for p in pages] == [2, 2, 1]
+    assert [p["has_more"] for p in pages] == [True, True, False]
+    assert all(p["total"] == 5 for p in pages)
+    assert len({i for p in pages for i in _ids(p)}) == 5
+
+
+def test_index_follows_deletes_clears_and_renames(users):
+    alice, bob = users
+    session_id = create_session(alice, "Lisbon weekend")["session_id"]
+    kept = put_message(session_id, "user", "tram 28 through Alfama")["message_id"]
+    dropped = put_message(session_id, "user", "tram tickets at the kiosk")["message_id"]
+    assert set(_ids(search("tram"))) == {kept, dropped}
+
+    delete_message(dropped)
+    assert _ids(search("tram")) == [kept]
+
+    # Renaming keeps the session searchable for its owner only
+    update_session(session_id, "Porto weekend")
+    assert _ids(search("lisbon"), "session") == []
+    assert _ids(search("porto", user_id=alice), "session") == [session_id]
+    assert search("porto", user_id=bob)["total"] == 0
+
+    # Clearing drops the messages but not the title
+    clear_session_messages(session_id)
+    assert search("tram")["total"] == 0
+    assert _ids(search("porto"), "session") == [session_id]
+
+    delete_session(session_id)
+    assert search("porto")["total"] == 0
+
+
+def test_rename_of_a_title_missing_from_the_index_keeps_the_owner(users):
+    alice, bob = users
+    session_id = create_session(alice, "Untitled")["session_id"]
+    search("anything")
+    # A title missing from the index must be re-added under its owner, not an empty one
+    search_service._inverted_index._remove("session:" + session_id)
+
+    update_session(session_id, "Kyoto temples")
+    assert _ids(search("kyoto", user_id=alice), "session") == [session_id]
+    assert search("kyoto", user_id=bob)["total"] == 0
@@ -0,0 +1,114 @@
+import numpy as np
+
+from services.semantic_search_service import SemanticIndex, hashing_embed
+
+
+DIM = 256
+
+
+def _open(directory):
+    return SemanticIndex(directory, DIM, "hashing")
+
+
+def _add(index, *entries):
+    index.add([(m, "s1", "u1") for m, _ in entries], hashing_embed([text for _, text in entries], DIM))
+
+
+def _search(index, text):
+    """Message ids of the hits, best first (hash collisions may add weak extra hits)."""
+    return [m for m, _, _ in index.search(hashing_embed([text], DIM)[0], 10)]
+
+
+def test_processes_sharing_the_directory_see_each_others_writes(tmp_path):
+    api, worker = _open(tmp_path), _open(tmp_path)
+
+    _add(api, ("m1", "louvre museum tickets"))
+    _add(worker, ("m2", "colosseum guided tour"))
+    assert _search(api, "colosseum tour")[0] == "m2"
+    assert _search(worker, "louvre museum")[0] == "m1"
+
+    worker.remove_messages(["m1"])
+    assert "m1" not in _search(api, "louvre museum")
+    assert api.stats()["live"] == 1
+
+
+def test_rebuild_elsewhere_is_picked_up(tmp_path):
+    api = _open(tmp_path)
+    _add(api, ("old", "louvre museum tickets"))
+    assert _search(api, "louvre museum")[0] == "old"
+
+    # setup.py's rebuild runs in another process with its own index object
+    rebuild = _open(tmp_path)
+    rebuild.clear()
+    _add(rebuild, ("new", "sagrada familia towers"))
+
+    assert "old" not in _search(api, "louvre museum")
+    assert _search(api, "sagrada familia")[0] == "new"
+
+    # The API's next write lands in the rebuilt index, readable by everyone
+    _add(api, ("later", "louvre night opening"))
+    assert _open(tmp_path).stats()["rows"] == 2
+    assert _search(rebuild, "louvre night")[0] == "later"
+
+
+def test_partial_log_line_is_dropped_and_reindexing_keeps_one_row(tmp_path):
+    index = _open(tmp_path)
+    _add(index, ("m1", "louvre museum tickets"))
+    with open(tmp_path / "rows.jsonl", "a") as f:
+        f.write('{"m": "torn", "s"')
+
+    reopened = _open(tmp_path)
+    assert reopened.stats()["rows"] == 1
+    _add(reopened, ("m1", "louvre museum tickets"))
+    assert _search(_open(tmp_path), "louvre museum") == ["m1"]
+    assert np.frombuffer(reopened.alive, dtype=np.int8).tolist() == [0, 1]
+
+
+def test_dead_rows_are_compacted_away(tmp_path, monkeypatch):
+    import services.semantic_search_service as semantic
+    monkeypatch.setattr(semantic, "COMPACT_MIN_ROWS", 8)
+    api, worker = _open(tmp_path), _open(tmp_path)
+    _add(api, *[(f"m{i}", f"day {i} walking tour") for i in range(8)])
+    _add(api, ("louvre", "louvre museum tickets"))
+    generation = api.generation
+
+    worker.remove_messages(["m0"])
+    assert worker.stats()["rows"] == 9
+    worker.remove_messages(["m1", "m2"])
+
+    # A quarter of the rows were dead, so only the live ones were rewritten
+    assert (tmp_path / "vectors.f32").stat().st_size == 6 * 4 * DIM
+    assert len((tmp_path / "rows.jsonl").read_text().splitlines()) == 6
+    assert worker.generation != generation
+    assert _search(api, "louvre museum")[0] == "louvre"
+    assert api.stats()["rows"] == api.stats()["live"] == 6
+    assert _search(_open(tmp_path), "day 5 walking")[0] == "m5"
+
+
+def test_interrupted_compaction_starts_empty(tmp_path):
+    index = _open(tmp_path)
+    _add(index, ("m1", "louvre museum tickets"))
+    index._write_meta(compacting=True)
+
+    assert _open(tmp_path).stats()["rows"] == 0
+
+
+def test_finds_where_a_topic_was_discussed(session_id):
+    from services import put_message, semantic_search
+    messages = {}
+    for content in [
+        "Let's book the Eiffel Tower summit for Tuesday evening",
+        "I reserved the Louvre for Wednesday morning, the Mona Lisa queue is shorter then",
+        "Dinner at a bistro in Le Marais after the river cruise",
+        "Train from Paris to Amsterdam leaves at 9:25 from Gare du Nord",
+    ]:
+        messages[content] = put_message(session_id, "user", content)["message_id"]
+
+    response = semantic_search("where did we talk about the Louvre?")
+
+    assert response["success"]
+    top = response["results"][0]
+    assert top["message_id"] == messages[
+        "I reserved the Louvre for Wednesday morning, the Mona Lisa queue is shorter then"]
+    assert top["session_title"] == "Trip"
+    assert "Louvre" in top["snippet"]
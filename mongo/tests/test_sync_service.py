@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from config import TOMBSTONE_RETENTION_DAYS
+from database import db
+from services import put_message, delete_message, clear_session_messages, get_changes
+from services.sync_service import next_sync_seq, compact_tombstones
+
+
+def _put(session_id, content):
+    return put_message(session_id, "user", content)["message_id"]
+
+
+def _ids(changes):
+    return [m["_id"] for m in changes["messages"]]
+
+
+def _age_tombstones(days):
+    db.tombstones.update_many({}, {"$set": {"deleted_at": datetime.utcnow() - timedelta(days=days)}})
+
+
+def test_tokens_only_move_forward(session_id):
+    first = _put(session_id, "Paris first")
+    snapshot = get_changes(session_id)
+    assert snapshot["reset"] and _ids(snapshot) == [first]
+
+    second = _put(session_id, "then Amsterdam")
+    changes = get_changes(session_id, snapshot["sync_token"])
+    assert not changes["reset"]
+    assert _ids(changes) == [second]
+    assert int(changes["sync_token"]) > int(snapshot["sync_token"])
+
+    # Nothing new: same token, nothing returned
+    idle = get_changes(session_id, changes["sync_token"])
+    assert idle["sync_token"] == changes["sync_token"] and idle["count"] == 0
+
+
+def test_write_in_flight_holds_the_token_back(session_id):
+    token = get_changes(session_id)["sync_token"]
+    # A writer took the next value but hasn't inserted its message yet
+    in_flight = next_sync_seq(session_id)
+    later = _put(session_id, "written after the in-flight one")
+
+    changes = get_changes(session_id, token)
+    assert _ids(changes) == [later]
+    assert int(changes["sync_token"]) == in_flight - 1
+
+    # The in-flight write lands: the client re-reads from the held-back token and gets both
+    db.history.insert_one({
+        "session_id": ObjectId(session_id), "role": "user", "content": "slow write",
+        "seq": in_flight, "timestamp": datetime.utcnow()
+    })
+    caught_up = get_changes(session_id, changes["sync_token"])
+    assert len(caught_up["messages"]) == 2
+    assert int(caught_up["sync_token"]) == in_flight + 1
+
+
+def test_write_that_never_lands_is_given_up_on(session_id):
+    token = get_changes(session_id)["sync_token"]
+    next_sync_seq(session_id)
+    later = _put(session_id, "after a failed write")
+    db.history.update_one({"_id": ObjectId(later)}, {"$set": {"timestamp": datetime.utcnow() - timedelta(minutes=5)}})
+
+    changes = get_changes(session_id, token)
+    assert _ids(changes) == [later]
+    assert int(changes["sync_token"]) == int(token) + 2
+
+
+def test_deletions_reach_syncing_clients(session_id):
+    kept, dropped = _put(session_id, "keep"), _put(session_id, "drop")
+    token = get_changes(session_id)["sync_token"]
+
+    assert delete_message(dropped)["success"]
+    changes = get_changes(session_id, token)
+    assert not changes["reset"]
+    assert changes["deleted"] == [dropped] and changes["messages"] == []
+
+    # A client that never saw the message is told about the tombstone too, harmlessly
+    assert get_changes(session_id, "0")["deleted"] == [dropped]
+    assert _ids(get_changes(session_id, "0")) == [kept]
+
+
+def test_token_below_the_floor_gets_a_reset(session_id):
+    kept, dropped = _put(session_id, "keep"), _put(session_id, "drop")
+    token = get_changes(session_id)["sync_token"]
+    delete_message(dropped)
+
+    _age_tombstones(2)
+    assert compact_tombstones(retention_days=1) == 1
+    changes = get_changes(session_id, token)
+    assert changes["reset"]
+    assert _ids(changes) == [kept] and changes["deleted"] == []
+
+    # The reset's token is usable as usual afterwards
+    assert get_changes(session_id, changes["sync_token"])["reset"] is False
+
+
+def test_reading_changes_expires_old_tombstones(session_id):
+    _put(session_id, "keep")
+    dropped = _put(session_id, "drop")
+    token = get_changes(session_id)["sync_token"]
+    delete_message(dropped)
+    _age_tombstones(TOMBSTONE_RETENTION_DAYS + 1)
+
+    assert get_changes(session_id, token)["reset"]
+    assert db.tombstones.count_documents({}) == 0
+
+
+def test_clearing_a_session_resets_clients(session_id):
+    _put(session_id, "one")
+    token = get_changes(session_id)["sync_token"]
+    delete_message(_put(session_id, "two"))
+
+    assert clear_session_messages(session_id)["success"]
+    changes = get_changes(session_id, token)
+    assert changes["reset"] and changes["messages"] == []
+    assert db.tombstones.count_documents({}) == 0
+
+    after = _put(session_id, "fresh start")
+    assert _ids(get_changes(session_id, changes["sync_token"])) == [after]
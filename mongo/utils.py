@@ -62,6 +62,25 @@ def is_valid_object_id(id_string: str) -> bool:
         return False
 
 
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """
+    Check an ETag against an If-None-Match header (RFC 9110 13.1.2).
+    
+    Args:
+        etag: Current entity tag, quoted
+        if_none_match: Header value: "*" or a comma-separated list of tags
+        
+    Returns:
+        bool: True if any listed tag matches under weak comparison
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
 def create_response(success: bool, data: dict = None, error: str = None) -> dict:
     """
     Create a standardized API response.